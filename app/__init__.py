@@ -1,15 +1,30 @@
+import time
+
+# Início da importação da aplicação (contado no tempo de inicialização)
+_import_started = time.perf_counter()
+
 import os
 import logging
 from flask import Flask
-from config.settings import load_config
+from config.settings import load_config, active_config
 from utils.db_adapter import db_adapter
 from app.routes import register_routes
 from app.error_handlers import register_error_handlers
 from datetime import datetime
 
+IMPORT_TIME_MS = (time.perf_counter() - _import_started) * 1000
+
 
 def create_app(test_config=None):
-    """Cria e configura a instância da aplicação Flask"""
+    """
+    Cria e configura a instância da aplicação Flask
+    
+    Não acessa o banco de dados: o esquema é verificado uma vez por deploy
+    (`python -m utils.migrations upgrade` e `migration_runner.check()` no
+    processo principal do gunicorn), não em cada worker.
+    """
+    started = time.perf_counter()
+    
     # Criar e configurar a app
     app = Flask(__name__, 
                 template_folder='../templates',
@@ -75,8 +90,15 @@ def create_app(test_config=None):
     # Registrar tratadores de erro
     register_error_handlers(app)
     
-    # Inicializar banco de dados se necessário
-    with app.app_context():
-        db_adapter.init_db()
+    # Tempo de inicialização (importação do pacote + create_app) comparado ao orçamento
+    startup_ms = IMPORT_TIME_MS + (time.perf_counter() - started) * 1000
+    app.config['STARTUP_TIME_MS'] = round(startup_ms, 1)
+    if startup_ms > active_config.STARTUP_BUDGET_MS:
+        logging.warning(
+            f"Inicialização da aplicação levou {startup_ms:.0f} ms "
+            f"(orçamento: {active_config.STARTUP_BUDGET_MS} ms)"
+        )
+    else:
+        logging.info(f"Aplicação inicializada em {startup_ms:.0f} ms")
     
     return app
\ No newline at end of file
@@ -1,8 +1,13 @@
 import logging
 import re
 from utils.db_adapter import db_adapter
+from utils.unit_of_work import transactional, on_commit
 from app.models.custom_link import CustomLink
 from app.models.user import User
+from app.models.link_number import LinkNumber
+from app.models.whatsapp_number import WhatsAppNumber
+from app.services.link_cache import link_cache
+from app.services.balancer import STRATEGIES
 
 
 class LinkController:
@@ -26,6 +31,7 @@ class LinkController:
             return []
     
     @staticmethod
+    @transactional
     def add_link(user_id, link_name, message=None):
         """
         Adiciona um novo link personalizado para um usuário
@@ -83,7 +89,8 @@ class LinkController:
             return None, f"Erro ao adicionar link: {str(e)}"
     
     @staticmethod
-    def update_link(link_id, user_id, message=None, is_active=None):
+    @transactional
+    def update_link(link_id, user_id, message=None, is_active=None, balancing_strategy=None):
         """
         Atualiza um link personalizado
         
@@ -92,6 +99,7 @@ class LinkController:
             user_id (int): ID do usuário (para verificação de propriedade)
             message (str, optional): Nova mensagem. Defaults to None.
             is_active (bool, optional): Novo status de ativação. Defaults to None.
+            balancing_strategy (str, optional): Estratégia de balanceamento ('' volta ao padrão). Defaults to None.
             
         Returns:
             tuple: (CustomLink, str) - Link atualizado e mensagem de erro (ou None se sucesso)
@@ -113,6 +121,11 @@ class LinkController:
         if is_active is not None:
             link.is_active = is_active
         
+        if balancing_strategy is not None:
+            if balancing_strategy and balancing_strategy not in STRATEGIES:
+                return None, "Estratégia de balanceamento inválida"
+            link.balancing_strategy = balancing_strategy or None
+        
         # Salvar alterações
         try:
             link.save()
@@ -123,6 +136,7 @@ class LinkController:
             return None, f"Erro ao atualizar link: {str(e)}"
     
     @staticmethod
+    @transactional
     def delete_link(link_id, user_id):
         """
         Remove um link personalizado
@@ -156,6 +170,37 @@ class LinkController:
             logging.error(f"Erro ao remover link: {str(e)}")
             return False, f"Erro ao remover link: {str(e)}"
     
+    @staticmethod
+    @transactional
+    def update_balancing_strategy(user_id, balancing_strategy):
+        """
+        Define a estratégia de balanceamento padrão dos links de um usuário
+        
+        Args:
+            user_id (int): ID do usuário
+            balancing_strategy (str): Nome da estratégia ('' ou None volta ao padrão do sistema)
+            
+        Returns:
+            tuple: (User, str) - Usuário atualizado e mensagem de erro (ou None se sucesso)
+        """
+        if balancing_strategy and balancing_strategy not in STRATEGIES:
+            return None, "Estratégia de balanceamento inválida"
+        
+        user = User.get_by_id(user_id)
+        if not user:
+            return None, "Usuário não encontrado"
+        
+        try:
+            user.balancing_strategy = balancing_strategy or None
+            user.save()
+            # A estratégia do usuário é lida junto com os links em cache
+            on_commit(link_cache.clear)
+            logging.info(f"Estratégia de balanceamento do usuário {user_id} alterada para {user.balancing_strategy}")
+            return user, None
+        except Exception as e:
+            logging.error(f"Erro ao atualizar estratégia de balanceamento: {str(e)}")
+            return None, f"Erro ao atualizar estratégia de balanceamento: {str(e)}"
+    
     @staticmethod
     def get_link_statistics(link_id, user_id):
         """
@@ -220,6 +265,139 @@ class LinkController:
             logging.error(f"Erro ao obter estatísticas de link: {str(e)}")
             return None, f"Erro ao obter estatísticas: {str(e)}"
 
+    @staticmethod
+    def get_link_numbers(link_id, user_id):
+        """
+        Obtém os números atribuídos a um link
+        
+        Args:
+            link_id (int): ID do link
+            user_id (int): ID do usuário (para verificação de propriedade)
+            
+        Returns:
+            tuple: (list, str) - IDs dos números atribuídos e mensagem de erro (ou None se sucesso).
+                   Lista vazia significa que o link usa todos os números ativos do usuário.
+        """
+        link, error = LinkController._get_owned_link(link_id, user_id)
+        if error:
+            return None, error
+        
+        try:
+            return LinkNumber.get_number_ids(link_id), None
+        except Exception as e:
+            logging.error(f"Erro ao buscar números do link: {str(e)}")
+            return None, f"Erro ao buscar números do link: {str(e)}"
+    
+    @staticmethod
+    @transactional
+    def set_link_numbers(link_id, user_id, number_ids):
+        """
+        Substitui os números atribuídos a um link
+        
+        Args:
+            link_id (int): ID do link
+            user_id (int): ID do usuário (para verificação de propriedade)
+            number_ids (list): IDs dos números (lista vazia volta a usar todos os números do usuário)
+            
+        Returns:
+            tuple: (list, str) - IDs atribuídos e mensagem de erro (ou None se sucesso)
+        """
+        link, error = LinkController._get_owned_link(link_id, user_id)
+        if error:
+            return None, error
+        
+        try:
+            number_ids = sorted({int(number_id) for number_id in number_ids or []})
+        except (TypeError, ValueError):
+            return None, "IDs de números inválidos"
+        
+        try:
+            if number_ids:
+                owned = db_adapter.execute_query(
+                    'SELECT id FROM whatsapp_numbers WHERE user_id = %s AND id = ANY(%s)',
+                    (user_id, number_ids),
+                    fetch_all=True
+                ) or []
+                if len(owned) != len(number_ids):
+                    return None, "Um ou mais números não pertencem ao seu usuário"
+            
+            LinkNumber.replace(link_id, number_ids)
+            logging.info(f"Números do link {link_id} atualizados pelo usuário {user_id}: {number_ids}")
+            return number_ids, None
+        except Exception as e:
+            logging.error(f"Erro ao atualizar números do link: {str(e)}")
+            return None, f"Erro ao atualizar números do link: {str(e)}"
+    
+    @staticmethod
+    @transactional
+    def add_link_number(link_id, user_id, number_id):
+        """
+        Atribui um número a um link
+        
+        Args:
+            link_id (int): ID do link
+            user_id (int): ID do usuário (para verificação de propriedade)
+            number_id (int): ID do número
+            
+        Returns:
+            tuple: (bool, str) - Sucesso e mensagem de erro (ou None se sucesso)
+        """
+        link, error = LinkController._get_owned_link(link_id, user_id)
+        if error:
+            return False, error
+        
+        number = WhatsAppNumber.get_by_id(number_id)
+        if not number or number.user_id != user_id:
+            return False, "Número não encontrado"
+        
+        try:
+            LinkNumber.add(link_id, number_id)
+            logging.info(f"Número {number_id} atribuído ao link {link_id} pelo usuário {user_id}")
+            return True, None
+        except Exception as e:
+            logging.error(f"Erro ao atribuir número ao link: {str(e)}")
+            return False, f"Erro ao atribuir número ao link: {str(e)}"
+    
+    @staticmethod
+    @transactional
+    def remove_link_number(link_id, user_id, number_id):
+        """
+        Remove a atribuição de um número a um link
+        
+        Args:
+            link_id (int): ID do link
+            user_id (int): ID do usuário (para verificação de propriedade)
+            number_id (int): ID do número
+            
+        Returns:
+            tuple: (bool, str) - Sucesso e mensagem de erro (ou None se sucesso)
+        """
+        link, error = LinkController._get_owned_link(link_id, user_id)
+        if error:
+            return False, error
+        
+        try:
+            if not LinkNumber.remove(link_id, number_id):
+                return False, "Número não está atribuído a este link"
+            logging.info(f"Número {number_id} removido do link {link_id} pelo usuário {user_id}")
+            return True, None
+        except Exception as e:
+            logging.error(f"Erro ao remover número do link: {str(e)}")
+            return False, f"Erro ao remover número do link: {str(e)}"
+    
+    @staticmethod
+    def _get_owned_link(link_id, user_id):
+        """Busca um link verificando se pertence ao usuário"""
+        link = CustomLink.get_by_id(link_id)
+        if not link:
+            return None, "Link não encontrado"
+        
+        if link.user_id != user_id:
+            logging.warning(f"Tentativa de acessar números de link de outro usuário: {user_id} tentou acessar link {link_id}")
+            return None, "Você não tem permissão para alterar este link"
+        
+        return link, None
+    
     @staticmethod
     def create_default_link(user_id):
         """
@@ -3,6 +3,7 @@ from app.models.whatsapp_number import WhatsAppNumber
 from app.models.user import User
 from app.controllers.redirect_controller import RedirectController
 from utils.db_adapter import db_adapter
+from utils.unit_of_work import transactional
 
 
 class NumberController:
@@ -29,6 +30,7 @@ class NumberController:
             return []
     
     @staticmethod
+    @transactional
     def add_number(user_id, phone_number, description=None):
         """
         Adiciona um novo número de WhatsApp para um usuário
@@ -82,7 +84,8 @@ class NumberController:
             return None, f"Erro ao adicionar número: {str(e)}"
     
     @staticmethod
-    def update_number(number_id, user_id, description=None, is_active=None):
+    @transactional
+    def update_number(number_id, user_id, description=None, is_active=None, weight=None, capacity=None):
         """
         Atualiza um número de WhatsApp
         
@@ -91,6 +94,8 @@ class NumberController:
             user_id (int): ID do usuário (para verificação de propriedade)
             description (str, optional): Nova descrição. Defaults to None.
             is_active (bool, optional): Novo status de ativação. Defaults to None.
+            weight (int, optional): Peso no balanceamento (mínimo 1). Defaults to None.
+            capacity (int, optional): Máximo de redirecionamentos em 24 horas (0 = ilimitado). Defaults to None.
             
         Returns:
             tuple: (WhatsAppNumber, str) - Número atualizado e mensagem de erro (ou None se sucesso)
@@ -112,6 +117,18 @@ class NumberController:
         if is_active is not None:
             number.is_active = is_active
         
+        try:
+            if weight is not None:
+                number.weight = int(weight)
+                if number.weight < 1:
+                    return None, "O peso deve ser um número inteiro maior ou igual a 1"
+            if capacity is not None:
+                number.capacity = int(capacity) or None
+                if number.capacity is not None and number.capacity < 0:
+                    return None, "A capacidade não pode ser negativa"
+        except (TypeError, ValueError):
+            return None, "Peso e capacidade devem ser números inteiros"
+        
         # Salvar alterações
         try:
             number.save()
@@ -122,6 +139,7 @@ class NumberController:
             return None, f"Erro ao atualizar número: {str(e)}"
     
     @staticmethod
+    @transactional
     def delete_number(number_id, user_id):
         """
         Desativa um número de WhatsApp (exclusão lógica)
@@ -158,6 +176,7 @@ class NumberController:
             return False, f"Erro ao desativar número: {str(e)}"
     
     @staticmethod
+    @transactional
     def reactivate_number(number_id, user_id):
         """
         Reativa um número de WhatsApp que estava desativado
@@ -1,17 +1,33 @@
 import logging
-import random
 from datetime import datetime
-from app.models.custom_link import CustomLink
-from app.models.whatsapp_number import WhatsAppNumber
-from app.models.redirect_log import RedirectLog
+from app.services.link_cache import link_cache
 from app.services.balancer import NumberBalancer
-from app.services.geolocation import GeoLocationService
+from app.services.number_pool import number_pool
+from app.services.redirect_targets import redirect_targets, whatsapp_digits
+from app.services.click_pipeline import click_pipeline, new_click_event
+from app.services.geo_worker import geo_enrichment
 from utils.db_adapter import db_adapter
 
 
 class RedirectController:
     """Controlador para operações de redirecionamento"""
     
+    # Registro completo do redirecionamento em uma única instrução: incrementa
+    # os contadores do link e do número e grava o log com a mensagem usada.
+    REDIRECT_QUERY = '''
+        WITH link_update AS (
+            UPDATE custom_links SET click_count = COALESCE(click_count, 0) + 1
+            WHERE id = %(link_id)s
+        ),
+        number_update AS (
+            UPDATE whatsapp_numbers SET redirect_count = redirect_count + 1
+            WHERE id = %(number_id)s
+        )
+        INSERT INTO redirect_logs (link_id, number_id, user_agent, ip_address, message, redirect_time)
+        VALUES (%(link_id)s, %(number_id)s, %(user_agent)s, %(client_ip)s, %(message)s, CURRENT_TIMESTAMP)
+        RETURNING id
+    '''
+    
     @staticmethod
     def redirect_whatsapp(link_name, client_ip=None, user_agent=None):
         """
@@ -25,132 +41,20 @@ class RedirectController:
         Returns:
             tuple: (url, error) - URL de redirecionamento e mensagem de erro (ou None se sucesso)
         """
-        redirect_start_time = datetime.now()
-        conn = None
-        log_id = None
-        
         try:
-            conn = db_adapter.get_db_connection()
-            
-            # Buscar link pelo nome
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM custom_links WHERE link_name = %s', (link_name,))
-            link = cursor.fetchone()
+            # Buscar link pelo nome (consulta o banco apenas se não estiver em cache)
+            link = link_cache.get_by_name(link_name)
             
             if not link:
                 logging.warning(f"Link não encontrado: {link_name}")
                 return None, "Link não encontrado."
             
-            # Verificar se o link está ativo
-            if not link['is_active']:
-                logging.warning(f"Tentativa de acesso a link inativo: {link_name}")
-                return None, "Este link está inativo."
-            
-            # Incrementar o contador de cliques
-            try:
-                cursor.execute('UPDATE custom_links SET click_count = COALESCE(click_count, 0) + 1 WHERE id = %s', (link['id'],))
-                conn.commit()
-                logging.info(f"Contador de cliques incrementado para o link_id={link['id']}")
-            except Exception as e:
-                logging.error(f"Erro ao incrementar contador de cliques: {str(e)}")
-                conn.rollback()
-                # Continuar mesmo se falhar o contador
-            
-            # Obter todos os números ativos do usuário proprietário do link
-            cursor.execute('SELECT * FROM whatsapp_numbers WHERE user_id = %s AND is_active = 1', 
-                           (link['user_id'],))
-            numbers = cursor.fetchall()
-            
-            if not numbers:
-                logging.error(f"Nenhum número ativo encontrado para user_id={link['user_id']}")
-                return None, "Não há números disponíveis para este link."
-            
-            logging.info(f"Encontrados {len(numbers)} números ativos para o usuário {link['user_id']}")
-            
-            # Selecionar um número - lógica melhorada para balanceamento
-            selected_number = NumberBalancer.select_number(numbers, link['id'])
-            
-            # Incrementar contador do número selecionado
-            try:
-                cursor.execute('UPDATE whatsapp_numbers SET redirect_count = redirect_count + 1 WHERE id = %s', 
-                              (selected_number['id'],))
-                conn.commit()
-            except Exception as e:
-                logging.error(f"Erro ao incrementar contador do número: {str(e)}")
-                conn.rollback()
-                # Continuar mesmo com erro no contador
-            
-            # Inserir log de redirecionamento
-            try:
-                if db_adapter.use_postgres:
-                    cursor.execute('''
-                        INSERT INTO redirect_logs (link_id, number_id, user_agent, ip_address, redirect_time)
-                        VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
-                        RETURNING id
-                    ''', (link['id'], selected_number['id'], user_agent, client_ip))
-                    log_id = cursor.fetchone()['id']
-                else:
-                    cursor.execute('''
-                        INSERT INTO redirect_logs (link_id, number_id, user_agent, ip_address, timestamp)
-                        VALUES (?, ?, ?, ?, datetime('now'))
-                    ''', (link['id'], selected_number['id'], user_agent, client_ip))
-                    log_id = cursor.lastrowid
-                
-                conn.commit()
-            except Exception as e:
-                logging.error(f"Erro ao inserir log de redirecionamento: {str(e)}")
-                conn.rollback()
-                log_id = None
-            
-            # Processar informações de localização em segundo plano (não bloquear o redirecionamento)
-            try:
-                if log_id:
-                    # Esta chamada deve ser executada de forma assíncrona em produção
-                    GeoLocationService.update_log_with_location(log_id, client_ip, db_adapter)
-            except Exception as e:
-                logging.error(f"Erro ao processar localização: {str(e)}")
-            
-            # Formatar o número para o WhatsApp
-            formatted_phone = RedirectController.format_phone_number(selected_number['phone_number'])
-            
-            # Preparar a mensagem personalizada
-            message = ''
-            if link.get('message_template'):
-                message = f"?text={link['message_template']}"
-                # Atualizar o log com a mensagem usada
-                try:
-                    cursor.execute('UPDATE redirect_logs SET message = %s WHERE id = %s', 
-                                (link['message_template'], log_id))
-                    conn.commit()
-                except Exception as e:
-                    logging.error(f"Erro ao registrar mensagem no log: {str(e)}")
-                    conn.rollback()
-            elif link.get('custom_message'):  # Verificar campo alternativo para mensagem
-                message = f"?text={link['custom_message']}"
-                # Atualizar o log com a mensagem usada
-                try:
-                    cursor.execute('UPDATE redirect_logs SET message = %s WHERE id = %s', 
-                                (link['custom_message'], log_id))
-                    conn.commit()
-                except Exception as e:
-                    logging.error(f"Erro ao registrar mensagem no log: {str(e)}")
-                    conn.rollback()
-            
-            # Calcular tempo de redirecionamento
-            redirect_time = (datetime.now() - redirect_start_time).total_seconds()
-            logging.info(f"Redirecionamento para {formatted_phone} concluído em {redirect_time:.4f} segundos.")
-            
-            # Redirecionar para o WhatsApp
-            whatsapp_url = f"https://wa.me/{formatted_phone}{message}"
-            return whatsapp_url, None
+            return RedirectController._redirect(link, client_ip, user_agent)
             
         except Exception as e:
             # Retornar uma mensagem de erro genérica
             logging.error(f"Erro no redirecionamento: {str(e)}")
             return None, "Ocorreu um erro ao processar seu redirecionamento. Tente novamente."
-        finally:
-            if conn:
-                conn.close()
     
     @staticmethod
     def redirect_whatsapp_with_link(link, client_ip=None, user_agent=None):
@@ -165,116 +69,138 @@ class RedirectController:
         Returns:
             tuple: (url, error) - URL de redirecionamento e mensagem de erro (ou None se sucesso)
         """
-        redirect_start_time = datetime.now()
-        conn = None
-        log_id = None
-        
         try:
-            conn = db_adapter.get_db_connection()
-            cursor = conn.cursor()
-            
-            # Verificar se o link está ativo
-            if not link['is_active']:
-                logging.warning(f"Tentativa de acesso a link inativo: {link['link_name']}")
-                return None, "Este link está inativo."
-            
-            # Incrementar o contador de cliques (já foi feito na rota, não precisamos repetir)
-            
-            # Obter todos os números ativos do usuário proprietário do link
-            cursor.execute('SELECT * FROM whatsapp_numbers WHERE user_id = %s AND is_active = 1', 
-                        (link['user_id'],))
-            numbers = cursor.fetchall()
-            
-            if not numbers:
-                logging.error(f"Nenhum número ativo encontrado para user_id={link['user_id']}")
-                return None, "Não há números disponíveis para este link."
-            
-            logging.info(f"Encontrados {len(numbers)} números ativos para o usuário {link['user_id']}")
-            
-            # Selecionar um número - lógica melhorada para balanceamento
-            selected_number = NumberBalancer.select_number(numbers, link['id'])
-            
-            # Incrementar contador do número selecionado
-            try:
-                cursor.execute('UPDATE whatsapp_numbers SET redirect_count = redirect_count + 1 WHERE id = %s', 
-                            (selected_number['id'],))
-                conn.commit()
-            except Exception as e:
-                logging.error(f"Erro ao incrementar contador do número: {str(e)}")
-                conn.rollback()
-                # Continuar mesmo com erro no contador
-            
-            # Inserir log de redirecionamento
-            try:
-                if db_adapter.use_postgres:
-                    cursor.execute('''
-                        INSERT INTO redirect_logs (link_id, number_id, user_agent, ip_address, redirect_time)
-                        VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
-                        RETURNING id
-                    ''', (link['id'], selected_number['id'], user_agent, client_ip))
-                    log_id = cursor.fetchone()['id']
-                else:
-                    cursor.execute('''
-                        INSERT INTO redirect_logs (link_id, number_id, user_agent, ip_address, timestamp)
-                        VALUES (?, ?, ?, ?, datetime('now'))
-                    ''', (link['id'], selected_number['id'], user_agent, client_ip))
-                    log_id = cursor.lastrowid
-                
-                conn.commit()
-            except Exception as e:
-                logging.error(f"Erro ao inserir log de redirecionamento: {str(e)}")
-                conn.rollback()
-                log_id = None
-            
-            # Processar informações de localização em segundo plano (não bloquear o redirecionamento)
-            try:
-                if log_id:
-                    # Esta chamada deve ser executada de forma assíncrona em produção
-                    GeoLocationService.update_log_with_location(log_id, client_ip, db_adapter)
-            except Exception as e:
-                logging.error(f"Erro ao processar localização: {str(e)}")
-            
-            # Formatar o número para o WhatsApp
-            formatted_phone = RedirectController.format_phone_number(selected_number['phone_number'])
-            
-            # Preparar a mensagem personalizada
-            message = ''
-            if link.get('message_template'):
-                message = f"?text={link['message_template']}"
-                # Atualizar o log com a mensagem usada
-                try:
-                    cursor.execute('UPDATE redirect_logs SET message = %s WHERE id = %s', 
-                                (link['message_template'], log_id))
-                    conn.commit()
-                except Exception as e:
-                    logging.error(f"Erro ao registrar mensagem no log: {str(e)}")
-                    conn.rollback()
-            elif link.get('custom_message'):  # Verificar campo alternativo para mensagem
-                message = f"?text={link['custom_message']}"
-                # Atualizar o log com a mensagem usada
-                try:
-                    cursor.execute('UPDATE redirect_logs SET message = %s WHERE id = %s', 
-                                (link['custom_message'], log_id))
-                    conn.commit()
-                except Exception as e:
-                    logging.error(f"Erro ao registrar mensagem no log: {str(e)}")
-                    conn.rollback()
-            
-            # Calcular tempo de redirecionamento
-            redirect_time = (datetime.now() - redirect_start_time).total_seconds()
-            logging.info(f"Redirecionamento para {formatted_phone} concluído em {redirect_time:.4f} segundos.")
-            
-            # Redirecionar para o WhatsApp
-            whatsapp_url = f"https://wa.me/{formatted_phone}{message}"
-            return whatsapp_url, None
-            
+            return RedirectController._redirect(link, client_ip, user_agent)
         except Exception as e:
             # Retornar uma mensagem de erro genérica
             logging.error(f"Erro no redirecionamento com link: {str(e)}")
             return None, "Ocorreu um erro ao processar seu redirecionamento. Tente novamente."
-        finally:
-            if conn:
-                conn.close()
+    
+    @staticmethod
+    def _redirect(link, client_ip, user_agent):
+        """
+        Executa o redirecionamento de um link já resolvido
+        
+        O número é escolhido em memória pelo NumberBalancer. Por padrão,
+        contadores e log são gravados em uma única instrução (REDIRECT_QUERY);
+        com o pipeline write-behind habilitado, o clique é apenas enfileirado
+        para gravação em lote.
+        
+        Args:
+            link (dict): Registro do link
+            client_ip (str): Endereço IP do cliente
+            user_agent (str): User Agent do cliente
+            
+        Returns:
+            tuple: (url, error) - URL de redirecionamento e mensagem de erro (ou None se sucesso)
+        """
+        redirect_start_time = datetime.now()
+        
+        # Verificar se o link está ativo
+        if not link['is_active']:
+            logging.warning(f"Tentativa de acesso a link inativo: {link['link_name']}")
+            return None, "Este link está inativo."
+        
+        # Obter os números elegíveis do link (conjunto pré-calculado em cache)
+        pool_version, numbers = number_pool.get(link)
+        
+        selected_number, message, error = RedirectController.select_target(link, pool_version, numbers)
+        if error:
+            return None, error
+        
+        if click_pipeline.enabled:
+            RedirectController._record_write_behind(link, selected_number, message, client_ip, user_agent)
+        else:
+            RedirectController._record_now(link, selected_number, message, client_ip, user_agent)
+        
+        # URL final pré-calculada por telefone/mensagem
+        whatsapp_url = redirect_targets.get(selected_number, message)
+        
+        # Calcular tempo de redirecionamento
+        redirect_time = (datetime.now() - redirect_start_time).total_seconds()
+        logging.info(f"Redirecionamento para o número {selected_number['id']} concluído em {redirect_time:.4f} segundos.")
+        
+        return whatsapp_url, None
+    
+    @staticmethod
+    def select_target(link, pool_version, numbers):
+        """
+        Escolhe o número e a mensagem de um link ativo, sem consultar o banco
+        
+        Regras compartilhadas pelo redirecionamento síncrono e pelo assíncrono (asgi.py).
+        
+        Args:
+            link (dict): Registro do link
+            pool_version (int): Versão do conjunto de números (NumberPoolCache)
+            numbers (tuple): Números elegíveis do link
+            
+        Returns:
+            tuple: (number, message, error) - Número selecionado, mensagem e erro (ou None se sucesso)
+        """
+        if not numbers:
+            logging.error(f"Nenhum número ativo encontrado para user_id={link['user_id']}")
+            return None, None, "Não há números disponíveis para este link."
+        
+        # Mensagem personalizada (message_template tem prioridade sobre custom_message)
+        message = link.get('message_template') or link.get('custom_message') or None
+        
+        # Selecionar um número com a estratégia do link (ou do usuário)
+        strategy = link.get('balancing_strategy') or link.get('user_balancing_strategy')
+        selected_number = NumberBalancer.select_number(numbers, link['id'], strategy, pool_version)
+        return selected_number, message, None
+    
+    @staticmethod
+    def record_params(link, number, message, client_ip, user_agent):
+        """Parâmetros de REDIRECT_QUERY para um redirecionamento"""
+        return {
+            'link_id': link['id'],
+            'number_id': number['id'],
+            'user_agent': user_agent,
+            'client_ip': client_ip,
+            'message': message
+        }
+    
+    @staticmethod
+    def _record_now(link, number, message, client_ip, user_agent):
+        """
+        Registra o redirecionamento de forma síncrona (REDIRECT_QUERY)
+        
+        Args:
+            link (dict): Registro do link
+            number (dict): Número selecionado
+            message (str): Mensagem enviada ao WhatsApp
+            client_ip (str): Endereço IP do cliente
+            user_agent (str): User Agent do cliente
+        """
+        try:
+            result = db_adapter.execute_statement(
+                'record_redirect',
+                RedirectController.record_params(link, number, message, client_ip, user_agent),
+                commit=True
+            )
+        except Exception as e:
+            # Continuar o redirecionamento mesmo se o registro falhar
+            logging.error(f"Erro ao registrar redirecionamento: {str(e)}")
+            return
+        
+        # Geolocalização assíncrona: a latência do redirecionamento não depende dos provedores
+        geo_enrichment.submit(result['id'], client_ip)
+    
+    @staticmethod
+    def _record_write_behind(link, number, message, client_ip, user_agent):
+        """
+        Apenas enfileira o clique no pipeline write-behind
+        
+        Logs, contadores e geolocalização são gravados pelo flush em lote.
+        """
+        event = new_click_event(link['id'], number['id'], client_ip, user_agent, message)
+        
+        if not click_pipeline.enqueue(event):
+            # Fila cheia: gravar este clique imediatamente em vez de descartá-lo
+            try:
+                geo_enrichment.submit_many(click_pipeline.flush([event]))
+            except Exception as e:
+                logging.error(f"Erro ao registrar clique: {str(e)}")
     
     @staticmethod
     def format_phone_number(phone_number):
@@ -287,14 +213,7 @@ class RedirectController:
         Returns:
             str: Número formatado para o WhatsApp
         """
-        # Remover caracteres não numéricos
-        digits_only = ''.join(filter(str.isdigit, phone_number))
-        
-        # Garantir que o número comece com código do país
-        if not digits_only.startswith('55'):
-            digits_only = '55' + digits_only
-            
-        return digits_only
+        return whatsapp_digits(phone_number)
     
     @staticmethod
     def validate_phone_number(phone_number):
@@ -327,3 +246,7 @@ class RedirectController:
             digits_only = '55' + digits_only
             
         return digits_only
+
+
+# Registro do redirecionamento executado como statement preparado
+db_adapter.register_statement('record_redirect', RedirectController.REDIRECT_QUERY)
@@ -1,47 +1,76 @@
 import logging
 from utils.db_adapter import db_adapter
+from utils.read_replica import replica_read
+from app.services.rollups import stats_rollups, TAIL_ID
+from app.services.stats_query import StatsQuery
+from app.services.dashboard_bundle import dashboard_bundle
+
 
 class StatsController:
     """Controlador para gerenciar estatísticas da aplicação"""
     
     @staticmethod
-    def get_stats_by_number(user_id, start_date, end_date, link_id=None):
-        """Obtém estatísticas agrupadas por número de telefone"""
+    def _clicks_source(stats_query):
+        """
+        Monta a subconsulta de cliques: agregados (redirect_stats_daily, ou por
+        hora com fuso do cliente) somados à cauda de logs ainda não agregados
+        (id acima da marca d'água)
+        
+        Colunas: link_id, number_id, country ('' = não geolocalizado), clicks, last_redirect
+        
+        Returns:
+            tuple: (query, params)
+        """
+        stats_rollups.ensure_started()
+        
+        table, rollup_conditions, rollup_params = stats_query.rollup('d')
+        conditions, params = stats_query.where()
+        conditions.append(f"rl.id > {TAIL_ID}")
+        
+        query = f"""
+            SELECT d.link_id, d.number_id, d.country, d.clicks, d.last_redirect
+            FROM {table} d
+            WHERE {' AND '.join(rollup_conditions)}
+            UNION ALL
+            SELECT rl.link_id, rl.number_id, COALESCE(rl.country, ''), 1, rl.redirect_time
+            FROM redirect_logs rl
+            JOIN custom_links cl ON rl.link_id = cl.id
+            WHERE {' AND '.join(conditions)}
+        """
+        return query, rollup_params + params
+    
+    @staticmethod
+    @replica_read()
+    def get_stats_by_number(user_id, start_date, end_date, link_id=None, raise_errors=False):
+        """
+        Obtém estatísticas agrupadas por número de telefone
+        
+        Com `raise_errors`, erros do banco sobem em vez de virar uma lista vazia.
+        """
         try:
-            conn = db_adapter.get_db_connection()
-            cursor = conn.cursor()
-            
-            # Condições para a consulta
-            conditions = ["cl.user_id = %s"]
-            params = [user_id]
-            
-            if start_date and end_date:
-                conditions.append("rl.redirect_time::date BETWEEN %s AND %s")
-                params.extend([start_date, end_date])
+            # Cliques agregados + cauda não agregada
+            stats_query = StatsQuery(user_id, start_date, end_date, link_id)
+            clicks, params = StatsController._clicks_source(stats_query)
             
-            if link_id:
-                conditions.append("cl.id = %s")
-                params.append(link_id)
-            
-            # Consulta para obter estatísticas por número
+            # Consulta para obter estatísticas por número (subconsulta, não WITH:
+            # só consultas iniciadas por SELECT vão para a réplica)
             query = f"""
                 SELECT 
                     wn.id, 
                     wn.phone_number,
                     wn.description,
-                    COUNT(rl.id) as access_count,
-                    MAX(rl.redirect_time) as last_access,
-                    ROUND(100.0 * COUNT(rl.id) / SUM(COUNT(rl.id)) OVER (), 2) as percentage
-                FROM whatsapp_numbers wn
-                JOIN redirect_logs rl ON wn.id = rl.number_id
-                JOIN custom_links cl ON rl.link_id = cl.id
-                WHERE {" AND ".join(conditions)}
+                    SUM(c.clicks) as access_count,
+                    MAX(c.last_redirect) as last_access,
+                    ROUND(100.0 * SUM(c.clicks) / SUM(SUM(c.clicks)) OVER (), 2) as percentage
+                FROM ({clicks}) c
+                JOIN whatsapp_numbers wn ON wn.id = c.number_id
                 GROUP BY wn.id, wn.phone_number, wn.description
                 ORDER BY access_count DESC
             """
             
-            cursor.execute(query, params)
-            results = cursor.fetchall()
+            # Um statement preparado por combinação de filtros
+            statement = db_adapter.register_statement(f'stats_by_number{stats_query.suffix}', query)
+            results = db_adapter.execute_statement(statement.name, params, fetch_all=True) or []
             
             # Formatar os resultados para serem retornados como JSON
             stats = []
@@ -50,82 +79,52 @@ class StatsController:
                     'id': row['id'],
                     'phone_number': row['phone_number'],
                     'description': row['description'],
-                    'access_count': row['access_count'],
+                    'access_count': int(row['access_count']),
                     'last_access': row['last_access'].strftime('%Y-%m-%d %H:%M:%S') if row['last_access'] else None,
                     'percentage': row['percentage']
                 })
             
-            conn.close()
             return {"number_stats": stats}
             
         except Exception as e:
             logging.error(f"Erro ao obter estatísticas por número: {str(e)}")
+            if raise_errors:
+                raise
             return {"number_stats": []}
     
     @staticmethod
-    def get_stats_summary(user_id, start_date, end_date, link_id=None):
-        """Obtém um resumo das estatísticas para um intervalo de datas"""
+    @replica_read()
+    def get_stats_summary(user_id, start_date, end_date, link_id=None, raise_errors=False):
+        """
+        Obtém um resumo das estatísticas para um intervalo de datas
+        
+        Com `raise_errors`, erros do banco sobem em vez de virar um resumo zerado.
+        """
         try:
-            conn = db_adapter.get_db_connection()
-            cursor = conn.cursor()
-            
-            # Prepara as condições da consulta SQL
-            conditions = ["cl.user_id = %s"]
-            params = [user_id]
-            
-            if start_date and end_date:
-                conditions.append("rl.redirect_time::date BETWEEN %s AND %s")
-                params.extend([start_date, end_date])
-            
-            if link_id:
-                conditions.append("cl.id = %s")
-                params.append(link_id)
-            
-            # Total de cliques
+            # Total de cliques (agregados + cauda não agregada)
+            stats_query = StatsQuery(user_id, start_date, end_date, link_id)
+            clicks, params = StatsController._clicks_source(stats_query)
             query = f"""
-                SELECT COUNT(*) as total_clicks
-                FROM redirect_logs rl
-                JOIN custom_links cl ON rl.link_id = cl.id
-                WHERE {' AND '.join(conditions)}
+                SELECT COALESCE(SUM(c.clicks), 0) as total_clicks
+                FROM ({clicks}) c
             """
             
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-            total_clicks = result['total_clicks'] if result else 0
+            statement = db_adapter.register_statement(f'stats_total_clicks{stats_query.suffix}', query)
+            result = db_adapter.execute_statement(statement.name, params)
+            total_clicks = int(result['total_clicks']) if result else 0
             
             # Total de links ativos
-            active_links_query = """
-                SELECT COUNT(DISTINCT cl.id) as total
-                FROM custom_links cl
-                WHERE cl.user_id = %s AND cl.is_active = 1
-            """
-            
-            cursor.execute(active_links_query, [user_id])
-            active_links_result = cursor.fetchone()
+            active_links_result = db_adapter.execute_statement('stats_active_links', [user_id])
             active_links = active_links_result['total'] if active_links_result else 0
             
             # Total de números ativos
-            active_numbers_query = """
-                SELECT COUNT(*) as total
-                FROM whatsapp_numbers
-                WHERE user_id = %s AND is_active = 1
-            """
-            
-            cursor.execute(active_numbers_query, [user_id])
-            active_numbers_result = cursor.fetchone()
+            active_numbers_result = db_adapter.execute_statement('stats_active_numbers', [user_id])
             active_numbers = active_numbers_result['total'] if active_numbers_result else 0
             
-            # Calcular média diária
+            # Calcular média diária (ambos os dias incluídos)
             daily_avg = 0
-            if start_date and end_date:
-                # Calcular número de dias entre datas
-                from datetime import datetime
-                start = datetime.strptime(start_date, '%Y-%m-%d')
-                end = datetime.strptime(end_date, '%Y-%m-%d')
-                days = (end - start).days + 1  # Incluir ambos os dias
-                
-                if days > 0 and total_clicks > 0:
-                    daily_avg = round(total_clicks / days, 1)
+            if stats_query.days > 0 and total_clicks > 0:
+                daily_avg = round(total_clicks / stats_query.days, 1)
             
             return {
                 "total_clicks": total_clicks,
@@ -140,6 +139,8 @@ class StatsController:
                 
         except Exception as e:
             logging.error(f"Erro ao obter resumo de estatísticas: {str(e)}")
+            if raise_errors:
+                raise
             return {
                 "total_clicks": 0,
                 "active_links": 0,
@@ -152,63 +153,195 @@ class StatsController:
             }
     
     @staticmethod
-    def get_stats_map(user_id, start_date, end_date, link_id=None):
-        """Obtém dados de mapa de calor para visualização"""
-        # Implementação simplificada - em uma versão real, isso poderia usar
-        # geolocalização de IPs para criar um mapa de calor
-        return {"map_data": []}
-    
-    @staticmethod
-    def get_recent_redirects(user_id, start_date, end_date, link_id=None, limit=100):
-        """Obtém os redirecionamentos mais recentes"""
+    @replica_read()
+    def get_stats_by_country(user_id, start_date, end_date, link_id=None, raise_errors=False):
+        """
+        Obtém a distribuição dos cliques por país (logs não geolocalizados ficam de fora)
+        
+        Com `raise_errors`, erros do banco sobem em vez de virar uma lista vazia.
+        """
         try:
-            with db_adapter.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Prepara as condições da consulta SQL
-                conditions = ["r.timestamp::date BETWEEN %s AND %s", "u.id = %s"]
-                params = [start_date, end_date, user_id]
-                
-                if link_id:
-                    conditions.append("l.id = %s")
-                    params.append(link_id)
-                
-                # Constrói e executa a consulta SQL
-                query = f"""
-                    SELECT 
-                        r.id, 
-                        l.short_path, 
-                        n.number, 
-                        r.timestamp,
-                        r.ip_address,
-                        r.user_agent
-                    FROM redirect_logs r
-                    JOIN whatsapp_numbers n ON r.number_id = n.id
-                    JOIN custom_links l ON r.link_id = l.id
-                    JOIN users u ON l.user_id = u.id
-                    WHERE {' AND '.join(conditions)}
-                    ORDER BY r.timestamp DESC
-                    LIMIT %s
-                """
-                
-                params.append(limit)
-                cursor.execute(query, params)
-                results = cursor.fetchall()
-                
-                # Formatar resultados
-                redirects = []
-                for row in results:
-                    redirects.append({
-                        "id": row[0],
-                        "link": row[1],
-                        "number": row[2],
-                        "timestamp": row[3].strftime('%Y-%m-%d %H:%M:%S'),
-                        "ip_address": row[4],
-                        "user_agent": row[5]
-                    })
-                
-                return redirects
-                
+            stats_query = StatsQuery(user_id, start_date, end_date, link_id)
+            clicks, params = StatsController._clicks_source(stats_query)
+            query = f"""
+                SELECT c.country, SUM(c.clicks) as access_count
+                FROM ({clicks}) c
+                WHERE c.country <> ''
+                GROUP BY c.country
+                ORDER BY access_count DESC
+            """
+            
+            statement = db_adapter.register_statement(f'stats_by_country{stats_query.suffix}', query)
+            results = db_adapter.execute_statement(statement.name, params, fetch_all=True) or []
+            return [{'country': row['country'], 'count': int(row['access_count'])} for row in results]
+            
         except Exception as e:
-            logging.error(f"Erro ao obter redirecionamentos recentes: {str(e)}")
+            logging.error(f"Erro ao obter estatísticas por país: {str(e)}")
+            if raise_errors:
+                raise
             return []
+    
+    @staticmethod
+    @replica_read()
+    def get_stats_map(user_id, start_date, end_date, link_id=None):
+        """
+        Obtém os pontos do mapa de calor e a distribuição por país
+        
+        Erros do banco sobem para a rota.
+        
+        Returns:
+            dict: locations (lat, lng, count, name) e countries (country, count)
+        """
+        stats_query = StatsQuery(user_id, start_date, end_date, link_id)
+        conditions, params = stats_query.where()
+        
+        # Pontos de localização (logs geolocalizados)
+        query = f"""
+            SELECT 
+                rl.latitude, 
+                rl.longitude, 
+                COUNT(*) as access_count,
+                COALESCE(rl.city, '') || ', ' || COALESCE(rl.region, '') || ', ' || COALESCE(rl.country, '') as name
+            FROM redirect_logs rl
+            JOIN custom_links cl ON rl.link_id = cl.id
+            WHERE {' AND '.join(conditions)}
+            AND rl.latitude IS NOT NULL
+            AND rl.longitude IS NOT NULL
+            GROUP BY rl.latitude, rl.longitude, name
+        """
+        
+        statement = db_adapter.register_statement(f'stats_map_points{stats_query.suffix}', query)
+        results = db_adapter.execute_statement(statement.name, params, fetch_all=True) or []
+        
+        map_points = []
+        for row in results:
+            if row['latitude'] and row['longitude']:
+                map_points.append({
+                    'lat': float(row['latitude']),
+                    'lng': float(row['longitude']),
+                    'count': row['access_count'],
+                    'name': row['name']
+                })
+        
+        # Distribuição por país a partir dos agregados
+        countries = StatsController.get_stats_by_country(user_id, start_date, end_date, link_id, raise_errors=True)
+        
+        return {'locations': map_points, 'countries': countries}
+    
+    @staticmethod
+    @replica_read()
+    def get_recent_redirects(user_id, start_date, end_date, link_id=None, limit=10, page=1):
+        """
+        Obtém os redirecionamentos mais recentes, paginados
+        
+        Erros do banco sobem para a rota.
+        
+        Returns:
+            dict: results, total_records, page, limit e show_all
+        """
+        stats_query = StatsQuery(user_id, start_date, end_date, link_id)
+        conditions, params = stats_query.where()
+        where = ' AND '.join(conditions)
+        
+        query = f"""
+            SELECT 
+                rl.id,
+                rl.redirect_time,
+                cl.link_name,
+                cl.id as link_id,
+                wn.phone_number,
+                wn.description as number_description,
+                rl.ip_address,
+                rl.city,
+                rl.region,
+                rl.country,
+                COUNT(*) OVER (PARTITION BY wn.phone_number, cl.id, DATE(rl.redirect_time)) as click_count
+            FROM redirect_logs rl
+            JOIN custom_links cl ON rl.link_id = cl.id
+            JOIN whatsapp_numbers wn ON rl.number_id = wn.id
+            WHERE {where}
+            ORDER BY rl.redirect_time DESC
+            LIMIT %s OFFSET %s
+        """
+        statement = db_adapter.register_statement(f'stats_recent{stats_query.suffix}', query)
+        results = db_adapter.execute_statement(
+            statement.name, params + [limit, (page - 1) * limit], fetch_all=True
+        ) or []
+        
+        # Contagem total para paginação (mesmos filtros)
+        count_query = f"""
+            SELECT COUNT(*) as total
+            FROM redirect_logs rl
+            JOIN custom_links cl ON rl.link_id = cl.id
+            WHERE {where}
+        """
+        statement = db_adapter.register_statement(f'stats_recent_count{stats_query.suffix}', count_query)
+        count = db_adapter.execute_statement(statement.name, params)
+        
+        redirects = []
+        for row in results:
+            redirects.append({
+                'id': row['id'],
+                'redirect_time': row['redirect_time'],
+                'link_name': row['link_name'],
+                'link_id': row['link_id'],
+                'phone_number': row['phone_number'],
+                'number_description': row['number_description'],
+                'ip_address': row['ip_address'],
+                'city': row['city'],
+                'region': row['region'],
+                'country': row['country'],
+                'click_count': row['click_count'],
+                'multiple_clicks': row['click_count'] > 1
+            })
+        
+        return {
+            'results': redirects,
+            'total_records': count['total'] if count else 0,
+            'page': page,
+            'limit': limit,
+            'show_all': False
+        }
+    
+    @staticmethod
+    def get_dashboard_bundle(user_id, start_date, end_date, link_id=None, limit=10, page=1):
+        """
+        Obtém resumo, estatísticas por número, mapa e atividade recente em um
+        único documento, com as seções executadas em paralelo
+        
+        Erros do banco de cada seção vão para `errors` (a seção volta como None).
+        
+        Returns:
+            dict: summary, by_number, map, recent, timings (ms) e errors (se houver)
+        """
+        def by_number():
+            stats = StatsController.get_stats_by_number(user_id, start_date, end_date, link_id, raise_errors=True)
+            # Decimal não é serializável em JSON
+            for stat in stats['number_stats']:
+                if stat['percentage'] is not None:
+                    stat['percentage'] = float(stat['percentage'])
+            return stats
+        
+        return dashboard_bundle.build({
+            'summary': lambda: StatsController.get_stats_summary(
+                user_id, start_date, end_date, link_id, raise_errors=True
+            ),
+            'by_number': by_number,
+            'map': lambda: StatsController.get_stats_map(user_id, start_date, end_date, link_id),
+            'recent': lambda: StatsController.get_recent_redirects(
+                user_id, start_date, end_date, link_id, limit=limit, page=page
+            )
+        })
+
+
+# Consultas fixas do resumo executadas como statements preparados
+db_adapter.register_statement('stats_active_links', """
+    SELECT COUNT(DISTINCT cl.id) as total
+    FROM custom_links cl
+    WHERE cl.user_id = %s AND cl.is_active = 1
+""")
+db_adapter.register_statement('stats_active_numbers', """
+    SELECT COUNT(*) as total
+    FROM whatsapp_numbers
+    WHERE user_id = %s AND is_active = 1
+""")
@@ -1,13 +1,26 @@
 from utils.db_adapter import db_adapter
+from utils.unit_of_work import load_identity, discard_identity, on_commit
+from app.services.link_cache import link_cache
+from app.services.number_pool import number_pool
 import logging
 
 
 class CustomLink:
     """Modelo que representa um link personalizado no sistema"""
     
+    __slots__ = ('id', 'link_name', 'description', 'is_active', 'is_rotating', 'user_id',
+                 'owner_id', 'message_template', 'custom_message', 'click_count',
+                 'balancing_strategy')
+    
+    # Colunas lidas por _from_rows (description, is_rotating e message_template não existem na tabela)
+    FIELDS = ('id', 'link_name', 'is_active', 'user_id', 'custom_message', 'click_count',
+              'balancing_strategy')
+    DEFAULTS = {'click_count': 0}
+    
     def __init__(self, id=None, link_name=None, description=None, is_active=True, 
                  is_rotating=False, user_id=None, owner_id=None, 
-                 message_template=None, custom_message=None, click_count=0):
+                 message_template=None, custom_message=None, click_count=0,
+                 balancing_strategy=None):
         self.id = id
         self.link_name = link_name
         self.description = description
@@ -18,15 +31,15 @@ class CustomLink:
         self.message_template = message_template
         self.custom_message = custom_message
         self.click_count = click_count
+        self.balancing_strategy = balancing_strategy
     
     @staticmethod
     def get_by_id(link_id):
         """Busca um link pelo ID"""
-        result = db_adapter.execute_query(
+        return load_identity(CustomLink, link_id, lambda: CustomLink._from_db_result(db_adapter.execute_query(
             'SELECT * FROM custom_links WHERE id = %s', 
             (link_id,)
-        )
-        return CustomLink._from_db_result(result) if result else None
+        )))
     
     @staticmethod
     def get_by_name(link_name):
@@ -43,9 +56,10 @@ class CustomLink:
         results = db_adapter.execute_query(
             'SELECT * FROM custom_links WHERE user_id = %s', 
             (user_id,),
-            fetch_all=True
+            fetch_all=True,
+            row_format='tuple'
         )
-        return [CustomLink._from_db_result(result) for result in results] if results else []
+        return CustomLink._from_rows(results)
     
     def save(self):
         """Salva um link no banco de dados (cria ou atualiza)"""
@@ -56,7 +70,8 @@ class CustomLink:
                 is_active = %s, 
                 user_id = %s,
                 custom_message = %s,
-                click_count = %s
+                click_count = %s,
+                balancing_strategy = %s
             WHERE id = %s'''
             
             # Converter booleano para inteiro
@@ -65,7 +80,7 @@ class CustomLink:
             params = (
                 self.link_name, is_active_int, 
                 self.user_id, self.custom_message, 
-                self.click_count, self.id
+                self.click_count, self.balancing_strategy, self.id
             )
             
             try:
@@ -74,6 +89,8 @@ class CustomLink:
             except Exception as e:
                 logging.error(f"Erro ao atualizar link: {str(e)}")
                 raise
+            finally:
+                on_commit(lambda: link_cache.invalidate(link_id=self.id, link_name=self.link_name))
         else:
             # Criar novo link
             conn = db_adapter.get_db_connection()
@@ -108,6 +125,7 @@ class CustomLink:
                     self.id = cursor.lastrowid
                 
                 conn.commit()
+                on_commit(lambda: link_cache.invalidate(link_id=self.id, link_name=self.link_name))
                 return self.id
             except Exception as e:
                 conn.rollback()
@@ -145,6 +163,9 @@ class CustomLink:
                 (self.id,),
                 commit=True
             )
+            discard_identity(CustomLink, self.id)
+            on_commit(lambda: link_cache.invalidate(link_id=self.id, link_name=self.link_name))
+            on_commit(lambda: number_pool.invalidate_link(self.id))
             return True
         return False
     
@@ -167,5 +188,20 @@ class CustomLink:
             owner_id=db_result.get('user_id'),  # Usar user_id como fallback
             message_template=None,  # Campo não existe na tabela PostgreSQL
             custom_message=db_result.get('custom_message', None),
-            click_count=db_result.get('click_count', 0)
+            click_count=db_result.get('click_count', 0),
+            balancing_strategy=db_result.get('balancing_strategy')
         )
+    
+    @staticmethod
+    def _from_rows(rows):
+        """Cria instâncias de CustomLink a partir de um resultado em tuplas (RowSet)"""
+        if not rows:
+            return []
+        
+        values = rows.getter(CustomLink.FIELDS, CustomLink.DEFAULTS)
+        links = []
+        for row in rows:
+            id, link_name, is_active, user_id, custom_message, click_count, balancing_strategy = values(row)
+            links.append(CustomLink(id, link_name, '', bool(is_active), False, user_id, user_id,
+                                    None, custom_message, click_count, balancing_strategy))
+        return links
@@ -0,0 +1,59 @@
+from utils.db_adapter import db_adapter
+from utils.unit_of_work import on_commit
+from app.services.number_pool import number_pool
+
+
+class LinkNumber:
+    """Modelo que representa a atribuição de um número de WhatsApp a um link"""
+    
+    @staticmethod
+    def get_number_ids(link_id):
+        """Retorna os IDs dos números atribuídos a um link"""
+        results = db_adapter.execute_query(
+            'SELECT number_id FROM link_numbers WHERE link_id = %s ORDER BY number_id',
+            (link_id,),
+            fetch_all=True
+        )
+        return [row['number_id'] for row in results] if results else []
+    
+    @staticmethod
+    def replace(link_id, number_ids):
+        """Substitui todos os números atribuídos a um link"""
+        conn = db_adapter.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM link_numbers WHERE link_id = %s', (link_id,))
+            for number_id in number_ids:
+                cursor.execute(
+                    'INSERT INTO link_numbers (link_id, number_id) VALUES (%s, %s)',
+                    (link_id, number_id)
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+            on_commit(lambda: number_pool.invalidate_link(link_id))
+    
+    @staticmethod
+    def add(link_id, number_id):
+        """Atribui um número a um link"""
+        db_adapter.execute_query(
+            '''INSERT INTO link_numbers (link_id, number_id) VALUES (%s, %s)
+            ON CONFLICT (link_id, number_id) DO NOTHING''',
+            (link_id, number_id),
+            commit=True
+        )
+        on_commit(lambda: number_pool.invalidate_link(link_id))
+    
+    @staticmethod
+    def remove(link_id, number_id):
+        """Remove a atribuição de um número a um link"""
+        removed = db_adapter.execute_query(
+            'DELETE FROM link_numbers WHERE link_id = %s AND number_id = %s',
+            (link_id, number_id),
+            commit=True
+        )
+        on_commit(lambda: number_pool.invalidate_link(link_id))
+        return bool(removed)
@@ -1,4 +1,5 @@
 from utils.db_adapter import db_adapter
+from utils.unit_of_work import load_identity
 from datetime import datetime
 import logging
 
@@ -6,6 +7,12 @@ import logging
 class RedirectLog:
     """Modelo que representa um log de redirecionamento no sistema"""
     
+    __slots__ = ('id', 'link_id', 'number_id', 'timestamp', 'ip_address', 'user_agent',
+                 'message', 'city', 'region', 'country', 'latitude', 'longitude')
+    
+    # Colunas lidas por _from_rows, na ordem do construtor
+    FIELDS = __slots__
+    
     def __init__(self, id=None, link_id=None, number_id=None, timestamp=None,
                  ip_address=None, user_agent=None, message=None, city=None,
                  region=None, country=None, latitude=None, longitude=None):
@@ -25,11 +32,10 @@ class RedirectLog:
     @staticmethod
     def get_by_id(log_id):
         """Busca um log pelo ID"""
-        result = db_adapter.execute_query(
+        return load_identity(RedirectLog, log_id, lambda: RedirectLog._from_db_result(db_adapter.execute_query(
             'SELECT * FROM redirect_logs WHERE id = %s', 
             (log_id,)
-        )
-        return RedirectLog._from_db_result(result) if result else None
+        )))
     
     @staticmethod
     def get_by_link(link_id, limit=100):
@@ -37,9 +43,10 @@ class RedirectLog:
         results = db_adapter.execute_query(
             'SELECT * FROM redirect_logs WHERE link_id = %s ORDER BY timestamp DESC LIMIT %s', 
             (link_id, limit),
-            fetch_all=True
+            fetch_all=True,
+            row_format='tuple'
         )
-        return [RedirectLog._from_db_result(result) for result in results] if results else []
+        return RedirectLog._from_rows(results)
     
     @staticmethod
     def get_by_number(number_id, limit=100):
@@ -47,9 +54,10 @@ class RedirectLog:
         results = db_adapter.execute_query(
             'SELECT * FROM redirect_logs WHERE number_id = %s ORDER BY timestamp DESC LIMIT %s', 
             (number_id, limit),
-            fetch_all=True
+            fetch_all=True,
+            row_format='tuple'
         )
-        return [RedirectLog._from_db_result(result) for result in results] if results else []
+        return RedirectLog._from_rows(results)
     
     @staticmethod
     def get_recent_by_user(user_id, limit=10):
@@ -62,8 +70,8 @@ class RedirectLog:
             ORDER BY rl.timestamp DESC
             LIMIT %s
         '''
-        results = db_adapter.execute_query(query, (user_id, limit), fetch_all=True)
-        return [RedirectLog._from_db_result(result) for result in results] if results else []
+        results = db_adapter.execute_query(query, (user_id, limit), fetch_all=True, row_format='tuple')
+        return RedirectLog._from_rows(results)
     
     def save(self):
         """Salva um log no banco de dados (cria ou atualiza)"""
@@ -193,3 +201,12 @@ class RedirectLog:
             latitude=db_result.get('latitude', None),
             longitude=db_result.get('longitude', None)
         )
+    
+    @staticmethod
+    def _from_rows(rows):
+        """Cria instâncias de RedirectLog a partir de um resultado em tuplas (RowSet)"""
+        if not rows:
+            return []
+        
+        values = rows.getter(RedirectLog.FIELDS)
+        return [RedirectLog(*values(row)) for row in rows]
@@ -1,25 +1,29 @@
 from utils.db_adapter import db_adapter
+from utils.unit_of_work import load_identity
 from werkzeug.security import generate_password_hash, check_password_hash
 
 
 class User:
     """Modelo que representa um usuário do sistema"""
     
-    def __init__(self, id=None, username=None, password=None, plan_id=None, is_admin=False):
+    __slots__ = ('id', 'username', 'password', 'plan_id', 'is_admin', 'balancing_strategy')
+    
+    def __init__(self, id=None, username=None, password=None, plan_id=None, is_admin=False,
+                 balancing_strategy=None):
         self.id = id
         self.username = username
         self.password = password
         self.plan_id = plan_id
         self.is_admin = is_admin
+        self.balancing_strategy = balancing_strategy
     
     @staticmethod
     def get_by_id(user_id):
         """Busca um usuário pelo ID"""
-        result = db_adapter.execute_query(
+        return load_identity(User, user_id, lambda: User._from_db_result(db_adapter.execute_query(
             'SELECT * FROM users WHERE id = %s', 
             (user_id,)
-        )
-        return User._from_db_result(result) if result else None
+        )))
     
     @staticmethod
     def get_by_username(username):
@@ -47,9 +51,11 @@ class User:
                     username = %s, 
                     password = %s, 
                     plan_id = %s, 
-                    is_admin = %s 
+                    is_admin = %s,
+                    balancing_strategy = %s
                 WHERE id = %s''',
-                (self.username, self.password, self.plan_id, self.is_admin, self.id),
+                (self.username, self.password, self.plan_id, self.is_admin,
+                 self.balancing_strategy, self.id),
                 commit=True
             )
             return self.id
@@ -90,11 +96,10 @@ class User:
     
     def get_plan(self):
         """Retorna o plano do usuário"""
-        result = db_adapter.execute_query(
+        return load_identity('plans', self.plan_id, lambda: db_adapter.execute_query(
             'SELECT * FROM plans WHERE id = %s', 
             (self.plan_id,)
-        )
-        return result if result else None
+        ) or None)
     
     def get_numbers(self):
         """Retorna os números de WhatsApp do usuário"""
@@ -123,5 +128,6 @@ class User:
             username=db_result['username'],
             password=db_result['password'],
             plan_id=db_result['plan_id'],
-            is_admin=db_result['is_admin']
+            is_admin=db_result['is_admin'],
+            balancing_strategy=db_result.get('balancing_strategy')
         )
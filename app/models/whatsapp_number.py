@@ -1,26 +1,37 @@
 from utils.db_adapter import db_adapter
+from utils.unit_of_work import load_identity, discard_identity, on_commit
+from app.services.number_pool import number_pool
 
 
 class WhatsAppNumber:
     """Modelo que representa um número de WhatsApp no sistema"""
     
+    __slots__ = ('id', 'phone_number', 'description', 'is_active', 'user_id',
+                 'redirect_count', 'weight', 'capacity')
+    
+    # Colunas lidas por _from_rows, na ordem do construtor
+    FIELDS = __slots__
+    DEFAULTS = {'description': '', 'redirect_count': 0}
+    
     def __init__(self, id=None, phone_number=None, description=None, 
-                 is_active=True, user_id=None, redirect_count=0):
+                 is_active=True, user_id=None, redirect_count=0,
+                 weight=1, capacity=None):
         self.id = id
         self.phone_number = phone_number
         self.description = description
         self.is_active = is_active
         self.user_id = user_id
         self.redirect_count = redirect_count
+        self.weight = weight
+        self.capacity = capacity
     
     @staticmethod
     def get_by_id(number_id):
         """Busca um número pelo ID"""
-        result = db_adapter.execute_query(
+        return load_identity(WhatsAppNumber, number_id, lambda: WhatsAppNumber._from_db_result(db_adapter.execute_query(
             'SELECT * FROM whatsapp_numbers WHERE id = %s', 
             (number_id,)
-        )
-        return WhatsAppNumber._from_db_result(result) if result else None
+        )))
     
     @staticmethod
     def get_active_by_user(user_id):
@@ -28,9 +39,10 @@ class WhatsAppNumber:
         results = db_adapter.execute_query(
             'SELECT * FROM whatsapp_numbers WHERE user_id = %s AND is_active = %s', 
             (user_id, 1),
-            fetch_all=True
+            fetch_all=True,
+            row_format='tuple'
         )
-        return [WhatsAppNumber._from_db_result(result) for result in results] if results else []
+        return WhatsAppNumber._from_rows(results)
     
     @staticmethod
     def get_by_phone(phone_number, user_id=None):
@@ -58,12 +70,17 @@ class WhatsAppNumber:
                     description = %s, 
                     is_active = %s, 
                     user_id = %s,
-                    redirect_count = %s
+                    redirect_count = %s,
+                    weight = %s,
+                    capacity = %s
                 WHERE id = %s''',
                 (self.phone_number, self.description, is_active_int, 
-                 self.user_id, self.redirect_count, self.id),
+                 self.user_id, self.redirect_count, self.weight,
+                 self.capacity, self.id),
                 commit=True
             )
+            # Ativação, peso e capacidade afetam os números elegíveis dos links
+            on_commit(lambda: number_pool.invalidate_user(self.user_id))
             return self.id
         else:
             # Criar novo número
@@ -92,6 +109,7 @@ class WhatsAppNumber:
                     self.id = cursor.lastrowid
                 
                 conn.commit()
+                on_commit(lambda: number_pool.invalidate_user(self.user_id))
                 return self.id
             finally:
                 conn.close()
@@ -119,6 +137,8 @@ class WhatsAppNumber:
                 (self.id,),
                 commit=True
             )
+            discard_identity(WhatsAppNumber, self.id)
+            on_commit(lambda: number_pool.invalidate_user(self.user_id))
             return True
         return False
     
@@ -137,5 +157,21 @@ class WhatsAppNumber:
             description=db_result.get('description', ''),
             is_active=is_active_bool,
             user_id=db_result['user_id'],
-            redirect_count=db_result.get('redirect_count', 0)
+            redirect_count=db_result.get('redirect_count', 0),
+            weight=db_result.get('weight') or 1,
+            capacity=db_result.get('capacity')
         )
+    
+    @staticmethod
+    def _from_rows(rows):
+        """Cria instâncias de WhatsAppNumber a partir de um resultado em tuplas (RowSet)"""
+        if not rows:
+            return []
+        
+        values = rows.getter(WhatsAppNumber.FIELDS, WhatsAppNumber.DEFAULTS)
+        numbers = []
+        for row in rows:
+            id, phone_number, description, is_active, user_id, redirect_count, weight, capacity = values(row)
+            numbers.append(WhatsAppNumber(id, phone_number, description, bool(is_active), user_id,
+                                          redirect_count, weight or 1, capacity))
+        return numbers
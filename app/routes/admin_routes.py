@@ -1,11 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
 from app.controllers.number_controller import NumberController
 from app.controllers.link_controller import LinkController
-from app.services.analytics import AnalyticsService
 from app.routes.auth_routes import login_required
 from app.models.user import User
 import logging
 from utils.db_adapter import db_adapter
+from utils.query_profiler import query_profiler
 
 
 # Criar blueprint para rotas administrativas
@@ -288,42 +288,42 @@ def admin_backup():
 def admin_usuarios():
     """Rota para a página de administração de usuários"""
     try:
-        conn = db_adapter.get_db_connection()
-        cursor = conn.cursor()
+        with db_adapter.read_connection() as conn:
+            cursor = conn.cursor()
         
-        # Buscar todos os usuários
-        cursor.execute("""
-            SELECT u.id, u.username, u.fullname, u.created_at, u.plan_id, u.is_admin
-            FROM users u
-            ORDER BY u.id ASC
-        """)
-        users = cursor.fetchall()
+            # Buscar todos os usuários
+            cursor.execute("""
+                SELECT u.id, u.username, u.fullname, u.created_at, u.plan_id, u.is_admin
+                FROM users u
+                ORDER BY u.id ASC
+            """)
+            users = cursor.fetchall()
         
-        # Buscar informações dos planos
-        cursor.execute("SELECT * FROM plans")
-        plans = cursor.fetchall()
+            # Buscar informações dos planos
+            cursor.execute("SELECT * FROM plans")
+            plans = cursor.fetchall()
         
-        # Criar mapa de planos por ID
-        plans_map = {plan['id']: plan for plan in plans}
+            # Criar mapa de planos por ID
+            plans_map = {plan['id']: plan for plan in plans}
         
-        # Buscar contagem de links e números por usuário
-        cursor.execute("""
-            SELECT 
-                user_id, 
-                COUNT(*) as link_count 
-            FROM custom_links 
-            GROUP BY user_id
-        """)
-        link_counts = {row['user_id']: row['link_count'] for row in cursor.fetchall()}
+            # Buscar contagem de links e números por usuário
+            cursor.execute("""
+                SELECT 
+                    user_id, 
+                    COUNT(*) as link_count 
+                FROM custom_links 
+                GROUP BY user_id
+            """)
+            link_counts = {row['user_id']: row['link_count'] for row in cursor.fetchall()}
         
-        cursor.execute("""
-            SELECT 
-                user_id, 
-                COUNT(*) as number_count 
-            FROM whatsapp_numbers 
-            GROUP BY user_id
-        """)
-        number_counts = {row['user_id']: row['number_count'] for row in cursor.fetchall()}
+            cursor.execute("""
+                SELECT 
+                    user_id, 
+                    COUNT(*) as number_count 
+                FROM whatsapp_numbers 
+                GROUP BY user_id
+            """)
+            number_counts = {row['user_id']: row['number_count'] for row in cursor.fetchall()}
         
         # Associar planos aos usuários
         user_plans = {}
@@ -381,69 +381,36 @@ def backup_db_secret():
     return redirect(url_for('admin.dashboard'))
 
 
-def fix_database_schema():
-    """Verifica e corrige o esquema do banco de dados."""
-    try:
-        conn = db_adapter.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Verificar se a tabela whatsapp_numbers existe
-        cursor.execute("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'whatsapp_numbers')")
-        if not cursor.fetchone()[0]:
-            print("Tabela whatsapp_numbers não existe. Criando tabela...")
-            cursor.execute("""
-                CREATE TABLE whatsapp_numbers (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER REFERENCES users(id),
-                    number VARCHAR(255) NOT NULL,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.commit()
-            print("Tabela whatsapp_numbers criada com sucesso!")
-        else:
-            # Verificar se a coluna is_active existe e seu tipo
-            cursor.execute("SELECT data_type FROM information_schema.columns WHERE table_name = 'whatsapp_numbers' AND column_name = 'is_active'")
-            result = cursor.fetchone()
-            if result:
-                current_type = result[0]
-                print(f"Coluna is_active existe com tipo: {current_type}")
-                
-                if current_type != 'boolean':
-                    print("Atualizando valor padrão para NULLs na coluna is_active...")
-                    # Primeiro atualiza valores NULL para 1 (true)
-                    cursor.execute("UPDATE whatsapp_numbers SET is_active = 1 WHERE is_active IS NULL")
-                    conn.commit()
-                    
-                    print("Alterando tipo da coluna is_active para boolean...")
-                    # Depois altera o tipo com USING para garantir a conversão segura
-                    cursor.execute("""
-                        ALTER TABLE whatsapp_numbers 
-                        ALTER COLUMN is_active TYPE boolean 
-                        USING CASE WHEN is_active = 0 THEN false ELSE true END
-                    """)
-                    conn.commit()
-                    print("Coluna is_active alterada para boolean com sucesso!")
-                    
-                    # Define o valor padrão após a conversão
-                    cursor.execute("ALTER TABLE whatsapp_numbers ALTER COLUMN is_active SET DEFAULT true")
-                    conn.commit()
-                    print("Valor padrão da coluna is_active definido como TRUE")
-            else:
-                # Se a coluna não existe, adicioná-la
-                print("Adicionando coluna is_active à tabela whatsapp_numbers...")
-                cursor.execute("ALTER TABLE whatsapp_numbers ADD COLUMN is_active BOOLEAN DEFAULT TRUE")
-                conn.commit()
-                print("Coluna is_active adicionada com sucesso!")
-        
-        # Verificação para custom_links
-        # ... rest of the function
-        
-        conn.close()
-    except Exception as e:
-        logging.error(f"Erro ao corrigir esquema do banco de dados: {str(e)}")
-        # Continue normalmente mesmo com erro
+@admin_bp.route('/debug/queries')
+@login_required
+def debug_queries():
+    """Página com as consultas e endpoints de maior custo no banco (processo atual)"""
+    if session.get('username') != 'felipe':
+        flash('Acesso restrito ao administrador.', 'danger')
+        return redirect(url_for('admin.dashboard'))
+    
+    order_by = request.args.get('order_by', 'total_ms')
+    if order_by not in ('total_ms', 'max_ms', 'calls', 'rows', 'slow'):
+        order_by = 'total_ms'
+    
+    return render_template(
+        'admin/debug_queries.html',
+        order_by=order_by,
+        stats=query_profiler.stats(),
+        statements=query_profiler.top_statements(limit=50, order_by=order_by),
+        endpoints=query_profiler.top_endpoints(limit=50),
+        slow_queries=query_profiler.slow_queries()
+    )
+
 
-# Executar a correção no momento da importação deste módulo
-fix_database_schema()
+@admin_bp.route('/debug/queries/reset', methods=['POST'])
+@login_required
+def reset_debug_queries():
+    """Zera as estatísticas de consultas do processo atual"""
+    if session.get('username') != 'felipe':
+        flash('Acesso restrito ao administrador.', 'danger')
+        return redirect(url_for('admin.dashboard'))
+    
+    query_profiler.reset()
+    flash('Estatísticas de consultas zeradas.', 'success')
+    return redirect(url_for('admin.debug_queries'))
@@ -1,10 +1,25 @@
-from flask import Blueprint, request, jsonify, session
+import io
+import csv
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context, current_app
 from app.controllers.stats_controller import StatsController
 from app.controllers.number_controller import NumberController
 from app.controllers.link_controller import LinkController
 from app.routes.auth_routes import login_required
+from app.services.link_cache import link_cache
+from app.services.number_pool import number_pool
+from app.services.redirect_targets import redirect_targets
+from app.services.geo_worker import geo_enrichment
+from app.services.geo_cache import geo_cache
+from app.services.click_pipeline import click_pipeline
+from app.services.rollups import stats_rollups
+from app.services.stats_query import StatsQuery
+from app.services.dashboard_bundle import dashboard_bundle
+from app.services.balancer import NumberBalancer
+from app.models.user import User
 import logging
 from utils.db_adapter import db_adapter
+from utils.query_profiler import query_profiler
+from utils.read_replica import replica_reads
 
 # Criar blueprint para a API
 api_bp = Blueprint('api', __name__, url_prefix='/api')
@@ -68,10 +83,12 @@ def manage_number_by_id(number_id):
         data = request.json
         description = data.get('description')
         is_active = data.get('is_active')
+        weight = data.get('weight')
+        capacity = data.get('capacity')
         
         # Chamar o controller para atualizar o número
         updated_number, error = NumberController.update_number(
-            number_id, user_id, description, is_active
+            number_id, user_id, description, is_active, weight, capacity
         )
         
         if updated_number:
@@ -138,6 +155,7 @@ def manage_links():
         'custom_message': link.custom_message,
         'is_active': link.is_active,
         'click_count': link.click_count,
+        'balancing_strategy': link.balancing_strategy,
         'prefix': link.prefix if hasattr(link, 'prefix') else 0,
         'user_id': user_id
     } for link in links])
@@ -162,10 +180,11 @@ def manage_link_by_id(link_id):
         data = request.json
         message = data.get('custom_message')
         is_active = data.get('is_active')
+        balancing_strategy = data.get('balancing_strategy')
         
         # Chamar o controller para atualizar o link
         updated_link, error = LinkController.update_link(
-            link_id, user_id, message, is_active
+            link_id, user_id, message, is_active, balancing_strategy
         )
         
         if updated_link:
@@ -175,6 +194,81 @@ def manage_link_by_id(link_id):
     
     return jsonify({'success': False, 'error': 'Método não permitido'}), 405
 
+@api_bp.route('/links/<int:link_id>/numbers', methods=['GET', 'PUT', 'POST'])
+@login_required
+def manage_link_numbers(link_id):
+    """API para listar, substituir e adicionar números atribuídos a um link"""
+    user_id = session.get('user_id')
+    
+    if request.method == 'PUT':
+        data = request.json or {}
+        number_ids, error = LinkController.set_link_numbers(link_id, user_id, data.get('number_ids', []))
+        
+        if number_ids is not None:
+            return jsonify({'success': True, 'message': 'Números do link atualizados com sucesso', 'number_ids': number_ids})
+        else:
+            return jsonify({'success': False, 'error': error}), 400
+    
+    if request.method == 'POST':
+        data = request.json or {}
+        success, error = LinkController.add_link_number(link_id, user_id, data.get('number_id'))
+        
+        if success:
+            return jsonify({'success': True, 'message': 'Número atribuído ao link com sucesso'})
+        else:
+            return jsonify({'success': False, 'error': error}), 400
+    
+    # GET - Listar números atribuídos ao link
+    number_ids, error = LinkController.get_link_numbers(link_id, user_id)
+    
+    if number_ids is None:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    return jsonify({
+        'success': True,
+        'number_ids': number_ids,
+        # Sem atribuições, o link usa todos os números ativos do usuário
+        'uses_all_numbers': not number_ids
+    })
+
+@api_bp.route('/links/<int:link_id>/numbers/<int:number_id>', methods=['DELETE'])
+@login_required
+def remove_link_number(link_id, number_id):
+    """API para remover um número de um link"""
+    user_id = session.get('user_id')
+    
+    success, error = LinkController.remove_link_number(link_id, user_id, number_id)
+    
+    if success:
+        return jsonify({'success': True, 'message': 'Número removido do link com sucesso'})
+    else:
+        return jsonify({'success': False, 'error': error}), 400
+
+@api_bp.route('/balancing', methods=['GET', 'PUT'])
+@login_required
+def manage_balancing():
+    """API para consultar e definir a estratégia de balanceamento padrão do usuário"""
+    user_id = session.get('user_id')
+    
+    if request.method == 'PUT':
+        data = request.json or {}
+        user, error = LinkController.update_balancing_strategy(user_id, data.get('balancing_strategy'))
+        
+        if user:
+            return jsonify({'success': True, 'message': 'Estratégia de balanceamento atualizada com sucesso'})
+        else:
+            return jsonify({'success': False, 'error': error}), 400
+    
+    # GET - Estratégia atual e estratégias disponíveis
+    user = User.get_by_id(user_id)
+    
+    return jsonify({
+        'success': True,
+        'balancing_strategy': user.balancing_strategy if user else None,
+        'default_strategy': NumberBalancer.DEFAULT_STRATEGY,
+        'strategies': NumberBalancer.available_strategies()
+    })
+
 @api_bp.route('/stats/by-number')
 @login_required
 def get_stats_by_number():
@@ -236,98 +330,37 @@ def get_stats_map():
         # Converter link_id para int se for fornecido
         link_id_param = int(link_id) if link_id and link_id != 'all' else None
         
-        conn = db_adapter.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Consulta para obter pontos de localização para o mapa de calor
-        query = """
-            SELECT 
-                rl.latitude, 
-                rl.longitude, 
-                COUNT(*) as access_count,
-                COALESCE(rl.city, '') || ', ' || COALESCE(rl.region, '') || ', ' || COALESCE(rl.country, '') as name
-            FROM redirect_logs rl
-            JOIN custom_links cl ON rl.link_id = cl.id
-            WHERE cl.user_id = %s
-            AND rl.latitude IS NOT NULL
-            AND rl.longitude IS NOT NULL
-        """
-        
-        params = [user_id]
-        
-        # Adicionar filtros de data
-        if start_date and end_date:
-            query += " AND rl.redirect_time::date BETWEEN %s::date AND %s::date"
-            params.extend([start_date, end_date])
-        
-        # Adicionar filtro de link específico
-        if link_id_param:
-            query += " AND cl.id = %s"
-            params.append(link_id_param)
-        
-        # Agrupar por coordenadas e localização
-        query += " GROUP BY rl.latitude, rl.longitude, name"
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        
-        # Formatar os resultados para JSON
-        map_points = []
-        for row in results:
-            if row['latitude'] and row['longitude']:
-                map_points.append({
-                    'lat': float(row['latitude']),
-                    'lng': float(row['longitude']),
-                    'count': row['access_count'],
-                    'name': row['name']
-                })
-        
-        # Consulta para obter dados de distribuição geográfica
-        geo_query = """
-            SELECT 
-                rl.country,
-                COUNT(*) as access_count
-            FROM redirect_logs rl
-            JOIN custom_links cl ON rl.link_id = cl.id
-            WHERE cl.user_id = %s
-            AND rl.country IS NOT NULL
-        """
-        
-        geo_params = [user_id]
-        
-        # Adicionar filtros de data
-        if start_date and end_date:
-            geo_query += " AND rl.redirect_time::date BETWEEN %s::date AND %s::date"
-            geo_params.extend([start_date, end_date])
-        
-        # Adicionar filtro de link específico
-        if link_id_param:
-            geo_query += " AND cl.id = %s"
-            geo_params.append(link_id_param)
-        
-        # Agrupar por país e ordenar
-        geo_query += " GROUP BY rl.country ORDER BY access_count DESC"
-        
-        cursor.execute(geo_query, geo_params)
-        geo_results = cursor.fetchall()
-        
-        # Formatar dados geográficos
-        countries = []
-        for row in geo_results:
-            countries.append({
-                'country': row['country'],
-                'count': row['access_count']
-            })
-        
-        return jsonify({
-            'locations': map_points,
-            'countries': countries
-        })
+        return jsonify(StatsController.get_stats_map(user_id, start_date, end_date, link_id_param))
         
     except Exception as e:
         logging.error(f"Erro ao obter dados de mapa: {str(e)}")
         return jsonify({'error': f'Erro ao processar dados de mapa: {str(e)}'}), 500
 
+@api_bp.route('/dashboard/bundle')
+@login_required
+def get_dashboard_bundle():
+    """API para obter todas as seções do dashboard em uma única requisição"""
+    user_id = session.get('user_id')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    link_id = request.args.get('link_id')
+    limit = int(request.args.get('limit', 10))
+    page = int(request.args.get('page', 1))
+    
+    if not start_date or not end_date:
+        return jsonify({'error': 'Datas de início e fim são obrigatórias'}), 400
+    
+    try:
+        # Converter link_id para int se for fornecido
+        link_id_param = int(link_id) if link_id and link_id != 'all' else None
+        
+        return jsonify(StatsController.get_dashboard_bundle(
+            user_id, start_date, end_date, link_id_param, limit=limit, page=page
+        ))
+    except Exception as e:
+        logging.error(f"Erro ao obter dados do dashboard: {str(e)}")
+        return jsonify({'error': f'Erro ao processar dados do dashboard: {str(e)}'}), 500
+
 @api_bp.route('/redirects/recent')
 @login_required
 def get_recent_redirects():
@@ -340,105 +373,115 @@ def get_recent_redirects():
     page = int(request.args.get('page', 1))
     
     try:
-        offset = (page - 1) * limit
-        
         # Converter link_id para int se for fornecido
         link_id_param = int(link_id) if link_id and link_id != 'all' else None
         
-        conn = db_adapter.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Construir a consulta base
-        query = """
-            SELECT 
-                rl.id,
-                rl.redirect_time,
-                cl.link_name,
-                cl.id as link_id,
-                wn.phone_number,
-                wn.description as number_description,
-                rl.ip_address,
-                rl.city,
-                rl.region,
-                rl.country,
-                COUNT(*) OVER (PARTITION BY wn.phone_number, cl.id, DATE(rl.redirect_time)) as click_count
-            FROM redirect_logs rl
-            JOIN custom_links cl ON rl.link_id = cl.id
-            JOIN whatsapp_numbers wn ON rl.number_id = wn.id
-            WHERE cl.user_id = %s
-        """
-        
-        params = [user_id]
-        
-        # Adicionar filtros de data
-        if start_date and end_date:
-            query += " AND rl.redirect_time::date BETWEEN %s::date AND %s::date"
-            params.extend([start_date, end_date])
-        
-        # Adicionar filtro de link específico
-        if link_id_param:
-            query += " AND cl.id = %s"
-            params.append(link_id_param)
-        
-        # Adicionar ordenação e limite
-        query += " ORDER BY rl.redirect_time DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        
-        # Obter contagem total para paginação
-        count_query = """
-            SELECT COUNT(*) as total
-            FROM redirect_logs rl
-            JOIN custom_links cl ON rl.link_id = cl.id
-            WHERE cl.user_id = %s
-        """
-        
-        count_params = [user_id]
-        
-        if start_date and end_date:
-            count_query += " AND rl.redirect_time::date BETWEEN %s::date AND %s::date"
-            count_params.extend([start_date, end_date])
-        
-        if link_id_param:
-            count_query += " AND cl.id = %s"
-            count_params.append(link_id_param)
-        
-        cursor.execute(count_query, count_params)
-        total_count = cursor.fetchone()['total']
-        
-        # Formatar os resultados para JSON
-        redirects = []
-        for row in results:
-            multiple_clicks = row['click_count'] > 1
-            redirects.append({
-                'id': row['id'],
-                'redirect_time': row['redirect_time'],
-                'link_name': row['link_name'],
-                'link_id': row['link_id'],
-                'phone_number': row['phone_number'],
-                'number_description': row['number_description'],
-                'ip_address': row['ip_address'],
-                'city': row['city'],
-                'region': row['region'],
-                'country': row['country'],
-                'click_count': row['click_count'],
-                'multiple_clicks': multiple_clicks
-            })
-        
-        return jsonify({
-            'results': redirects,
-            'total_records': total_count,
-            'page': page,
-            'limit': limit,
-            'show_all': False
-        })
+        return jsonify(StatsController.get_recent_redirects(
+            user_id, start_date, end_date, link_id_param, limit=limit, page=page
+        ))
         
     except Exception as e:
         logging.error(f"Erro ao obter redirecionamentos recentes: {str(e)}")
         return jsonify({'error': f'Erro ao processar redirecionamentos: {str(e)}'}), 500
 
+@api_bp.route('/redirects/export')
+@login_required
+def export_redirects():
+    """Exporta o histórico de redirecionamentos em CSV, transmitido em partes"""
+    user_id = session.get('user_id')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    link_id = request.args.get('link_id')
+    
+    # O administrador pode exportar o histórico de outro usuário
+    if request.args.get('user_id') and session.get('username') == 'felipe':
+        user_id = int(request.args.get('user_id'))
+    
+    query = """
+        SELECT 
+            rl.id,
+            rl.redirect_time,
+            cl.link_name,
+            wn.phone_number,
+            rl.ip_address,
+            rl.city,
+            rl.region,
+            rl.country,
+            rl.user_agent
+        FROM redirect_logs rl
+        JOIN custom_links cl ON rl.link_id = cl.id
+        JOIN whatsapp_numbers wn ON rl.number_id = wn.id
+        WHERE {where}
+        ORDER BY rl.redirect_time
+    """
+    conditions, params = StatsQuery(user_id, start_date, end_date, link_id).where()
+    query = query.format(where=' AND '.join(conditions))
+    
+    columns = ['id', 'redirect_time', 'link_name', 'phone_number', 'ip_address',
+               'city', 'region', 'country', 'user_agent']
+    
+    # Relatório: leitura na réplica, em partes (sem carregar o histórico inteiro em memória)
+    with replica_reads():
+        rows = db_adapter.stream_query(query, params, row_format='tuple')
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        try:
+            for row in rows:
+                # Tuplas na ordem de `columns`, escritas sem conversão
+                writer.writerow(row)
+                # Enviar em blocos de ~64 KB
+                if buffer.tell() >= 65536:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        except Exception as e:
+            # Os cabeçalhos já foram enviados: interromper a transferência
+            logging.error(f"Erro ao exportar redirecionamentos: {str(e)}")
+            raise
+        finally:
+            # Cliente desconectado no meio do download: devolver a conexão imediatamente
+            rows.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=redirecionamentos.csv'}
+    )
+
+@api_bp.route('/metrics')
+@login_required
+def get_metrics():
+    """API para obter métricas internas do processo (caches, filas)"""
+    # Verificar se o usuário logado é administrador
+    if session.get('username') != 'felipe':
+        return jsonify({'success': False, 'error': 'Acesso restrito ao administrador.'}), 403
+    
+    # Importados apenas aqui: asyncio/asyncpg e a base de IPs não entram no boot dos workers
+    from app.services.async_redirect import async_redirects
+    from utils.geo_ipdb import ip_database
+    
+    return jsonify({
+        'startup_ms': current_app.config.get('STARTUP_TIME_MS'),
+        'link_cache': link_cache.stats(),
+        'number_pool': number_pool.stats(),
+        'redirect_targets': redirect_targets.stats(),
+        'click_pipeline': click_pipeline.stats(),
+        'stats_rollups': stats_rollups.stats(),
+        'dashboard_bundle': dashboard_bundle.stats(),
+        'async_redirects': async_redirects.stats(),
+        'geo_enrichment': geo_enrichment.stats(),
+        'geoip_database': ip_database.stats(),
+        'geo_cache': geo_cache.stats(),
+        'db_pool': db_adapter.pool.stats() if db_adapter.pool else None,
+        'prepared_statements': db_adapter.statement_stats(),
+        'read_replica': db_adapter.replica.stats() if db_adapter.replica else None,
+        'queries': query_profiler.stats()
+    })
+
 @api_bp.route('/usuarios/<int:user_id>', methods=['DELETE'])
 @login_required
 def delete_user(user_id):
@@ -473,7 +516,9 @@ def delete_user(user_id):
                     SELECT id FROM custom_links WHERE user_id = %s
                 )
             ''', (user_id,))
-            
+            cursor.execute('DELETE FROM redirect_stats_hourly WHERE user_id = %s', (user_id,))
+            cursor.execute('DELETE FROM redirect_stats_daily WHERE user_id = %s', (user_id,))
+
             # 2. Excluir links do usuário
             cursor.execute('DELETE FROM custom_links WHERE user_id = %s', (user_id,))
             
@@ -486,6 +531,10 @@ def delete_user(user_id):
             # Commit da transação
             conn.commit()
             
+            # Os links removidos não devem continuar resolvendo a partir do cache
+            link_cache.clear()
+            number_pool.clear()
+            
             # Registrar no log
             logging.info(f"Usuário {username} (ID: {user_id}) excluído pelo administrador {session.get('username')}")
             
@@ -1,6 +1,6 @@
 from flask import Blueprint, redirect, request, abort
 from app.controllers.redirect_controller import RedirectController
-from utils.db_adapter import db_adapter
+from app.services.link_cache import link_cache
 import logging
 
 
@@ -68,33 +68,26 @@ def redirect_with_prefix(prefix, link_name):
         # Registrar a tentativa de redirecionamento
         logging.info(f"Tentativa de redirecionamento para link com prefixo: {prefix}/{link_name} | IP: {client_ip}")
         
-        # Buscar link específico do usuário (user_id)
-        conn = db_adapter.get_db_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM custom_links WHERE link_name = %s AND user_id = %s', 
-                        (link_name, user_id))
-            link = cursor.fetchone()
-            
-            if not link:
-                logging.warning(f"Link não encontrado para usuário específico: {prefix}/{link_name}")
-                abort(404, description="Link não encontrado para este usuário.")
-                
-            # Processar o redirecionamento usando o link encontrado
-            redirect_url, error = RedirectController.redirect_whatsapp_with_link(
-                link,
-                client_ip=client_ip, 
-                user_agent=user_agent
-            )
+        # Buscar link específico do usuário (user_id), usando o cache de links
+        link = link_cache.get_by_user_and_name(user_id, link_name)
+        
+        if not link:
+            logging.warning(f"Link não encontrado para usuário específico: {prefix}/{link_name}")
+            abort(404, description="Link não encontrado para este usuário.")
             
-            if redirect_url:
-                logging.info(f"Redirecionando para: {redirect_url}")
-                return redirect(redirect_url)
-            else:
-                logging.warning(f"Falha no redirecionamento para {prefix}/{link_name}: {error}")
-                abort(404, description=error)
-        finally:
-            conn.close()
+        # Processar o redirecionamento usando o link encontrado
+        redirect_url, error = RedirectController.redirect_whatsapp_with_link(
+            link,
+            client_ip=client_ip, 
+            user_agent=user_agent
+        )
+        
+        if redirect_url:
+            logging.info(f"Redirecionando para: {redirect_url}")
+            return redirect(redirect_url)
+        else:
+            logging.warning(f"Falha no redirecionamento para {prefix}/{link_name}: {error}")
+            abort(404, description=error)
             
     except Exception as e:
         logging.error(f"Erro no redirecionamento para {prefix}/{link_name}: {str(e)}")
@@ -108,6 +101,20 @@ def get_real_client_ip(request):
     Args:
         request: Objeto de requisição Flask
         
+    Returns:
+        str: Endereço IP real do cliente
+    """
+    return client_ip_from_headers(request.headers.get, request.remote_addr)
+
+
+def client_ip_from_headers(get_header, remote_addr):
+    """
+    Obtém o IP real do cliente a partir dos cabeçalhos de proxy
+    
+    Args:
+        get_header (callable): Retorna o valor de um cabeçalho pelo nome (ou None)
+        remote_addr (str): Endereço da conexão, usado se nenhum cabeçalho estiver presente
+        
     Returns:
         str: Endereço IP real do cliente
     """
@@ -121,21 +128,19 @@ def get_real_client_ip(request):
     ]
     
     for header in headers_to_check:
-        if header in request.headers:
-            # X-Forwarded-For pode conter múltiplos IPs separados por vírgula
-            if header == 'X-Forwarded-For':
-                forwarded_for = request.headers.get(header, '')
-                ip_list = [ip.strip() for ip in forwarded_for.split(',')]
-                if ip_list and ip_list[0]:
-                    logging.info(f"IP obtido do cabeçalho {header}: {ip_list[0]}")
-                    return ip_list[0]
-            else:
-                ip = request.headers.get(header)
-                if ip:
-                    logging.info(f"IP obtido do cabeçalho {header}: {ip}")
-                    return ip
+        value = get_header(header)
+        if value is None:
+            continue
+        # X-Forwarded-For pode conter múltiplos IPs separados por vírgula
+        if header == 'X-Forwarded-For':
+            ip_list = [ip.strip() for ip in value.split(',')]
+            if ip_list and ip_list[0]:
+                logging.info(f"IP obtido do cabeçalho {header}: {ip_list[0]}")
+                return ip_list[0]
+        elif value:
+            logging.info(f"IP obtido do cabeçalho {header}: {value}")
+            return value
     
     # Se não encontrar em nenhum cabeçalho, usar o remote_addr padrão
-    ip = request.remote_addr
-    logging.info(f"IP obtido de request.remote_addr: {ip}")
-    return ip
+    logging.info(f"IP obtido de request.remote_addr: {remote_addr}")
+    return remote_addr
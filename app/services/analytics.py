@@ -1,11 +1,14 @@
 import logging
 from utils.db_adapter import db_adapter
+from utils.read_replica import replica_read
+from app.services.rollups import stats_rollups, TAIL_ID
 
 
 class AnalyticsService:
     """Serviço para análise e estatísticas do sistema de redirecionamento"""
     
     @staticmethod
+    @replica_read()
     def get_dashboard_stats(user_id):
         """
         Obtém estatísticas de uso para exibição no dashboard do usuário
@@ -27,6 +30,8 @@ class AnalyticsService:
         }
         
         try:
+            stats_rollups.ensure_started()
+            
             # Total de links ativos do usuário
             total_links = db_adapter.execute_query(
                 'SELECT COUNT(*) as count FROM custom_links WHERE user_id = %s', 
@@ -43,12 +48,13 @@ class AnalyticsService:
             
             # Total de redirecionamentos (geral)
             if db_adapter.use_postgres:
-                # Consulta otimizada para PostgreSQL usando JOINs
-                query = '''
-                    SELECT COUNT(*) as count 
-                    FROM redirect_logs rl
-                    JOIN custom_links cl ON rl.link_id = cl.id
-                    WHERE cl.user_id = %s
+                # Agregados diários + logs ainda não agregados
+                query = f'''
+                    SELECT
+                        (SELECT COALESCE(SUM(clicks), 0) FROM redirect_stats_daily WHERE user_id = %s)
+                        + (SELECT COUNT(*) FROM redirect_logs rl
+                           JOIN custom_links cl ON rl.link_id = cl.id
+                           WHERE cl.user_id = %s AND rl.id > {TAIL_ID}) as count
                 '''
             else:
                 # Consulta para SQLite
@@ -59,17 +65,20 @@ class AnalyticsService:
                     WHERE cl.user_id = ?
                 '''
             
-            total_redirects = db_adapter.execute_query(query, (user_id,))
-            stats['total_redirects'] = total_redirects['count'] if total_redirects else 0
+            params = (user_id, user_id) if db_adapter.use_postgres else (user_id,)
+            total_redirects = db_adapter.execute_query(query, params)
+            stats['total_redirects'] = int(total_redirects['count']) if total_redirects else 0
             
             # Redirecionamentos de hoje
             if db_adapter.use_postgres:
-                query = '''
-                    SELECT COUNT(*) as count 
-                    FROM redirect_logs rl
-                    JOIN custom_links cl ON rl.link_id = cl.id
-                    WHERE cl.user_id = %s
-                    AND DATE(rl.timestamp) = CURRENT_DATE
+                query = f'''
+                    SELECT
+                        (SELECT COALESCE(SUM(clicks), 0) FROM redirect_stats_daily
+                         WHERE user_id = %s AND day = CURRENT_DATE)
+                        + (SELECT COUNT(*) FROM redirect_logs rl
+                           JOIN custom_links cl ON rl.link_id = cl.id
+                           WHERE cl.user_id = %s AND rl.id > {TAIL_ID}
+                           AND rl.redirect_time >= CURRENT_DATE) as count
                 '''
             else:
                 query = '''
@@ -80,15 +89,22 @@ class AnalyticsService:
                     AND DATE(rl.timestamp) = DATE('now')
                 '''
             
-            redirects_today = db_adapter.execute_query(query, (user_id,))
-            stats['redirects_today'] = redirects_today['count'] if redirects_today else 0
+            redirects_today = db_adapter.execute_query(query, params)
+            stats['redirects_today'] = int(redirects_today['count']) if redirects_today else 0
             
-            # Top 5 links mais usados
+            # Top 5 links mais usados (subconsulta, não WITH: só consultas
+            # iniciadas por SELECT vão para a réplica)
             if db_adapter.use_postgres:
-                query = '''
-                    SELECT cl.link_name, cl.id, COUNT(rl.id) as redirect_count
+                query = f'''
+                    SELECT cl.link_name, cl.id, COALESCE(SUM(c.clicks), 0)::int as redirect_count
                     FROM custom_links cl
-                    LEFT JOIN redirect_logs rl ON cl.id = rl.link_id
+                    LEFT JOIN (
+                        SELECT link_id, clicks FROM redirect_stats_daily WHERE user_id = %s
+                        UNION ALL
+                        SELECT rl.link_id, 1 FROM redirect_logs rl
+                        JOIN custom_links cl ON rl.link_id = cl.id
+                        WHERE cl.user_id = %s AND rl.id > {TAIL_ID}
+                    ) c ON cl.id = c.link_id
                     WHERE cl.user_id = %s
                     GROUP BY cl.id, cl.link_name
                     ORDER BY redirect_count DESC
@@ -105,15 +121,22 @@ class AnalyticsService:
                     LIMIT 5
                 '''
             
-            top_links = db_adapter.execute_query(query, (user_id,), fetch_all=True)
+            top_params = (user_id, user_id, user_id) if db_adapter.use_postgres else (user_id,)
+            top_links = db_adapter.execute_query(query, top_params, fetch_all=True)
             stats['top_links'] = top_links if top_links else []
             
             # Top 5 números mais usados
             if db_adapter.use_postgres:
-                query = '''
-                    SELECT wn.phone_number, wn.description, COUNT(rl.id) as redirect_count
+                query = f'''
+                    SELECT wn.phone_number, wn.description, COALESCE(SUM(c.clicks), 0)::int as redirect_count
                     FROM whatsapp_numbers wn
-                    LEFT JOIN redirect_logs rl ON wn.id = rl.number_id
+                    LEFT JOIN (
+                        SELECT number_id, clicks FROM redirect_stats_daily WHERE user_id = %s
+                        UNION ALL
+                        SELECT rl.number_id, 1 FROM redirect_logs rl
+                        JOIN custom_links cl ON rl.link_id = cl.id
+                        WHERE cl.user_id = %s AND rl.id > {TAIL_ID}
+                    ) c ON wn.id = c.number_id
                     WHERE wn.user_id = %s
                     GROUP BY wn.id, wn.phone_number, wn.description
                     ORDER BY redirect_count DESC
@@ -130,20 +153,20 @@ class AnalyticsService:
                     LIMIT 5
                 '''
             
-            top_numbers = db_adapter.execute_query(query, (user_id,), fetch_all=True)
+            top_numbers = db_adapter.execute_query(query, top_params, fetch_all=True)
             stats['top_numbers'] = top_numbers if top_numbers else []
             
             # Redirecionamentos recentes
             if db_adapter.use_postgres:
                 query = '''
                     SELECT 
-                        rl.timestamp, cl.link_name, wn.phone_number,
+                        rl.redirect_time as timestamp, cl.link_name, wn.phone_number,
                         rl.ip_address, rl.city, rl.country, rl.message
                     FROM redirect_logs rl
                     JOIN custom_links cl ON rl.link_id = cl.id
                     JOIN whatsapp_numbers wn ON rl.number_id = wn.id
                     WHERE cl.user_id = %s
-                    ORDER BY rl.timestamp DESC
+                    ORDER BY rl.redirect_time DESC
                     LIMIT 10
                 '''
             else:
@@ -168,6 +191,7 @@ class AnalyticsService:
         return stats
     
     @staticmethod
+    @replica_read()
     def get_link_click_counts(user_id):
         """
         Obtém a contagem de cliques para todos os links de um usuário
@@ -193,6 +217,7 @@ class AnalyticsService:
             return []
     
     @staticmethod
+    @replica_read()
     def get_conversion_rates(user_id, days=30):
         """
         Calcula taxas de conversão para links de um usuário
@@ -0,0 +1,184 @@
+import time
+import asyncio
+import logging
+from collections import Counter
+from config.settings import active_config
+from app.controllers.redirect_controller import RedirectController
+from app.services.link_cache import link_cache
+from app.services.number_pool import number_pool
+from app.services.redirect_targets import redirect_targets
+from app.services.click_pipeline import click_pipeline, new_click_event
+from app.services.geo_worker import geo_enrichment
+from app.services.balancer import usage_window
+from utils.db_adapter import db_adapter
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - dependência opcional (apenas para asgi.py)
+    asyncpg = None
+
+
+class AsyncRedirectService:
+    """
+    Redirecionamento sobre asyncio, com pool próprio de conexões asyncpg.
+
+    Usa os mesmos caches (links, números, URLs), o mesmo balanceador e as
+    mesmas regras do `RedirectController`; apenas as idas ao banco são
+    assíncronas. Cada consulta reaproveita o SQL dos statements registrados
+    no `db_adapter` (placeholders `$n`), que o asyncpg prepara e mantém em
+    cache por conexão. A geolocalização e o pipeline write-behind continuam
+    nas threads de segundo plano.
+    """
+
+    def __init__(self, min_size=2, max_size=20, command_timeout=5):
+        """
+        Args:
+            min_size (int): Conexões abertas na inicialização
+            max_size (int): Quantidade máxima de conexões do pool assíncrono
+            command_timeout (float): Tempo máximo de cada consulta em segundos
+        """
+        self.min_size = min_size
+        self.max_size = max_size
+        self.command_timeout = command_timeout
+        self._pool = None
+        self._metrics = Counter()
+        self._db_time = 0.0
+
+    async def start(self):
+        """Abre o pool asyncpg e carrega a janela de uso do balanceador"""
+        if asyncpg is None:
+            raise RuntimeError("asyncpg não está instalado; instale-o para usar o servidor ASGI")
+
+        self._pool = await asyncpg.create_pool(
+            host=active_config.POSTGRES_HOST,
+            port=int(active_config.POSTGRES_PORT),
+            database=active_config.POSTGRES_DB,
+            user=active_config.POSTGRES_USER,
+            password=active_config.POSTGRES_PASSWORD,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            command_timeout=self.command_timeout,
+            # Statements preparados não sobrevivem a um pooler em modo transação
+            statement_cache_size=0 if active_config.DB_TRANSACTION_POOLER else 100
+        )
+        # Carga única (e bloqueante) da janela de uso, fora do loop de eventos
+        await asyncio.get_running_loop().run_in_executor(None, usage_window.ensure_seeded)
+        logging.info(f"Pool asyncpg iniciado com até {self.max_size} conexões")
+
+    async def close(self):
+        """Fecha o pool asyncpg"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def redirect(self, link_name, user_id=None, client_ip=None, user_agent=None):
+        """
+        Realiza o redirecionamento de `/<link_name>` ou `/<user_id>/<link_name>`
+
+        Returns:
+            tuple: (url, error) - Mesmo retorno de `RedirectController.redirect_whatsapp`
+        """
+        started = time.perf_counter()
+
+        if user_id is None:
+            link = await self._link(link_cache.name_key(link_name), 'link_by_name', (link_name,))
+        else:
+            link = await self._link(link_cache.user_key(user_id, link_name), 'link_by_user_and_name', (link_name, user_id))
+
+        if not link:
+            logging.warning(f"Link não encontrado: {link_name}")
+            return None, "Link não encontrado."
+
+        if not link['is_active']:
+            logging.warning(f"Tentativa de acesso a link inativo: {link['link_name']}")
+            return None, "Este link está inativo."
+
+        pool_version, numbers = await self._numbers(link)
+        number, message, error = RedirectController.select_target(link, pool_version, numbers)
+        if error:
+            return None, error
+
+        # URL montada antes do registro: depois dele nenhuma etapa pode falhar
+        # (o asgi.py repassa ao Flask os redirecionamentos que lançam exceção)
+        url = redirect_targets.get(number, message)
+        await self._record(link, number, message, client_ip, user_agent)
+
+        self._metrics['redirects'] += 1
+        logging.info(f"Redirecionamento para o número {number['id']} concluído em {time.perf_counter() - started:.4f} segundos.")
+        return url, None
+
+    def stats(self):
+        """
+        Retorna as métricas do redirecionamento assíncrono
+
+        Returns:
+            dict: Redirecionamentos, consultas, tempo de banco e uso do pool
+        """
+        queries = self._metrics['queries']
+        return {
+            'redirects': self._metrics['redirects'],
+            'queries': queries,
+            'avg_db_ms': round(self._db_time * 1000 / queries, 3) if queries else 0,
+            'pool_size': self._pool.get_size() if self._pool is not None else 0,
+            'pool_idle': self._pool.get_idle_size() if self._pool is not None else 0,
+            'max_size': self.max_size
+        }
+
+    async def _link(self, key, statement, params):
+        link = link_cache.lookup(key)
+        if link is not None:
+            return link
+
+        generation = link_cache.generation
+        row = await self._fetch(statement, params, one=True)
+        return link_cache.store(key, row, generation)
+
+    async def _numbers(self, link):
+        entry = number_pool.lookup(link['id'])
+        if entry is not None:
+            return entry
+
+        generation = number_pool.generation
+        rows = await self._fetch('link_number_pool', {'link_id': link['id'], 'user_id': link['user_id']})
+        return number_pool.store(link, rows, generation)
+
+    async def _record(self, link, number, message, client_ip, user_agent):
+        if click_pipeline.enabled:
+            event = new_click_event(link['id'], number['id'], client_ip, user_agent, message)
+            if not click_pipeline.enqueue(event):
+                # Fila cheia: gravar este clique imediatamente, fora do loop de eventos
+                try:
+                    loop = asyncio.get_running_loop()
+                    geo_enrichment.submit_many(await loop.run_in_executor(None, click_pipeline.flush, [event]))
+                except Exception as e:
+                    logging.error(f"Erro ao registrar clique: {str(e)}")
+            return
+
+        params = RedirectController.record_params(link, number, message, client_ip, user_agent)
+        try:
+            row = await self._fetch('record_redirect', params, one=True)
+            geo_enrichment.submit(row['id'], client_ip)
+        except Exception as e:
+            # Continuar o redirecionamento mesmo se o registro falhar
+            logging.error(f"Erro ao registrar redirecionamento: {str(e)}")
+
+    async def _fetch(self, name, params, one=False):
+        statement = db_adapter.statements[name]
+        args = statement.arguments(params)
+        started = time.perf_counter()
+        try:
+            if one:
+                row = await self._pool.fetchrow(statement.server_query, *args)
+                return dict(row) if row is not None else None
+            return [dict(row) for row in await self._pool.fetch(statement.server_query, *args)]
+        finally:
+            self._metrics['queries'] += 1
+            self._db_time += time.perf_counter() - started
+
+
+# Instância compartilhada pelo servidor ASGI
+async_redirects = AsyncRedirectService(
+    min_size=active_config.ASYNC_DB_POOL_MIN_SIZE,
+    max_size=active_config.ASYNC_DB_POOL_MAX_SIZE,
+    command_timeout=active_config.ASYNC_DB_COMMAND_TIMEOUT
+)
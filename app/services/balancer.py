@@ -1,166 +1,405 @@
+import os
+import time
+import heapq
 import random
 import logging
+import threading
+from math import gcd
+from functools import reduce
+from collections import deque, OrderedDict
 from utils.db_adapter import db_adapter
-from app.models.whatsapp_number import WhatsAppNumber
-from app.models.custom_link import CustomLink
-from datetime import datetime
+from config.settings import active_config
+
+
+class UsageWindow:
+    """
+    Contadores de uso por número em uma janela deslizante de buckets por minuto
+
+    Cada número mantém um anel de buckets (minuto, contagem) e o total da
+    janela, de modo que registrar e consultar o uso sejam operações O(1)
+    amortizadas. A janela é carregada uma vez por processo a partir de
+    `redirect_logs` e depois atualizada a cada seleção feita pelo balanceador.
+    Cada worker do gunicorn mantém sua própria janela.
+    """
+
+    SEED_QUERY = '''
+        SELECT
+            number_id,
+            FLOOR(EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - redirect_time)) / 60)::int AS minutes_ago,
+            COUNT(*) AS total
+        FROM redirect_logs
+        WHERE redirect_time >= CURRENT_TIMESTAMP - make_interval(mins => %s)
+        AND number_id IS NOT NULL
+        GROUP BY 1, 2
+    '''
+
+    # Intervalo entre tentativas de carga após uma falha
+    SEED_RETRY_SECONDS = 30
+
+    def __init__(self, window_minutes=1440):
+        """
+        Args:
+            window_minutes (int): Tamanho da janela em minutos (padrão: 24 horas)
+        """
+        self.window_minutes = window_minutes
+        self._buckets = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._seed_lock = threading.Lock()
+        self._seeded_pid = None
+        self._retry_at = 0.0
+        # Incrementada a cada carga, quando as contagens podem diminuir
+        self.generation = 0
+
+    def record(self, number_id, amount=1, minute=None):
+        """Registra uso de um número no minuto atual"""
+        minute = self._current_minute() if minute is None else minute
+        with self._lock:
+            buckets = self._buckets.setdefault(number_id, deque())
+            if buckets and buckets[-1][0] == minute:
+                buckets[-1][1] += amount
+            else:
+                buckets.append([minute, amount])
+            self._totals[number_id] = self._totals.get(number_id, 0) + amount
+
+    def count(self, number_id, minute=None):
+        """Retorna o uso de um número dentro da janela"""
+        minute = self._current_minute() if minute is None else minute
+        with self._lock:
+            buckets = self._buckets.get(number_id)
+            if not buckets:
+                return 0
+
+            # Descartar buckets que saíram da janela
+            oldest_allowed = minute - self.window_minutes
+            while buckets and buckets[0][0] <= oldest_allowed:
+                self._totals[number_id] -= buckets.popleft()[1]
+            return self._totals[number_id]
+
+    def ensure_seeded(self):
+        """
+        Carrega a janela a partir de redirect_logs uma vez por processo
+
+        Se a consulta falhar, a carga é tentada novamente na próxima seleção
+        depois de `SEED_RETRY_SECONDS`.
+        """
+        if self._seeded_pid == os.getpid() or time.monotonic() < self._retry_at:
+            return
+
+        with self._seed_lock:
+            if self._seeded_pid == os.getpid():
+                return
+
+            try:
+                rows = db_adapter.execute_query(self.SEED_QUERY, (self.window_minutes,), fetch_all=True) or []
+            except Exception as e:
+                self._retry_at = time.monotonic() + self.SEED_RETRY_SECONDS
+                logging.error(f"Erro ao carregar janela de uso dos números: {str(e)}")
+                return
+
+            # Buckets precisam estar em ordem cronológica (mais antigo primeiro)
+            now = self._current_minute()
+            buckets, totals = {}, {}
+            for row in sorted(rows, key=lambda r: -r['minutes_ago']):
+                buckets.setdefault(row['number_id'], deque()).append([now - row['minutes_ago'], row['total']])
+                totals[row['number_id']] = totals.get(row['number_id'], 0) + row['total']
+
+            # A carga substitui o estado herdado do processo pai (após um fork)
+            with self._lock:
+                self._buckets, self._totals = buckets, totals
+                self.generation += 1
+            self._seeded_pid = os.getpid()
+        logging.info(f"Janela de uso dos números carregada com {len(rows)} buckets")
+
+    def epoch(self):
+        """
+        Identifica o período em que as contagens só aumentam
+
+        Buckets expiram apenas na virada do minuto e uma nova carga substitui
+        as contagens; fora disso `count` nunca diminui.
+        """
+        return (self.generation, self._current_minute())
+
+    @staticmethod
+    def _current_minute():
+        return int(time.time() // 60)
+
+
+# Janela compartilhada por todo o processo
+usage_window = UsageWindow()
+
+
+class BalancingStrategy:
+    """
+    Estratégia de escolha de número
+
+    As estratégias trabalham apenas com estado em memória. `pool_key`
+    identifica o conjunto de números (o link) e `version` muda sempre que esse
+    conjunto muda, permitindo reconstruir o estado derivado somente quando
+    necessário.
+    """
+
+    name = None
+    description = ''
+
+    def select(self, pool_key, version, numbers):
+        """
+        Args:
+            pool_key: Identificador do conjunto de números (ID do link)
+            version: Versão do conjunto de números
+            numbers (list): Números elegíveis
+
+        Returns:
+            dict: Número selecionado
+        """
+        raise NotImplementedError
+
+    def record(self, pool_key, version, numbers, selected):
+        """Informa o número efetivamente usado (inclusive quando veio de um fallback)"""
+
+
+# Registro de estratégias disponíveis, indexadas pelo nome
+STRATEGIES = {}
+
+
+def register_strategy(cls):
+    """Decorador que registra uma estratégia de balanceamento pelo nome"""
+    STRATEGIES[cls.name] = cls()
+    return cls
+
+
+def _weight(number):
+    return max(int(number.get('weight') or 1), 1)
+
+
+def _has_capacity(number):
+    capacity = number.get('capacity')
+    return not capacity or usage_window.count(number['id']) < capacity
+
+
+class _PoolState:
+    """
+    Estado derivado por conjunto de números, reconstruído quando a versão muda
+
+    Cada estado tem seu próprio lock (`state['lock']`), que as estratégias
+    seguram enquanto leem e alteram o estado.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def get(self, pool_key, version, numbers):
+        state = self._states.get(pool_key)
+        if state is None or state[0] != version:
+            with self._lock:
+                state = self._states.get(pool_key)
+                if state is None or state[0] != version:
+                    derived = self._factory(numbers)
+                    derived['lock'] = threading.Lock()
+                    state = (version, derived)
+                    self._states[pool_key] = state
+        return state[1]
+
+
+@register_strategy
+class LeastUsedStrategy(BalancingStrategy):
+    """
+    Menor número de redirecionamentos nas últimas 24 horas (desempate aleatório)
+
+    Cada conjunto de números mantém um heap de (contagem, desempate, id). As
+    contagens só aumentam dentro de um mesmo `usage_window.epoch()`, então uma
+    entrada desatualizada nunca está acima da contagem real: basta conferir o
+    topo e reinseri-lo com a contagem atual até que ela confira. O heap é
+    reconstruído apenas na virada do epoch.
+    """
+
+    name = 'least_used'
+    description = 'Menos usado nas últimas 24 horas'
+
+    def __init__(self):
+        self._pools = _PoolState(lambda numbers: {
+            'numbers': {n['id']: n for n in numbers},
+            'heap': [],
+            'epoch': None
+        })
+
+    def select(self, pool_key, version, numbers, accept=None):
+        """
+        Args:
+            accept (callable, optional): Filtro dos números elegíveis. Defaults to None.
+
+        Returns:
+            dict: Número selecionado, ou None se nenhum número passar no filtro
+        """
+        state = self._pools.get(pool_key, version, numbers)
+        with state['lock']:
+            heap = state['heap']
+            epoch = (usage_window, usage_window.epoch())
+            if state['epoch'] != epoch:
+                heap[:] = [(usage_window.count(n), random.random(), n) for n in state['numbers']]
+                heapq.heapify(heap)
+                state['epoch'] = epoch
+
+            rejected = []
+            selected = None
+            while heap:
+                count, _, number_id = heap[0]
+                current = usage_window.count(number_id)
+                if current != count:
+                    heapq.heapreplace(heap, (current, random.random(), number_id))
+                    continue
+                number = state['numbers'][number_id]
+                if accept is None or accept(number):
+                    selected = number
+                    break
+                rejected.append(heapq.heappop(heap))
+
+            for entry in rejected:
+                heapq.heappush(heap, entry)
+            return selected
+
+
+@register_strategy
+class SmoothWeightedRoundRobinStrategy(BalancingStrategy):
+    """
+    Round-robin ponderado suave (algoritmo do nginx)
+
+    A sequência intercalada é calculada uma vez por versão do conjunto de
+    números; cada seleção apenas avança um índice.
+    """
+
+    name = 'weighted_round_robin'
+    description = 'Round-robin ponderado pelo peso de cada número'
+
+    def __init__(self):
+        self._pools = _PoolState(self._build_schedule)
+
+    @staticmethod
+    def _build_schedule(numbers):
+        weights = [_weight(n) for n in numbers]
+        # Reduzir os pesos pelo MDC para manter a sequência curta
+        divisor = reduce(gcd, weights)
+        weights = [w // divisor for w in weights]
+        total = sum(weights)
+        current = [0] * len(numbers)
+        schedule = []
+        for _ in range(total):
+            for i, weight in enumerate(weights):
+                current[i] += weight
+            best = max(range(len(numbers)), key=lambda i: current[i])
+            current[best] -= total
+            schedule.append(numbers[best])
+        return {'schedule': schedule, 'position': 0}
+
+    def select(self, pool_key, version, numbers):
+        state = self._pools.get(pool_key, version, numbers)
+        schedule = state['schedule']
+        with state['lock']:
+            position = state['position']
+            state['position'] = (position + 1) % len(schedule)
+        return schedule[position]
+
+
+@register_strategy
+class PowerOfTwoChoicesStrategy(BalancingStrategy):
+    """Sorteia dois números e escolhe o de menor carga relativa ao peso"""
+
+    name = 'power_of_two'
+    description = 'Melhor entre dois números sorteados'
+
+    def select(self, pool_key, version, numbers):
+        if len(numbers) == 1:
+            return numbers[0]
+        first, second = random.sample(numbers, 2)
+        first_load = usage_window.count(first['id']) / _weight(first)
+        second_load = usage_window.count(second['id']) / _weight(second)
+        return first if first_load <= second_load else second
+
+
+@register_strategy
+class LeastRecentlyUsedStrategy(BalancingStrategy):
+    """Escolhe o número que está há mais tempo sem receber redirecionamentos do link"""
+
+    name = 'least_recent'
+    description = 'Número usado há mais tempo neste link'
+
+    def __init__(self):
+        # Ordem de uso: o primeiro é o usado há mais tempo
+        self._pools = _PoolState(lambda numbers: {'order': OrderedDict((n['id'], n) for n in numbers)})
+
+    def select(self, pool_key, version, numbers):
+        state = self._pools.get(pool_key, version, numbers)
+        with state['lock']:
+            return next(iter(state['order'].values()))
+
+    def record(self, pool_key, version, numbers, selected):
+        state = self._pools.get(pool_key, version, numbers)
+        with state['lock']:
+            if selected['id'] in state['order']:
+                state['order'].move_to_end(selected['id'])
 
 
 class NumberBalancer:
     """Serviço para balanceamento de carga entre números de WhatsApp"""
-    
+
+    DEFAULT_STRATEGY = active_config.BALANCING_STRATEGY
+
     @staticmethod
-    def select_number(numbers, link_id):
+    def select_number(numbers, link_id, strategy=None, pool_version=None):
         """Seleciona um número de WhatsApp para redirecionamento de forma balanceada
-        
+
+        A seleção usa apenas estado em memória (janela de uso e estado de cada
+        estratégia), sem consultar o banco. Números que atingiram sua
+        capacidade na janela são evitados enquanto houver alternativa.
+
         Args:
             numbers (list): Lista de dicionários com números disponíveis
             link_id (int): ID do link de redirecionamento
-            
+            strategy (str, optional): Nome da estratégia. Defaults to None (BALANCING_STRATEGY).
+            pool_version (optional): Versão do conjunto de números. Defaults to None.
+
         Returns:
             dict: Número selecionado
         """
         try:
-            # Verificar se há apenas um número disponível
-            if len(numbers) == 1:
-                return numbers[0]
-            
-            # Obter contagem de redirecionamentos para cada número (último dia)
-            stats_by_number = NumberBalancer._get_number_stats(numbers, link_id)
-            
-            # Se não temos estatísticas ou ocorreu erro, usar seleção aleatória
-            if not stats_by_number:
-                logging.info("Sem estatísticas disponíveis, usando seleção aleatória simples.")
-                selected_number = random.choice(numbers)
-                logging.info(f"Número selecionado aleatoriamente: ID={selected_number['id']}, fone={selected_number['phone_number']}")
-                return selected_number
-            
-            # Se temos estatísticas, fazer seleção baseada nelas
-            # Ordenar por contagem total para priorizar números menos usados
-            numbers_sorted = sorted(stats_by_number, key=lambda x: x['redirect_count'])
-            
-            # Verificar se há números com a mesma contagem mínima
-            if len(numbers_sorted) > 0:
-                min_redirects = numbers_sorted[0]['redirect_count']
-                min_numbers = [n for n in numbers_sorted if n['redirect_count'] == min_redirects]
-                
-                # Se há múltiplos números com a mesma contagem, escolher aleatoriamente entre eles
-                if len(min_numbers) > 1:
-                    selected_number = random.choice(min_numbers)
-                    logging.info(f"Múltiplos números com contagem mínima {min_redirects}, escolhido aleatoriamente: ID={selected_number['id']}")
-                else:
-                    selected_number = min_numbers[0]
-                    logging.info(f"Número com menor contagem ({min_redirects}) selecionado: ID={selected_number['id']}")
-            else:
-                # Fallback para seleção aleatória se algo deu errado na ordenação
-                selected_number = random.choice(numbers)
-                logging.info(f"Fallback para seleção aleatória: ID={selected_number['id']}")
-                
-            # Registrar o número selecionado para diagnóstico
-            logging.info(f"Número selecionado para redirecionamento: ID={selected_number['id']}, fone={selected_number['phone_number']}")
-            
-            return selected_number
-            
+            usage_window.ensure_seeded()
+
+            if pool_version is None:
+                pool_version = tuple((n['id'], _weight(n)) for n in numbers)
+
+            # Nomes desconhecidos só chegam aqui a partir do banco (links antigos)
+            balancing = STRATEGIES.get(strategy) or STRATEGIES[NumberBalancer.DEFAULT_STRATEGY]
+            selected_number = balancing.select(link_id, pool_version, numbers)
+
+            if not _has_capacity(selected_number):
+                fallback = STRATEGIES[LeastUsedStrategy.name].select(
+                    link_id, pool_version, numbers, accept=_has_capacity
+                )
+                # Se todos estão no limite, manter a escolha da estratégia
+                if fallback is not None:
+                    selected_number = fallback
+
+            balancing.record(link_id, pool_version, numbers, selected_number)
+
         except Exception as e:
             logging.error(f"Erro na seleção balanceada de números: {str(e)}")
             # Sempre retornar um número válido, mesmo em caso de erro
-            return random.choice(numbers)
-    
+            selected_number = random.choice(numbers)
+
+        usage_window.record(selected_number['id'])
+        logging.info(f"Número selecionado para redirecionamento: ID={selected_number['id']}, link_id={link_id}")
+        return selected_number
+
     @staticmethod
-    def _get_number_stats(numbers, link_id):
-        """Obtém estatísticas de uso para cada número
-        
-        Args:
-            numbers (list): Lista de dicionários com números disponíveis
-            link_id (int): ID do link de redirecionamento
-            
-        Returns:
-            list: Lista de dicionários com números e suas estatísticas
-        """
-        conn = None
-        try:
-            conn = db_adapter.get_db_connection()
-            number_stats = []
-            
-            if db_adapter.use_postgres:
-                # Consulta única com subquery para obter todas as estatísticas de uma vez
-                query = '''
-                    WITH link_stats AS (
-                        SELECT 
-                            number_id, 
-                            COUNT(*) FILTER (WHERE link_id = %s) AS link_specific_count,
-                            COUNT(*) AS total_count
-                        FROM redirect_logs 
-                        WHERE redirect_time >= CURRENT_TIMESTAMP - INTERVAL '1 day'
-                        GROUP BY number_id
-                    )
-                    SELECT 
-                        n.id, n.phone_number, n.description, 
-                        COALESCE(s.total_count, 0) AS redirect_count,
-                        COALESCE(s.link_specific_count, 0) AS link_specific_count
-                    FROM whatsapp_numbers n
-                    LEFT JOIN link_stats s ON n.id = s.number_id
-                    WHERE n.id IN (%s)
-                '''
-                
-                # Construir placeholders para a lista de IDs de números
-                id_list = ','.join(['%s'] * len(numbers))
-                query = query.replace('%s)', f'{id_list})')
-                
-                # Preparar parâmetros: link_id seguido pelos IDs dos números
-                params = [link_id] + [n['id'] for n in numbers]
-                
-                # Executar a consulta
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                results = cursor.fetchall()
-                
-                # Processar resultados
-                for row in results:
-                    number_stats.append({
-                        'id': row['id'],
-                        'phone_number': row['phone_number'],
-                        'description': row['description'],
-                        'redirect_count': row['redirect_count'],
-                        'link_specific_count': row['link_specific_count']
-                    })
-            else:
-                # Abordagem individual para SQLite
-                cursor = conn.cursor()
-                for num in numbers:
-                    # Calcular a quantidade de redirecionamentos nas últimas 24 horas
-                    cursor.execute('''
-                        SELECT COUNT(*) as count 
-                        FROM redirect_logs 
-                        WHERE number_id = ? 
-                        AND timestamp >= datetime('now', '-1 day')
-                    ''', (num['id'],))
-                    redirect_count = cursor.fetchone()['count']
-                    
-                    # Se temos o ID do link, verificar redirecionamentos específicos do link
-                    link_specific_count = 0
-                    if link_id:
-                        cursor.execute('''
-                            SELECT COUNT(*) as count 
-                            FROM redirect_logs 
-                            WHERE number_id = ? AND link_id = ? 
-                            AND timestamp >= datetime('now', '-1 day')
-                        ''', (num['id'], link_id))
-                        link_specific_count = cursor.fetchone()['count']
-                    
-                    # Adicionar número com suas estatísticas para o processo de seleção
-                    number_stats.append({
-                        'id': num['id'],
-                        'phone_number': num['phone_number'],
-                        'description': num.get('description', ''),
-                        'redirect_count': redirect_count,
-                        'link_specific_count': link_specific_count
-                    })
-            
-            return number_stats
-        except Exception as e:
-            logging.error(f"Erro ao obter estatísticas de números: {str(e)}")
-            return []
-        finally:
-            if conn:
-                conn.close()
+    def available_strategies():
+        """Retorna os nomes e descrições das estratégias registradas"""
+        return [{'name': name, 'description': s.description} for name, s in STRATEGIES.items()]
+
+
+if NumberBalancer.DEFAULT_STRATEGY not in STRATEGIES:
+    raise ValueError(
+        f"BALANCING_STRATEGY inválida: '{NumberBalancer.DEFAULT_STRATEGY}'. "
+        f"Opções: {', '.join(STRATEGIES)}"
+    )
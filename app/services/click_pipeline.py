@@ -0,0 +1,266 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+import psycopg2
+from psycopg2.pool import PoolError
+from collections import Counter, namedtuple
+from datetime import datetime, timezone
+from utils.db_adapter import db_adapter
+from utils.unit_of_work import unit_of_work
+from app.services.geo_worker import geo_enrichment
+from config.settings import active_config
+
+
+# Evento de clique mantido em memória até o próximo flush
+ClickEvent = namedtuple('ClickEvent', 'link_id number_id ip_address user_agent message redirect_time')
+
+
+def new_click_event(link_id, number_id, ip_address=None, user_agent=None, message=None):
+    """Cria um evento de clique com o horário atual"""
+    return ClickEvent(link_id, number_id, ip_address, user_agent, message, datetime.now(timezone.utc))
+
+
+class ClickPipeline:
+    """
+    Pipeline write-behind para registro de cliques.
+
+    O redirecionamento apenas enfileira um `ClickEvent` e retorna. Uma thread
+    em segundo plano agrupa os eventos e, a cada flush, grava todos os logs com
+    um único INSERT de múltiplas linhas e aplica os incrementos de
+    `click_count`/`redirect_count` com um UPDATE agregado por tabela.
+
+    Um lote que falha é repetido até `max_retries` vezes, com espera crescente;
+    esgotadas as tentativas, os eventos são gravados um a um, para que apenas
+    os que falham de novo (ex.: dado inválido) sejam perdidos.
+    """
+
+    INSERT_LOGS_QUERY = '''
+        INSERT INTO redirect_logs (link_id, number_id, ip_address, user_agent, message, redirect_time)
+        VALUES %s
+        RETURNING id, ip_address
+    '''
+
+    UPDATE_LINKS_QUERY = '''
+        UPDATE custom_links AS cl
+        SET click_count = COALESCE(cl.click_count, 0) + v.total
+        FROM (VALUES %s) AS v(id, total)
+        WHERE cl.id = v.id
+    '''
+
+    UPDATE_NUMBERS_QUERY = '''
+        UPDATE whatsapp_numbers AS wn
+        SET redirect_count = COALESCE(wn.redirect_count, 0) + v.total
+        FROM (VALUES %s) AS v(id, total)
+        WHERE wn.id = v.id
+    '''
+
+    def __init__(self, enabled=False, batch_size=500, flush_interval=1.0, max_queue_size=10000,
+                 max_retries=3, retry_backoff=0.5):
+        """
+        Args:
+            enabled (bool): Se False, os redirecionamentos gravam de forma síncrona
+            batch_size (int): Quantidade máxima de eventos por flush
+            flush_interval (float): Intervalo máximo em segundos entre flushes
+            max_queue_size (int): Capacidade da fila em memória
+            max_retries (int): Novas tentativas de um lote que falhou
+            retry_backoff (float): Espera em segundos antes da primeira nova tentativa (dobra a cada uma)
+        """
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._metrics = Counter()
+        self._last_flush_ms = 0.0
+
+    def enqueue(self, event):
+        """
+        Enfileira um evento de clique sem bloquear
+
+        Args:
+            event (ClickEvent): Evento a ser gravado
+
+        Returns:
+            bool: False se a fila estiver cheia (o chamador deve gravar de forma síncrona)
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+            self._metrics['enqueued'] += 1
+            return True
+        except queue.Full:
+            self._metrics['overflow'] += 1
+            logging.warning("Fila de cliques cheia, gravando evento de forma síncrona")
+            return False
+
+    def flush(self, events):
+        """
+        Grava um lote de eventos em uma única transação
+
+        Args:
+            events (list): Lista de ClickEvent
+
+        Returns:
+            list: Pares (log_id, ip_address) dos logs inseridos
+        """
+        if not events:
+            return []
+
+        link_totals = Counter(event.link_id for event in events)
+        number_totals = Counter(event.number_id for event in events)
+
+        # Logs e contadores confirmados juntos, em uma única transação
+        with unit_of_work():
+            inserted = db_adapter.execute_batch(
+                self.INSERT_LOGS_QUERY,
+                [(e.link_id, e.number_id, e.ip_address, e.user_agent, e.message, e.redirect_time) for e in events],
+                page_size=len(events),
+                fetch=True
+            )
+            db_adapter.execute_batch(self.UPDATE_LINKS_QUERY, link_totals.items())
+            db_adapter.execute_batch(self.UPDATE_NUMBERS_QUERY, number_totals.items())
+
+        return [(row['id'], row['ip_address']) for row in inserted]
+
+    def shutdown(self, timeout=10):
+        """
+        Interrompe a thread de flush após gravar os eventos pendentes
+
+        Args:
+            timeout (float, optional): Tempo máximo de espera em segundos. Defaults to 10.
+        """
+        if not self._thread or self._pid != os.getpid():
+            return
+
+        self._stop.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logging.warning(f"Flush final da fila de cliques não concluído; {self._queue.qsize()} eventos pendentes")
+        else:
+            logging.info("Fila de cliques drenada com sucesso")
+
+    def stats(self):
+        """
+        Retorna as métricas do pipeline
+
+        Returns:
+            dict: Profundidade da fila, contadores de eventos e duração do último flush
+        """
+        return {
+            'enabled': self.enabled,
+            'queue_depth': self._queue.qsize(),
+            'max_queue_size': self._queue.maxsize,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+            'enqueued': self._metrics['enqueued'],
+            'flushed': self._metrics['flushed'],
+            'failed': self._metrics['failed'],
+            'retries': self._metrics['retries'],
+            'overflow': self._metrics['overflow'],
+            'batches': self._metrics['batches'],
+            'last_flush_ms': self._last_flush_ms
+        }
+
+    def _ensure_started(self):
+        # A thread é criada no processo do worker (após o fork do gunicorn)
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='click-pipeline', daemon=True)
+            self._thread.start()
+            logging.info(f"Pipeline de cliques iniciado (lote={self.batch_size}, intervalo={self.flush_interval}s)")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._flush_batch(self._collect_batch())
+
+        # Drenar o que restou na fila antes de encerrar
+        while not self._queue.empty():
+            self._flush_batch(self._collect_batch(block=False))
+
+    def _collect_batch(self, block=True):
+        events = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(events) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    events.append(self._queue.get(timeout=timeout))
+                else:
+                    events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def _flush_batch(self, events):
+        if not events:
+            return
+
+        started = time.monotonic()
+        try:
+            inserted = self._flush_with_retries(events)
+        finally:
+            self._last_flush_ms = round((time.monotonic() - started) * 1000, 2)
+
+        # Geolocalização feita pelo pool de workers, fora do flush
+        geo_enrichment.submit_many(inserted)
+
+    def _flush_with_retries(self, events):
+        for attempt in range(self.max_retries + 1):
+            try:
+                inserted = self.flush(events)
+                self._metrics['flushed'] += len(events)
+                self._metrics['batches'] += 1
+                return inserted
+            except Exception as e:
+                logging.error(f"Erro ao gravar lote de {len(events)} cliques (tentativa {attempt + 1}): {str(e)}")
+                if attempt < self.max_retries:
+                    self._metrics['retries'] += 1
+                    # No encerramento (_stop definido) as tentativas seguem sem esperar
+                    self._stop.wait(self.retry_backoff * 2 ** attempt)
+
+        # Tentativas esgotadas: gravar evento a evento, isolando os que falham
+        inserted, lost = [], 0
+        for index, event in enumerate(events):
+            try:
+                inserted.extend(self.flush([event]))
+                self._metrics['flushed'] += 1
+            except (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError) as e:
+                # Banco indisponível: os demais eventos falhariam da mesma forma
+                lost += len(events) - index
+                logging.error(f"Banco indisponível ao gravar cliques um a um: {str(e)}")
+                break
+            except Exception as e:
+                lost += 1
+                logging.error(f"Erro ao gravar clique do link {event.link_id}: {str(e)}")
+
+        if lost:
+            self._metrics['failed'] += lost
+            logging.error(f"{lost} de {len(events)} cliques perdidos após {self.max_retries} novas tentativas")
+        return inserted
+
+
+# Instância compartilhada por todo o processo
+click_pipeline = ClickPipeline(
+    enabled=active_config.CLICK_PIPELINE_ENABLED,
+    batch_size=active_config.CLICK_PIPELINE_BATCH_SIZE,
+    flush_interval=active_config.CLICK_PIPELINE_FLUSH_INTERVAL,
+    max_queue_size=active_config.CLICK_PIPELINE_QUEUE_SIZE,
+    max_retries=active_config.CLICK_PIPELINE_MAX_RETRIES,
+    retry_backoff=active_config.CLICK_PIPELINE_RETRY_BACKOFF
+)
+
+atexit.register(click_pipeline.shutdown)
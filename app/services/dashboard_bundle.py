@@ -0,0 +1,117 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from config.settings import active_config
+from utils.db_adapter import query_deadline
+
+
+class DashboardBundle:
+    """
+    Executa as seções do dashboard em paralelo e monta um único documento.
+
+    Um pool de threads limitado é compartilhado por todas as requisições do
+    processo: no máximo `max_workers` seções consultam o banco ao mesmo tempo,
+    cada uma com a sua conexão do pool. Seções que falham ou passam do tempo
+    limite voltam como None, com o motivo em `errors`, sem derrubar as demais.
+    As consultas de cada seção têm o mesmo prazo do documento (statement_timeout),
+    então uma seção atrasada é cancelada no banco e libera a thread e a conexão.
+    """
+
+    def __init__(self, max_workers=4, timeout=10.0):
+        """
+        Args:
+            max_workers (int): Seções executadas ao mesmo tempo no processo
+            timeout (float): Tempo máximo em segundos para montar o documento
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._metrics = Counter()
+
+    def build(self, sections):
+        """
+        Executa as seções e aguarda todas (ou o tempo limite)
+
+        Args:
+            sections (dict): nome -> função sem argumentos que retorna o conteúdo da seção
+
+        Returns:
+            dict: Conteúdo de cada seção, `timings` (ms por seção e total) e,
+            se houver falhas, `errors` (nome -> motivo)
+        """
+        executor = self._ensure_started()
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        futures = {name: executor.submit(self._timed, func, deadline) for name, func in sections.items()}
+
+        bundle, timings, errors = {}, {}, {}
+        for name, future in futures.items():
+            try:
+                bundle[name], timings[name] = future.result(timeout=max(0, deadline - time.perf_counter()))
+            except FutureTimeout:
+                # Seções ainda na fila não chegam a rodar; as em execução são canceladas pelo prazo
+                future.cancel()
+                bundle[name] = None
+                errors[name] = 'timeout'
+                self._metrics['timeouts'] += 1
+                logging.warning(f"Seção {name} do dashboard excedeu {self.timeout}s")
+            except Exception as e:
+                bundle[name] = None
+                errors[name] = str(e)
+                self._metrics['failed'] += 1
+                logging.error(f"Erro na seção {name} do dashboard: {str(e)}")
+
+        timings['total'] = round((time.perf_counter() - started) * 1000, 2)
+        bundle['timings'] = timings
+        if errors:
+            bundle['errors'] = errors
+
+        self._metrics['bundles'] += 1
+        self._metrics['sections'] += len(sections)
+        return bundle
+
+    def stats(self):
+        """
+        Retorna as métricas dos documentos montados
+
+        Returns:
+            dict: Documentos, seções, falhas e seções com tempo esgotado
+        """
+        return {
+            'max_workers': self.max_workers,
+            'timeout': self.timeout,
+            'bundles': self._metrics['bundles'],
+            'sections': self._metrics['sections'],
+            'failed': self._metrics['failed'],
+            'timeouts': self._metrics['timeouts']
+        }
+
+    @staticmethod
+    def _timed(func, deadline):
+        started = time.perf_counter()
+        with query_deadline(deadline - started):
+            result = func()
+        return result, round((time.perf_counter() - started) * 1000, 2)
+
+    def _ensure_started(self):
+        # O pool é criado no processo do worker (após o fork do gunicorn)
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='dashboard')
+            return self._executor
+
+
+# Instância compartilhada por todo o processo
+dashboard_bundle = DashboardBundle(
+    max_workers=active_config.DASHBOARD_BUNDLE_WORKERS,
+    timeout=active_config.DASHBOARD_BUNDLE_TIMEOUT
+)
@@ -0,0 +1,77 @@
+import ipaddress
+from utils.ttl_cache import TTLCache
+from config.settings import active_config
+
+
+# Marcador para IPs que nenhum provedor conseguiu localizar
+NOT_FOUND = object()
+
+
+class GeoCache:
+    """
+    Cache limitado de geolocalização, indexado por prefixo de rede.
+
+    Endereços do mesmo /24 (IPv4) ou /48 (IPv6) compartilham a entrada, o que
+    aumenta bastante a taxa de acertos sem perder precisão relevante. IPs não
+    localizados ficam em cache por um tempo menor (`negative_ttl`), para que
+    uma falha temporária dos provedores não se torne permanente.
+    """
+
+    def __init__(self, max_size=10000, ttl=86400, negative_ttl=300):
+        """
+        Args:
+            max_size (int): Quantidade máxima de prefixos em memória
+            ttl (float): Tempo de vida das localizações encontradas
+            negative_ttl (float): Tempo de vida dos IPs não localizados
+        """
+        self.negative_ttl = negative_ttl
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get(self, ip_address):
+        """
+        Busca a localização de um IP no cache
+
+        Returns:
+            dict: Localização (com o IP consultado), NOT_FOUND ou None se ausente
+        """
+        location = self._cache.get(self._key(ip_address))
+        if location is None or location is NOT_FOUND:
+            return location
+        return dict(location, ip=ip_address)
+
+    def set(self, ip_address, location):
+        """Armazena a localização encontrada para o prefixo do IP"""
+        self._cache.set(self._key(ip_address), location)
+
+    def set_not_found(self, ip_address):
+        """Registra que o IP não foi localizado (TTL reduzido)"""
+        self._cache.set(self._key(ip_address), NOT_FOUND, ttl=self.negative_ttl)
+
+    def clear(self):
+        """Remove todas as entradas do cache"""
+        self._cache.clear()
+
+    def stats(self):
+        """Retorna as estatísticas de acertos, falhas e remoções do cache"""
+        return self._cache.stats()
+
+    @staticmethod
+    def _key(ip_address):
+        try:
+            ip = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return ip_address
+
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+
+        prefix = 24 if ip.version == 4 else 48
+        return str(ipaddress.ip_network(f"{ip}/{prefix}", strict=False))
+
+
+# Instância compartilhada pelos serviços de geolocalização do processo
+geo_cache = GeoCache(
+    max_size=active_config.GEO_CACHE_MAX_SIZE,
+    ttl=active_config.GEO_CACHE_TTL,
+    negative_ttl=active_config.GEO_CACHE_NEGATIVE_TTL
+)
@@ -0,0 +1,208 @@
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import Counter, deque
+from utils.db_adapter import db_adapter
+from config.settings import active_config
+
+
+class GeoEnrichmentPool:
+    """
+    Pool de workers para geolocalização dos logs de redirecionamento.
+
+    O redirecionamento apenas entrega o par (log_id, ip) ao pool e retorna;
+    a consulta aos provedores de geolocalização nunca acontece na requisição.
+    Cada worker retira um lote da fila, resolve as localizações e grava todas
+    com um único UPDATE. A fila é limitada: quando está cheia, os itens mais
+    antigos são descartados (o log continua gravado, apenas sem localização).
+    """
+
+    UPDATE_QUERY = '''
+        UPDATE redirect_logs AS rl
+        SET city = v.city, region = v.region, country = v.country,
+            latitude = v.latitude, longitude = v.longitude
+        FROM (VALUES %s) AS v(id, city, region, country, latitude, longitude)
+        WHERE rl.id = v.id
+    '''
+
+    UPDATE_TEMPLATE = '(%s, %s::text, %s::text, %s::text, %s::float8, %s::float8)'
+
+    def __init__(self, workers=2, batch_size=100, flush_interval=2.0, max_queue_size=10000):
+        """
+        Args:
+            workers (int): Quantidade de threads de geolocalização
+            batch_size (int): Quantidade máxima de logs por UPDATE
+            flush_interval (float): Tempo máximo em segundos para completar um lote
+            max_queue_size (int): Capacidade da fila (descarta os mais antigos ao exceder)
+        """
+        self.workers = workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = deque(maxlen=max_queue_size)
+        self._not_empty = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._metrics = Counter()
+
+    def submit(self, log_id, ip_address):
+        """
+        Enfileira um log para geolocalização sem bloquear
+
+        Args:
+            log_id (int): ID do log de redirecionamento
+            ip_address (str): Endereço IP do cliente
+        """
+        if not log_id:
+            return
+
+        self._ensure_started()
+        with self._not_empty:
+            if len(self._queue) == self._queue.maxlen:
+                # deque com maxlen descarta o item mais antigo no append
+                self._metrics['dropped'] += 1
+            self._queue.append((log_id, ip_address))
+            self._metrics['submitted'] += 1
+            self._not_empty.notify()
+
+    def submit_many(self, logs):
+        """Enfileira vários pares (log_id, ip_address)"""
+        for log_id, ip_address in logs:
+            self.submit(log_id, ip_address)
+
+    def shutdown(self, timeout=10):
+        """
+        Interrompe os workers após processar os itens pendentes
+
+        Args:
+            timeout (float, optional): Tempo máximo de espera em segundos. Defaults to 10.
+        """
+        if not self._threads or self._pid != os.getpid():
+            return
+
+        self._stop.set()
+        with self._not_empty:
+            self._not_empty.notify_all()
+
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+
+        pending = len(self._queue)
+        if pending:
+            logging.warning(f"Geolocalização encerrada com {pending} logs pendentes")
+
+    def stats(self):
+        """
+        Retorna as métricas do pool
+
+        Returns:
+            dict: Profundidade da fila e contadores de itens processados
+        """
+        return {
+            'workers': self.workers,
+            'queue_depth': len(self._queue),
+            'max_queue_size': self._queue.maxlen,
+            'batch_size': self.batch_size,
+            'submitted': self._metrics['submitted'],
+            'updated': self._metrics['updated'],
+            'failed': self._metrics['failed'],
+            'dropped': self._metrics['dropped'],
+            'batches': self._metrics['batches']
+        }
+
+    def _ensure_started(self):
+        # As threads são criadas no processo do worker (após o fork do gunicorn)
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'geo-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+            logging.info(f"Pool de geolocalização iniciado com {self.workers} workers")
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._process(batch)
+            elif self._stop.is_set():
+                return
+
+    def _take_batch(self):
+        deadline = time.monotonic() + self.flush_interval
+        with self._not_empty:
+            # Aguardar até completar o lote, esgotar o intervalo ou receber o sinal de parada
+            while len(self._queue) < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._not_empty.wait(remaining)
+
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            return batch
+
+    def _process(self, batch):
+        from app.services.geolocation import GeoLocationService
+
+        rows = []
+        for log_id, ip_address in batch:
+            try:
+                location = GeoLocationService.get_location_from_ip(ip_address)
+            except Exception as e:
+                logging.error(f"Erro ao obter localização do IP {ip_address}: {str(e)}")
+                location = None
+
+            if location:
+                rows.append((
+                    log_id,
+                    location.get('city'),
+                    location.get('region'),
+                    location.get('country'),
+                    location.get('lat'),
+                    location.get('lon')
+                ))
+
+        if not rows:
+            return
+
+        try:
+            self.write(rows)
+            self._metrics['updated'] += len(rows)
+            self._metrics['batches'] += 1
+        except Exception as e:
+            self._metrics['failed'] += len(rows)
+            logging.error(f"Erro ao gravar lote de {len(rows)} localizações: {str(e)}")
+
+    def write(self, rows):
+        """
+        Grava um lote de localizações com um único UPDATE
+
+        Args:
+            rows (list): Tuplas (log_id, city, region, country, latitude, longitude)
+        """
+        db_adapter.execute_batch(self.UPDATE_QUERY, rows, page_size=len(rows), template=self.UPDATE_TEMPLATE)
+
+
+# Instância compartilhada por todo o processo
+geo_enrichment = GeoEnrichmentPool(
+    workers=active_config.GEO_WORKERS,
+    batch_size=active_config.GEO_BATCH_SIZE,
+    flush_interval=active_config.GEO_FLUSH_INTERVAL,
+    max_queue_size=active_config.GEO_QUEUE_SIZE
+)
+
+atexit.register(geo_enrichment.shutdown)
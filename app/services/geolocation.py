@@ -3,6 +3,9 @@ import logging
 from urllib.parse import urljoin
 import time
 import json
+from utils.geo_ipdb import ip_database
+from app.services.geo_cache import geo_cache, NOT_FOUND
+from config.settings import active_config
 
 
 class GeoLocationService:
@@ -15,9 +18,6 @@ class GeoLocationService:
     # Lista de IPs locais/privados que não precisam de geolocalização
     LOCAL_IPS = ['127.0.0.1', 'localhost', '::1', '0.0.0.0']
     
-    # Cache simples para evitar múltiplas consultas para o mesmo IP
-    ip_cache = {}
-    
     @staticmethod
     def get_location_from_ip(ip_address):
         """
@@ -29,7 +29,7 @@ class GeoLocationService:
         Returns:
             dict: Informações de localização ou None em caso de erro
         """
-        # Verificar se o IP é local ou foi previamente consultado no cache
+        # Verificar se o IP é local
         if not ip_address or ip_address in GeoLocationService.LOCAL_IPS:
             logging.info(f"IP local detectado: {ip_address}. Pulando geolocalização.")
             # Retornar dados padrão para IPs locais (Brasil)
@@ -42,20 +42,30 @@ class GeoLocationService:
                 'lon': -51.925
             }
         
-        # Verificar no cache
-        if ip_address in GeoLocationService.ip_cache:
-            logging.info(f"Usando dados em cache para IP {ip_address}")
-            return GeoLocationService.ip_cache[ip_address]
+        # Base local primeiro (não precisa de cache)
+        location_info = ip_database.lookup(ip_address)
+        if location_info:
+            return location_info
         
-        # Tentar diferentes provedores de geolocalização até encontrar um que funcione
-        location_info = (
-            GeoLocationService._try_ipinfo(ip_address) or 
-            GeoLocationService._try_ip_api(ip_address) or
-            GeoLocationService._try_freegeoip(ip_address)
-        )
+        # Verificar no cache (por prefixo /24 ou /48)
+        location_info = geo_cache.get(ip_address)
+        
+        if location_info is None and active_config.GEOIP_REMOTE_FALLBACK:
+            # Tentar diferentes provedores de geolocalização até encontrar um que funcione
+            location_info = (
+                GeoLocationService._try_ipinfo(ip_address) or 
+                GeoLocationService._try_ip_api(ip_address) or
+                GeoLocationService._try_freegeoip(ip_address)
+            )
+            
+            # Falhas ficam em cache por menos tempo (GEO_CACHE_NEGATIVE_TTL)
+            if location_info:
+                geo_cache.set(ip_address, location_info)
+            else:
+                geo_cache.set_not_found(ip_address)
         
         # Se ainda não tiver obtido informações, retornar dados padrão (Brasil)
-        if not location_info:
+        if not location_info or location_info is NOT_FOUND:
             logging.warning(f"Não foi possível obter geolocalização para IP {ip_address}. Usando dados padrão.")
             location_info = {
                 'ip': ip_address,
@@ -66,8 +76,6 @@ class GeoLocationService:
                 'lon': -51.925
             }
         
-        # Armazenar no cache
-        GeoLocationService.ip_cache[ip_address] = location_info
         return location_info
     
     @staticmethod
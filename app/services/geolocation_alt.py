@@ -1,5 +1,7 @@
 import requests
 import logging
+from utils.geo_ipdb import ip_database
+from app.services.geo_cache import geo_cache, NOT_FOUND
 
 class GeoLocationService:
     """
@@ -26,9 +28,22 @@ class GeoLocationService:
                 'longitude': 0
             }
             
+        # Base local primeiro, sem chamada de rede; depois o cache por prefixo
+        location = ip_database.lookup(ip_address) or geo_cache.get(ip_address)
+        if location is NOT_FOUND:
+            return GeoLocationService._unknown_location()
+        if location:
+            return {
+                'city': location['city'],
+                'region': location['region'],
+                'country': location['country'],
+                'latitude': location['lat'],
+                'longitude': location['lon']
+            }
+            
         try:
             # Usando ipinfo.io como alternativa (não requer pacote adicional)
-            response = requests.get(f'https://ipinfo.io/{ip_address}/json')
+            response = requests.get(f'https://ipinfo.io/{ip_address}/json', timeout=3)
             
             if response.status_code == 200:
                 data = response.json()
@@ -41,7 +56,7 @@ class GeoLocationService:
                     except (ValueError, TypeError):
                         pass
                 
-                return {
+                location = {
                     'city': data.get('city', 'Desconhecido'),
                     'region': data.get('region', 'Desconhecido'),
                     'country': data.get('country', 'Desconhecido'),
@@ -49,20 +64,37 @@ class GeoLocationService:
                     'longitude': lon
                 }
                 
-            return {
-                'city': 'Desconhecido',
-                'region': 'Desconhecido',
-                'country': 'Desconhecido',
-                'latitude': 0,
-                'longitude': 0
-            }
+                # Armazenar no cache compartilhado (mesmo formato do GeoLocationService principal)
+                geo_cache.set(ip_address, {
+                    'city': location['city'],
+                    'region': location['region'],
+                    'country': location['country'],
+                    'lat': lat,
+                    'lon': lon
+                })
+                return location
+                
+            geo_cache.set_not_found(ip_address)
+            return GeoLocationService._unknown_location()
             
         except Exception as e:
             logging.error(f"Erro ao obter dados de geolocalização: {str(e)}")
+            geo_cache.set_not_found(ip_address)
             return {
                 'city': 'Erro',
                 'region': 'Erro',
                 'country': 'Erro',
                 'latitude': 0,
                 'longitude': 0
-            } 
\ No newline at end of file
+            }
+    
+    @staticmethod
+    def _unknown_location():
+        """Localização padrão para IPs não localizados"""
+        return {
+            'city': 'Desconhecido',
+            'region': 'Desconhecido',
+            'country': 'Desconhecido',
+            'latitude': 0,
+            'longitude': 0
+        }
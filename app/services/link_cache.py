@@ -0,0 +1,148 @@
+import logging
+import threading
+from utils.db_adapter import db_adapter
+from utils.ttl_cache import TTLCache
+from config.settings import active_config
+
+
+class LinkCache:
+    """
+    Cache em memória para resolução de links no caminho de redirecionamento.
+
+    Os links são indexados pelo nome (`/<link_name>`) e pelo par
+    (user_id, link_name) usado na rota com prefixo. Alterações feitas pelo
+    próprio processo invalidam as entradas imediatamente; alterações feitas
+    por outros workers são refletidas após o TTL.
+    """
+
+    # O link é carregado junto com a estratégia de balanceamento do dono
+    LINK_QUERY = '''
+        SELECT cl.*, u.balancing_strategy AS user_balancing_strategy
+        FROM custom_links cl
+        LEFT JOIN users u ON u.id = cl.user_id
+    '''
+
+    def __init__(self, max_size=1024, ttl=30):
+        db_adapter.register_statement('link_by_name', self.LINK_QUERY + ' WHERE cl.link_name = %s')
+        db_adapter.register_statement(
+            'link_by_user_and_name',
+            self.LINK_QUERY + ' WHERE cl.link_name = %s AND cl.user_id = %s'
+        )
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._keys_by_id = {}
+        self._lock = threading.Lock()
+        # Incrementado a cada invalidação para descartar leituras concorrentes
+        self._generation = 0
+
+    def get_by_name(self, link_name):
+        """
+        Busca um link pelo nome, consultando o banco apenas em caso de falha no cache
+
+        Args:
+            link_name (str): Nome do link personalizado
+
+        Returns:
+            dict: Registro do link ou None se não encontrado
+        """
+        return self._get(self.name_key(link_name), 'link_by_name', (link_name,))
+
+    def get_by_user_and_name(self, user_id, link_name):
+        """
+        Busca um link pelo par (user_id, link_name) usado na rota com prefixo
+
+        Args:
+            user_id (int): ID do usuário dono do link
+            link_name (str): Nome do link personalizado
+
+        Returns:
+            dict: Registro do link ou None se não encontrado
+        """
+        return self._get(self.user_key(user_id, link_name), 'link_by_user_and_name', (link_name, user_id))
+
+    @staticmethod
+    def name_key(link_name):
+        """Chave do cache para a rota `/<link_name>`"""
+        return ('name', link_name)
+
+    @staticmethod
+    def user_key(user_id, link_name):
+        """Chave do cache para a rota `/<user_id>/<link_name>`"""
+        return ('user', user_id, link_name)
+
+    @property
+    def generation(self):
+        """Geração atual; capturar antes de consultar o banco e repassar a `store`"""
+        return self._generation
+
+    def lookup(self, key):
+        """Busca um link apenas no cache (sem consultar o banco)"""
+        return self._cache.get(key)
+
+    def store(self, key, row, generation):
+        """
+        Armazena um link lido do banco por outro caminho (ex.: driver assíncrono)
+
+        Args:
+            key (tuple): Chave de `name_key` ou `user_key`
+            row (dict): Registro retornado pela consulta do link
+            generation (int): Valor de `generation` capturado antes da consulta
+
+        Returns:
+            dict: Link armazenado, ou None se `row` for vazio
+        """
+        if not row:
+            return None
+
+        link = dict(row)
+        with self._lock:
+            # Não armazenar se o link foi invalidado durante a consulta
+            if generation == self._generation:
+                self._cache.set(key, link)
+                self._keys_by_id.setdefault(link['id'], set()).add(key)
+        return link
+
+    def invalidate(self, link_id=None, link_name=None):
+        """
+        Remove do cache todas as entradas de um link
+
+        Args:
+            link_id (int, optional): ID do link alterado ou removido
+            link_name (str, optional): Nome do link (usado em novos links)
+        """
+        with self._lock:
+            self._generation += 1
+            keys = self._keys_by_id.pop(link_id, set()) if link_id is not None else set()
+
+        if link_name is not None:
+            keys.add(('name', link_name))
+
+        for key in keys:
+            self._cache.pop(key)
+
+        logging.debug(f"Cache de links invalidado: link_id={link_id}, link_name={link_name}")
+
+    def clear(self):
+        """Remove todos os links do cache"""
+        with self._lock:
+            self._generation += 1
+            self._keys_by_id.clear()
+        self._cache.clear()
+
+    def stats(self):
+        """Retorna as estatísticas de acertos e falhas do cache"""
+        return self._cache.stats()
+
+    def _get(self, key, statement, params):
+        link = self._cache.get(key)
+        if link is not None:
+            return link
+
+        generation = self._generation
+        return self.store(key, db_adapter.execute_statement(statement, params), generation)
+
+
+# Instância compartilhada por todo o processo
+link_cache = LinkCache(
+    max_size=active_config.LINK_CACHE_MAX_SIZE,
+    ttl=active_config.LINK_CACHE_TTL
+)
@@ -0,0 +1,123 @@
+import logging
+import itertools
+import threading
+from utils.db_adapter import db_adapter
+from utils.ttl_cache import TTLCache
+from config.settings import active_config
+
+
+class NumberPoolCache:
+    """
+    Cache dos números elegíveis para cada link.
+
+    Um link usa os números atribuídos a ele em `link_numbers` ou, se não houver
+    atribuições, todos os números ativos do dono. Cada entrada guarda uma tupla
+    imutável de números e uma versão, que muda a cada reconstrução e permite
+    que o balanceador reaproveite seu estado enquanto o conjunto não mudar.
+    """
+
+    POOL_QUERY = '''
+        SELECT wn.*
+        FROM whatsapp_numbers wn
+        WHERE wn.user_id = %(user_id)s AND wn.is_active = 1
+        AND (
+            NOT EXISTS (SELECT 1 FROM link_numbers WHERE link_id = %(link_id)s)
+            OR wn.id IN (SELECT number_id FROM link_numbers WHERE link_id = %(link_id)s)
+        )
+        ORDER BY wn.id
+    '''
+
+    def __init__(self, max_size=1024, ttl=30):
+        db_adapter.register_statement('link_number_pool', self.POOL_QUERY)
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._links_by_user = {}
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        # Incrementado a cada invalidação para descartar leituras concorrentes
+        self._generation = 0
+
+    def get(self, link):
+        """
+        Retorna os números elegíveis de um link
+
+        Args:
+            link (dict): Registro do link (id e user_id)
+
+        Returns:
+            tuple: (version, numbers) - Versão do conjunto e tupla de números
+        """
+        entry = self._cache.get(link['id'])
+        if entry is not None:
+            return entry
+
+        generation = self._generation
+        # Tuplas convertidas uma única vez em dicionários simples (sem o RealDictRow por linha)
+        rows = db_adapter.execute_statement(
+            'link_number_pool',
+            {'link_id': link['id'], 'user_id': link['user_id']},
+            fetch_all=True,
+            row_format='tuple'
+        )
+        return self.store(link, rows.dicts() if rows else (), generation)
+
+    @property
+    def generation(self):
+        """Geração atual; capturar antes de consultar o banco e repassar a `store`"""
+        return self._generation
+
+    def lookup(self, link_id):
+        """Busca o conjunto de números de um link apenas no cache"""
+        return self._cache.get(link_id)
+
+    def store(self, link, rows, generation):
+        """
+        Armazena o conjunto de números lido do banco por outro caminho (ex.: driver assíncrono)
+
+        Args:
+            link (dict): Registro do link (id e user_id)
+            rows (list): Linhas (dicionários) retornadas pela consulta POOL_QUERY
+            generation (int): Valor de `generation` capturado antes da consulta
+
+        Returns:
+            tuple: (version, numbers) - Mesmo retorno de `get`
+        """
+        entry = (next(self._versions), tuple(rows or ()))
+        with self._lock:
+            # Não armazenar se o conjunto foi invalidado durante a consulta
+            if generation == self._generation:
+                self._cache.set(link['id'], entry)
+                self._links_by_user.setdefault(link['user_id'], set()).add(link['id'])
+        return entry
+
+    def invalidate_link(self, link_id):
+        """Descarta o conjunto de números de um link (atribuições alteradas)"""
+        with self._lock:
+            self._generation += 1
+        self._cache.pop(link_id)
+
+    def invalidate_user(self, user_id):
+        """Descarta os conjuntos de todos os links de um usuário (números alterados)"""
+        with self._lock:
+            self._generation += 1
+            link_ids = self._links_by_user.pop(user_id, set())
+        for link_id in link_ids:
+            self._cache.pop(link_id)
+        logging.debug(f"Conjuntos de números invalidados para user_id={user_id}")
+
+    def clear(self):
+        """Remove todos os conjuntos do cache"""
+        with self._lock:
+            self._generation += 1
+            self._links_by_user.clear()
+        self._cache.clear()
+
+    def stats(self):
+        """Retorna as estatísticas de acertos e falhas do cache"""
+        return self._cache.stats()
+
+
+# Instância compartilhada por todo o processo
+number_pool = NumberPoolCache(
+    max_size=active_config.NUMBER_POOL_CACHE_MAX_SIZE,
+    ttl=active_config.NUMBER_POOL_CACHE_TTL
+)
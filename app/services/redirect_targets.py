@@ -0,0 +1,74 @@
+from urllib.parse import quote
+from utils.ttl_cache import TTLCache
+from config.settings import active_config
+
+
+def whatsapp_digits(phone_number):
+    """
+    Normaliza um telefone para o formato usado pelo wa.me (apenas dígitos, com DDI)
+
+    Args:
+        phone_number (str): Número de telefone original
+
+    Returns:
+        str: Número formatado para o WhatsApp
+    """
+    # Remover caracteres não numéricos
+    digits_only = ''.join(filter(str.isdigit, phone_number))
+
+    # Garantir que o número comece com código do país
+    if not digits_only.startswith('55'):
+        digits_only = '55' + digits_only
+
+    return digits_only
+
+
+def build_whatsapp_url(phone_number, message=None):
+    """Monta a URL final do wa.me com a mensagem codificada para URL"""
+    url = f"https://wa.me/{whatsapp_digits(phone_number)}"
+    if message:
+        url += f"?text={quote(message, safe='')}"
+    return url
+
+
+class RedirectTargetCache:
+    """
+    Cache das URLs finais de redirecionamento
+
+    As URLs são indexadas pelo telefone e pela mensagem, exatamente o que
+    compõe a URL. Recarregar um link sem alterar a mensagem reaproveita as
+    entradas; uma mensagem nova gera uma nova chave e as entradas antigas
+    saem por LRU/TTL.
+    """
+
+    def __init__(self, max_size=4096, ttl=3600):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get(self, number, message):
+        """
+        Retorna a URL de redirecionamento para o número e a mensagem
+
+        Args:
+            number (dict): Número selecionado (id e phone_number)
+            message (str): Mensagem do link
+
+        Returns:
+            str: URL https://wa.me/<dígitos>?text=<mensagem codificada>
+        """
+        key = (number['phone_number'], message)
+        url = self._cache.get(key)
+        if url is None:
+            url = build_whatsapp_url(number['phone_number'], message)
+            self._cache.set(key, url)
+        return url
+
+    def stats(self):
+        """Retorna as estatísticas de acertos e falhas do cache"""
+        return self._cache.stats()
+
+
+# Instância compartilhada por todo o processo
+redirect_targets = RedirectTargetCache(
+    max_size=active_config.REDIRECT_TARGET_CACHE_MAX_SIZE,
+    ttl=active_config.REDIRECT_TARGET_CACHE_TTL
+)
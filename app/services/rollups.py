@@ -0,0 +1,236 @@
+"""
+Agregados de cliques por hora e por dia
+
+    python -m app.services.rollups status
+    python -m app.services.rollups refresh
+    python -m app.services.rollups rebuild
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from config.settings import active_config
+from utils.db_adapter import db_adapter
+from utils.unit_of_work import unit_of_work
+
+
+# Maior id já agregado; as consultas somam os agregados e os logs acima dele (a "cauda")
+TAIL_ID = "COALESCE((SELECT last_id FROM stats_rollup_state WHERE name = 'redirect_stats'), 0)"
+
+
+class StatsRollups:
+    """
+    Manutenção incremental de `redirect_stats_hourly` e `redirect_stats_daily`.
+
+    Cada atualização lê os logs com id acima da marca d'água (`stats_rollup_state`),
+    soma-os às tabelas agregadas e avança a marca, tudo na mesma transação.
+    Logs mais novos que `settle_seconds` (e os ids acima deles) ficam para a
+    próxima atualização, para que a geolocalização (gravada depois do clique)
+    já esteja no país agregado. Os agregados de um link são excluídos em
+    cascata com ele, assim como os logs.
+    As consultas de estatísticas somam os agregados à cauda de logs acima da
+    marca, então o resultado é exato mesmo entre duas atualizações.
+    """
+
+    STATE_NAME = 'redirect_stats'
+
+    # SKIP LOCKED: se outro worker estiver atualizando, este apenas desiste
+    LOCK_STATE_QUERY = 'SELECT last_id FROM stats_rollup_state WHERE name = %s FOR UPDATE SKIP LOCKED'
+
+    # O lote para antes do primeiro log ainda não assentado: a marca d'água só
+    # avança sobre ids contíguos, senão esse log ficaria abaixo dela para sempre
+    BATCH_QUERY = '''
+        SELECT MAX(id) AS upper, COUNT(*) AS total FROM (
+            SELECT id FROM redirect_logs
+            WHERE id > %(last_id)s
+            AND id < COALESCE(
+                (SELECT MIN(id) FROM redirect_logs
+                 WHERE id > %(last_id)s AND redirect_time >= %(settled_before)s),
+                9223372036854775807
+            )
+            ORDER BY id
+            LIMIT %(batch_size)s
+        ) batch
+    '''
+
+    ROLLUP_QUERY = '''
+        INSERT INTO {table} AS t (user_id, {bucket}, link_id, number_id, country, clicks, last_redirect)
+        SELECT cl.user_id, {expression}, rl.link_id, COALESCE(rl.number_id, 0), COALESCE(rl.country, ''),
+               COUNT(*), MAX(rl.redirect_time)
+        FROM redirect_logs rl
+        JOIN custom_links cl ON cl.id = rl.link_id
+        WHERE rl.id > %(last_id)s AND rl.id <= %(upper)s
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT (user_id, {bucket}, link_id, number_id, country) DO UPDATE
+        SET clicks = t.clicks + EXCLUDED.clicks,
+            last_redirect = GREATEST(t.last_redirect, EXCLUDED.last_redirect)
+    '''
+
+    HOURLY_QUERY = ROLLUP_QUERY.format(
+        table='redirect_stats_hourly', bucket='hour', expression="date_trunc('hour', rl.redirect_time)"
+    )
+    DAILY_QUERY = ROLLUP_QUERY.format(
+        table='redirect_stats_daily', bucket='day', expression='rl.redirect_time::date'
+    )
+
+    ADVANCE_QUERY = 'UPDATE stats_rollup_state SET last_id = %s, updated_at = CURRENT_TIMESTAMP WHERE name = %s'
+
+    def __init__(self, refresh_interval=60, settle_seconds=300, batch_size=50000):
+        """
+        Args:
+            refresh_interval (float): Intervalo da atualização em segundo plano (0 desativa a thread)
+            settle_seconds (float): Idade mínima dos logs agregados
+            batch_size (int): Logs por transação de atualização
+        """
+        self.refresh_interval = refresh_interval
+        self.settle_seconds = settle_seconds
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._metrics = Counter()
+        self._last_refresh_ms = 0.0
+
+    def refresh(self, max_batches=None):
+        """
+        Agrega os logs pendentes, em lotes de `batch_size`
+
+        Args:
+            max_batches (int, optional): Limite de lotes nesta chamada. Defaults to None (até alcançar).
+
+        Returns:
+            int: Logs agregados
+        """
+        started = time.monotonic()
+        total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            processed = self._refresh_batch()
+            if not processed:
+                break
+            total += processed
+            batches += 1
+
+        self._metrics['refreshes'] += 1
+        self._metrics['rows'] += total
+        self._last_refresh_ms = round((time.monotonic() - started) * 1000, 2)
+        if total:
+            logging.info(f"Agregados de cliques atualizados: {total} logs em {batches} lote(s)")
+        return total
+
+    def rebuild(self):
+        """Apaga os agregados e os recalcula a partir de todos os logs"""
+        with unit_of_work():
+            db_adapter.execute_query('TRUNCATE redirect_stats_hourly, redirect_stats_daily', commit=True)
+            db_adapter.execute_query(self.ADVANCE_QUERY, (0, self.STATE_NAME), commit=True)
+        return self.refresh()
+
+    def status(self):
+        """Marca d'água e logs ainda não agregados"""
+        return db_adapter.execute_query(f'''
+            SELECT {TAIL_ID} AS last_id,
+                   (SELECT updated_at FROM stats_rollup_state WHERE name = %s) AS updated_at,
+                   (SELECT COUNT(*) FROM redirect_logs WHERE id > {TAIL_ID}) AS pending
+        ''', (self.STATE_NAME,))
+
+    def ensure_started(self):
+        """Inicia a atualização periódica neste processo (chamado pelas consultas de estatísticas)"""
+        if not self.refresh_interval:
+            return
+        # A thread é criada no processo do worker (após o fork do gunicorn)
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='stats-rollups', daemon=True)
+            self._thread.start()
+            logging.info(f"Atualização dos agregados de cliques iniciada (intervalo={self.refresh_interval}s)")
+
+    def stats(self):
+        """
+        Retorna as métricas da atualização dos agregados
+
+        Returns:
+            dict: Atualizações, logs agregados, falhas e duração da última atualização
+        """
+        return {
+            'refresh_interval': self.refresh_interval,
+            'settle_seconds': self.settle_seconds,
+            'refreshes': self._metrics['refreshes'],
+            'rows': self._metrics['rows'],
+            'failed': self._metrics['failed'],
+            'last_refresh_ms': self._last_refresh_ms
+        }
+
+    def _refresh_batch(self):
+        with unit_of_work():
+            state = db_adapter.execute_query(self.LOCK_STATE_QUERY, (self.STATE_NAME,))
+            if not state:
+                return 0
+
+            params = {
+                'last_id': state['last_id'],
+                'settled_before': datetime.now() - timedelta(seconds=self.settle_seconds),
+                'batch_size': self.batch_size
+            }
+            batch = db_adapter.execute_query(self.BATCH_QUERY, params)
+            if not batch or batch['upper'] is None:
+                return 0
+
+            params['upper'] = batch['upper']
+            db_adapter.execute_query(self.HOURLY_QUERY, params, commit=True)
+            db_adapter.execute_query(self.DAILY_QUERY, params, commit=True)
+            db_adapter.execute_query(self.ADVANCE_QUERY, (batch['upper'], self.STATE_NAME), commit=True)
+            return batch['total']
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self._metrics['failed'] += 1
+                logging.error(f"Erro ao atualizar os agregados de cliques: {str(e)}")
+
+
+# Instância compartilhada por todo o processo
+stats_rollups = StatsRollups(
+    refresh_interval=active_config.STATS_ROLLUP_REFRESH_INTERVAL,
+    settle_seconds=active_config.STATS_ROLLUP_SETTLE_SECONDS,
+    batch_size=active_config.STATS_ROLLUP_BATCH_SIZE
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m app.services.rollups', description="Agregados de cliques")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help="Marca d'água e logs pendentes")
+    commands.add_parser('refresh', help="Agrega os logs pendentes")
+    commands.add_parser('rebuild', help="Recalcula os agregados a partir de todos os logs")
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        status = stats_rollups.status()
+        print(f"Último id agregado: {status['last_id']} ({status['updated_at']}); pendentes: {status['pending']}")
+    elif args.command == 'refresh':
+        print(f"Logs agregados: {stats_rollups.refresh()}")
+    else:
+        print(f"Logs agregados: {stats_rollups.rebuild()}")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] [%(levelname)s] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Filtros comuns das consultas de estatísticas
+
+Os períodos viram intervalos semiabertos sobre o timestamp
+(`redirect_time >= início AND redirect_time < fim`), que usam os índices de
+redirect_time, em vez de `redirect_time::date BETWEEN`, que os ignora.
+"""
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+from config.settings import active_config
+
+
+class StatsQuery:
+    """
+    Monta as condições de usuário, período e link das consultas sobre
+    redirect_logs (rl) + custom_links (cl) e sobre os agregados de cliques.
+
+    As datas são dias do fuso do cliente (`STATS_TIMEZONE`); sem fuso, dias do
+    relógio em que redirect_time é gravado. O fim é inclusivo, como nos filtros
+    do dashboard: 2024-05-01..2024-05-31 vira [2024-05-01 00:00, 2024-06-01 00:00).
+    Como os agregados por hora atendem os fusos de cliente, fusos cuja meia-noite
+    não cai em hora inteira (ex.: Asia/Kolkata, +05:30) são recusados.
+    """
+
+    def __init__(self, user_id, start_date=None, end_date=None, link_id=None, timezone=None):
+        """
+        Args:
+            user_id (int): ID do usuário
+            start_date (str/date, optional): Primeiro dia (YYYY-MM-DD). Defaults to None.
+            end_date (str/date, optional): Último dia, inclusivo (YYYY-MM-DD). Defaults to None.
+            link_id (int/str, optional): ID do link ('all' ou vazio = todos). Defaults to None.
+            timezone (str, optional): Fuso dos dias (IANA). Defaults to None (STATS_TIMEZONE).
+        """
+        self.user_id = user_id
+        self.start_date = self._parse_date(start_date)
+        self.end_date = self._parse_date(end_date)
+        # Período só com as duas datas, como antes
+        if not (self.start_date and self.end_date):
+            self.start_date = self.end_date = None
+        self.link_id = int(link_id) if link_id and link_id != 'all' else None
+
+        self.timezone = active_config.STATS_TIMEZONE if timezone is None else timezone
+        if self.timezone:
+            zone = ZoneInfo(self.timezone)  # Fuso inválido falha aqui, não no banco
+            if self.has_period:
+                for day in (self.start_date, self.end_date + timedelta(days=1)):
+                    check_whole_hours(zone, datetime.combine(day, time()))
+
+    @classmethod
+    def from_args(cls, user_id, args):
+        """Cria o filtro a partir dos parâmetros da requisição (start_date, end_date, link_id)"""
+        return cls(user_id, args.get('start_date'), args.get('end_date'), args.get('link_id'))
+
+    @property
+    def has_period(self):
+        return self.start_date is not None
+
+    @property
+    def days(self):
+        """Dias do período (0 sem período)"""
+        return (self.end_date - self.start_date).days + 1 if self.has_period else 0
+
+    @property
+    def suffix(self):
+        """Identifica a forma do SQL gerado (nome dos statements preparados)"""
+        suffix = ''
+        if self.has_period:
+            suffix += '_tz' if self.timezone else '_period'
+        if self.link_id:
+            suffix += '_link'
+        return suffix
+
+    def range(self, column):
+        """
+        Condição semiaberta do período sobre uma coluna de timestamp
+
+        Returns:
+            tuple: (sql, params) - sql vazio sem período
+        """
+        if not self.has_period:
+            return '', []
+        start, end = self.start_date.isoformat(), (self.end_date + timedelta(days=1)).isoformat()
+        if self.timezone:
+            # Meia-noite no fuso do cliente, convertida para o fuso da sessão (o de redirect_time)
+            bound = "(%s::timestamp AT TIME ZONE %s) AT TIME ZONE current_setting('TimeZone')"
+            return f"{column} >= {bound} AND {column} < {bound}", [start, self.timezone, end, self.timezone]
+        return f"{column} >= %s::timestamp AND {column} < %s::timestamp", [start, end]
+
+    def where(self, time_column='rl.redirect_time', user_column='cl.user_id', link_column='cl.id'):
+        """
+        Condições de usuário, período e link
+
+        Returns:
+            tuple: (conditions, params)
+        """
+        conditions = [f"{user_column} = %s"]
+        params = [self.user_id]
+
+        period, period_params = self.range(time_column)
+        if period:
+            conditions.append(period)
+            params.extend(period_params)
+
+        if self.link_id:
+            conditions.append(f"{link_column} = %s")
+            params.append(self.link_id)
+
+        return conditions, params
+
+    def rollup(self, alias='d'):
+        """
+        Tabela de agregados e condições equivalentes a `where()`
+
+        Os agregados diários usam os dias de redirect_time; com fuso do cliente,
+        usa-se a tabela por hora, cujos limites coincidem com os do fuso
+        (deslocamento de horas inteiras, verificado na criação do filtro).
+
+        Returns:
+            tuple: (table, conditions, params)
+        """
+        if self.timezone:
+            conditions, params = self.where(f'{alias}.hour', f'{alias}.user_id', f'{alias}.link_id')
+            return 'redirect_stats_hourly', conditions, params
+
+        conditions = [f"{alias}.user_id = %s"]
+        params = [self.user_id]
+        if self.has_period:
+            conditions.append(f"{alias}.day >= %s::date AND {alias}.day < %s::date")
+            params.extend([self.start_date.isoformat(), (self.end_date + timedelta(days=1)).isoformat()])
+        if self.link_id:
+            conditions.append(f"{alias}.link_id = %s")
+            params.append(self.link_id)
+        return 'redirect_stats_daily', conditions, params
+
+    @staticmethod
+    def _parse_date(value):
+        if not value:
+            return None
+        if isinstance(value, str):
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        return value
+
+
+def check_whole_hours(zone, moment):
+    """
+    Verifica se o deslocamento do fuso no momento é de horas inteiras (limites dos agregados por hora)
+
+    Raises:
+        ValueError: Se o deslocamento do fuso nesse momento tiver minutos
+    """
+    offset = moment.replace(tzinfo=zone).utcoffset()
+    if offset % timedelta(hours=1):
+        raise ValueError(
+            f"Fuso '{zone.key}' com deslocamento {offset} não é atendido pelos agregados por hora; "
+            f"use um fuso de horas inteiras"
+        )
+
+
+if active_config.STATS_TIMEZONE:
+    check_whole_hours(ZoneInfo(active_config.STATS_TIMEZONE), datetime.now())
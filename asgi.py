@@ -0,0 +1,146 @@
+"""
+Servidor ASGI com o redirecionamento assíncrono
+
+As rotas de redirecionamento (`/<link_name>` e `/<user_id>/<link_name>`)
+são atendidas sobre asyncio com o pool asyncpg; todas as demais rotas são
+repassadas à aplicação Flask. Links inexistentes, inativos ou sem números
+recebem a mesma página 404 do Flask, gerada aqui sem refazer as consultas.
+
+    uvicorn asgi:app --workers 4
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+"""
+import asyncio
+import logging
+from werkzeug.exceptions import NotFound
+from main import app as flask_app
+from app.routes.redirect_routes import client_ip_from_headers
+from app.services.async_redirect import async_redirects
+from app.services.click_pipeline import click_pipeline
+from app.services.geo_worker import geo_enrichment
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:  # pragma: no cover - sem asgiref, apenas os redirecionamentos são servidos
+    WsgiToAsgi = None
+
+
+REDIRECT_ENDPOINTS = {'redirect.redirect_to_whatsapp', 'redirect.redirect_with_prefix'}
+
+
+class RedirectASGIApp:
+    """Aplicação ASGI: redirecionamentos assíncronos e o restante via Flask"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.fallback = WsgiToAsgi(wsgi_app) if WsgiToAsgi is not None else None
+        # Mesmas regras de roteamento do Flask (rotas fixas têm prioridade sobre /<link_name>)
+        self.url_adapter = wsgi_app.url_map.bind('localhost')
+        self.started = False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD') and self.started:
+            response = await self._redirect(scope)
+            if response is not None:
+                status, headers, body = response
+                await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+                await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+                return
+
+        await self._delegate(scope, receive, send)
+
+    async def _redirect(self, scope):
+        """
+        Atende um redirecionamento
+
+        Returns:
+            tuple: (status, headers, body), ou None para repassar ao Flask
+        """
+        try:
+            endpoint, args = self.url_adapter.match(scope['path'], method='GET')
+        except Exception:
+            return None
+        if endpoint not in REDIRECT_ENDPOINTS:
+            return None
+
+        user_id = None
+        if 'prefix' in args:
+            try:
+                user_id = int(args['prefix'])
+            except ValueError:
+                return None
+
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+        client = scope.get('client')
+        client_ip = client_ip_from_headers(lambda name: headers.get(name.lower()), client[0] if client else None)
+
+        try:
+            url, error = await async_redirects.redirect(
+                args['link_name'], user_id, client_ip=client_ip, user_agent=headers.get('user-agent', '')
+            )
+        except Exception as e:
+            # O clique só é registrado depois da última etapa que pode falhar, então
+            # repassar ao Flask (ex.: pool asyncpg indisponível) não o grava duas vezes
+            logging.error(f"Erro no redirecionamento assíncrono para {scope['path']}: {str(e)}")
+            return None
+
+        if error:
+            logging.warning(f"Falha no redirecionamento para {scope['path']}: {error}")
+            return self._error_page(scope, headers, error)
+        return 302, [(b'location', url.encode('latin-1')), (b'content-length', b'0')], b''
+
+    def _error_page(self, scope, headers, error):
+        # Mesma resposta do abort(404) das rotas de redirecionamento, sem acesso ao banco
+        with self.wsgi_app.test_request_context(scope['path'], headers=list(headers.items())):
+            response = self.wsgi_app.make_response(
+                self.wsgi_app.handle_http_exception(NotFound(description=error))
+            )
+        body = response.get_data()
+        response.headers['Content-Length'] = str(len(body))
+        return (
+            response.status_code,
+            [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()],
+            body
+        )
+
+    async def _delegate(self, scope, receive, send):
+        if scope['type'] == 'http' and self.fallback is not None:
+            await self.fallback(scope, receive, send)
+            return
+
+        if scope['type'] == 'http':
+            body = 'Não encontrado'.encode('utf-8')
+            await send({
+                'type': 'http.response.start',
+                'status': 404,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8'), (b'content-length', str(len(body)).encode())]
+            })
+            await send({'type': 'http.response.body', 'body': body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await async_redirects.start()
+                except Exception as e:
+                    # Sem o pool assíncrono, os redirecionamentos seguem pelo Flask
+                    logging.error(f"Redirecionamento assíncrono desativado: {str(e)}")
+                else:
+                    self.started = True
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.started = False
+                await async_redirects.close()
+                loop = asyncio.get_running_loop()
+                # Gravar os cliques e localizações pendentes
+                await loop.run_in_executor(None, click_pipeline.shutdown)
+                await loop.run_in_executor(None, geo_enrichment.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = RedirectASGIApp(flask_app)
@@ -0,0 +1,89 @@
+"""
+Compara a hidratação de modelos a partir de linhas RealDictRow e de tuplas
+
+Mede, para cada modelo, o tempo e a memória alocada por linha em dois caminhos:
+
+    antes:  RealDictCursor (um RealDictRow por linha) -> _from_db_result
+    depois: cursor de tuplas (RowSet) -> _from_rows (__slots__)
+
+As linhas são sintéticas, com as mesmas colunas das tabelas; não é preciso
+banco de dados.
+
+    python -m benchmarks.row_hydration [--rows 10000] [--repeat 5]
+"""
+import sys
+import os
+import argparse
+import timeit
+import tracemalloc
+from datetime import datetime
+from psycopg2.extras import RealDictRow
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rows import RowSet
+from app.models.whatsapp_number import WhatsAppNumber
+from app.models.custom_link import CustomLink
+from app.models.redirect_log import RedirectLog
+
+
+def number_row(i):
+    return (i, f'55119{i:08d}', f'Atendente {i}', 1, 1, i * 3, 1, None)
+
+
+def link_row(i):
+    return (i, f'promo-{i}', 1, 1, 'Olá! Vim pelo link', i * 7, None)
+
+
+def log_row(i):
+    return (i, i % 50, i % 8, datetime(2024, 1, 1), '200.100.50.25',
+            'Mozilla/5.0 (Linux; Android 13)', 'Olá', 'São Paulo', 'SP', 'BR', -23.55, -46.63)
+
+
+CASES = (
+    (WhatsAppNumber, WhatsAppNumber.FIELDS, number_row),
+    (CustomLink, CustomLink.FIELDS, link_row),
+    (RedirectLog, RedirectLog.FIELDS, log_row),
+)
+
+
+def measure(build, repeat):
+    """Retorna (segundos da melhor execução, bytes alocados no pico) de `build()`"""
+    seconds = min(timeit.repeat(build, number=1, repeat=repeat))
+
+    tracemalloc.start()
+    result = build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de hidratação de modelos")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'modelo':<16}{'caminho':<10}{'µs/linha':>10}{'bytes/linha':>14}")
+    for model, columns, make_row in CASES:
+        tuples = [make_row(i) for i in range(args.rows)]
+
+        # Antes: o cursor cria um RealDictRow por linha e o modelo copia os valores
+        def before():
+            rows = [RealDictRow(zip(columns, row)) for row in tuples]
+            return [model._from_db_result(row) for row in rows]
+
+        # Depois: o cursor entrega as tuplas e o modelo lê pelas posições das colunas
+        def after():
+            rows = RowSet(list(tuples), columns)
+            return model._from_rows(rows)
+
+        for label, build in (('antes', before), ('depois', after)):
+            seconds, peak = measure(build, args.repeat)
+            print(f"{model.__name__:<16}{label:<10}"
+                  f"{seconds * 1e6 / args.rows:>10.2f}{peak / args.rows:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
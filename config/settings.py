@@ -17,6 +17,113 @@ class Config:
     POSTGRES_USER = os.environ.get('PGUSER', 'postgres')
     POSTGRES_PASSWORD = os.environ.get('PGPASSWORD', 'nsAgxYUGJuIRXTalVIdclsTDecKEsgpc')
     
+    # Pool de conexões do PostgreSQL (por processo)
+    DB_POOL_ENABLED = os.environ.get('DB_POOL_ENABLED', 'True').lower() == 'true'
+    DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 1))
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+    DB_POOL_MAX_LIFETIME = int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_HEALTH_CHECK_AFTER = float(os.environ.get('DB_POOL_HEALTH_CHECK_AFTER', 30))
+    # Consultas frequentes executadas com PREPARE/EXECUTE; desativar atrás de
+    # pooler em modo transação (ex.: PgBouncer pool_mode=transaction)
+    DB_PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS', 'True').lower() == 'true'
+    DB_TRANSACTION_POOLER = os.environ.get('DB_TRANSACTION_POOLER', 'False').lower() == 'true'
+    # Linhas buscadas por vez nas consultas em partes (db_adapter.stream_query)
+    DB_STREAM_CHUNK_SIZE = int(os.environ.get('DB_STREAM_CHUNK_SIZE', 2000))
+    
+    # Réplica de leitura para relatórios (PG*_RO); sem PGHOST_RO tudo vai para o primário
+    POSTGRES_REPLICA_HOST = os.environ.get('PGHOST_RO')
+    POSTGRES_REPLICA_PORT = os.environ.get('PGPORT_RO', POSTGRES_PORT)
+    POSTGRES_REPLICA_DB = os.environ.get('PGDATABASE_RO', POSTGRES_DB)
+    POSTGRES_REPLICA_USER = os.environ.get('PGUSER_RO', POSTGRES_USER)
+    POSTGRES_REPLICA_PASSWORD = os.environ.get('PGPASSWORD_RO', POSTGRES_PASSWORD)
+    # Atraso máximo aceito (s), tempo fora após falha (s) e validade da medição de atraso (s)
+    REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 30))
+    REPLICA_RETRY_AFTER = float(os.environ.get('REPLICA_RETRY_AFTER', 30))
+    REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 5))
+    
+    # Perfil das consultas: tempo por requisição/endpoint e log de consultas lentas
+    DB_PROFILER_ENABLED = os.environ.get('DB_PROFILER_ENABLED', 'True').lower() == 'true'
+    DB_PROFILER_MAX_STATEMENTS = int(os.environ.get('DB_PROFILER_MAX_STATEMENTS', 500))
+    DB_SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 200))
+    # Fração das consultas SELECT lentas que recebem EXPLAIN (ANALYZE, BUFFERS); 0 desativa
+    DB_SLOW_QUERY_EXPLAIN_RATE = float(os.environ.get('DB_SLOW_QUERY_EXPLAIN_RATE', 0))
+    
+    # Pool asyncpg do servidor ASGI de redirecionamento (asgi.py), por processo
+    ASYNC_DB_POOL_MIN_SIZE = int(os.environ.get('ASYNC_DB_POOL_MIN_SIZE', 2))
+    ASYNC_DB_POOL_MAX_SIZE = int(os.environ.get('ASYNC_DB_POOL_MAX_SIZE', 20))
+    ASYNC_DB_COMMAND_TIMEOUT = float(os.environ.get('ASYNC_DB_COMMAND_TIMEOUT', 5))
+    
+    # Orçamento de tempo para importar a aplicação e executar create_app (ms)
+    STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 1000))
+    # Verificar a versão do esquema no processo principal do gunicorn (uma vez por deploy)
+    SCHEMA_CHECK_ON_START = os.environ.get('SCHEMA_CHECK_ON_START', 'True').lower() == 'true'
+    
+    # Partições de redirect_logs por redirect_time: 'month', 'week' ou 'day'
+    REDIRECT_LOG_PARTITION_INTERVAL = os.environ.get('REDIRECT_LOG_PARTITION_INTERVAL', 'month')
+    # Partições futuras mantidas criadas pela manutenção
+    REDIRECT_LOG_PARTITIONS_AHEAD = int(os.environ.get('REDIRECT_LOG_PARTITIONS_AHEAD', 3))
+    # Retenção dos logs em dias para planos sem log_retention_days (0 = ilimitada)
+    REDIRECT_LOG_RETENTION_DAYS = int(os.environ.get('REDIRECT_LOG_RETENTION_DAYS', 0))
+    # Partições fora da retenção: 'detach' (mantém a tabela para arquivo) ou 'drop'
+    REDIRECT_LOG_RETENTION_ACTION = os.environ.get('REDIRECT_LOG_RETENTION_ACTION', 'detach')
+    # Linhas por lote na conversão da tabela e na limpeza por plano
+    REDIRECT_LOG_BATCH_SIZE = int(os.environ.get('REDIRECT_LOG_BATCH_SIZE', 10000))
+    
+    # Cache de links usado no caminho de redirecionamento
+    LINK_CACHE_MAX_SIZE = int(os.environ.get('LINK_CACHE_MAX_SIZE', 1024))
+    LINK_CACHE_TTL = int(os.environ.get('LINK_CACHE_TTL', 30))
+
+    # Cache dos números elegíveis por link
+    NUMBER_POOL_CACHE_MAX_SIZE = int(os.environ.get('NUMBER_POOL_CACHE_MAX_SIZE', 1024))
+    NUMBER_POOL_CACHE_TTL = int(os.environ.get('NUMBER_POOL_CACHE_TTL', 30))
+    
+    # Cache das URLs finais do wa.me por telefone/mensagem
+    REDIRECT_TARGET_CACHE_MAX_SIZE = int(os.environ.get('REDIRECT_TARGET_CACHE_MAX_SIZE', 4096))
+    REDIRECT_TARGET_CACHE_TTL = int(os.environ.get('REDIRECT_TARGET_CACHE_TTL', 3600))
+    
+    # Pipeline write-behind de cliques (registro assíncrono em lotes)
+    CLICK_PIPELINE_ENABLED = os.environ.get('CLICK_PIPELINE_ENABLED', 'False').lower() == 'true'
+    CLICK_PIPELINE_BATCH_SIZE = int(os.environ.get('CLICK_PIPELINE_BATCH_SIZE', 500))
+    CLICK_PIPELINE_FLUSH_INTERVAL = float(os.environ.get('CLICK_PIPELINE_FLUSH_INTERVAL', 1.0))
+    CLICK_PIPELINE_QUEUE_SIZE = int(os.environ.get('CLICK_PIPELINE_QUEUE_SIZE', 10000))
+    # Novas tentativas de um lote que falhou (espera dobrada a cada uma) antes de gravar evento a evento
+    CLICK_PIPELINE_MAX_RETRIES = int(os.environ.get('CLICK_PIPELINE_MAX_RETRIES', 3))
+    CLICK_PIPELINE_RETRY_BACKOFF = float(os.environ.get('CLICK_PIPELINE_RETRY_BACKOFF', 0.5))
+    
+    # Agregados de cliques por hora/dia (0 = sem atualização em segundo plano; use a CLI/cron)
+    STATS_ROLLUP_REFRESH_INTERVAL = float(os.environ.get('STATS_ROLLUP_REFRESH_INTERVAL', 60))
+    # Idade mínima dos logs agregados (tempo para a geolocalização preencher o país)
+    STATS_ROLLUP_SETTLE_SECONDS = int(os.environ.get('STATS_ROLLUP_SETTLE_SECONDS', 300))
+    STATS_ROLLUP_BATCH_SIZE = int(os.environ.get('STATS_ROLLUP_BATCH_SIZE', 50000))
+    
+    # Fuso dos dias nos filtros de estatísticas (IANA, ex.: America/Sao_Paulo; vazio = fuso do banco)
+    STATS_TIMEZONE = os.environ.get('STATS_TIMEZONE', '')
+    
+    # Seções do /api/dashboard/bundle executadas em paralelo (cada uma usa uma conexão do pool)
+    DASHBOARD_BUNDLE_WORKERS = int(os.environ.get('DASHBOARD_BUNDLE_WORKERS', 4))
+    DASHBOARD_BUNDLE_TIMEOUT = float(os.environ.get('DASHBOARD_BUNDLE_TIMEOUT', 10))
+    
+    # Workers de geolocalização dos logs (fora do caminho da requisição)
+    GEO_WORKERS = int(os.environ.get('GEO_WORKERS', 2))
+    GEO_BATCH_SIZE = int(os.environ.get('GEO_BATCH_SIZE', 100))
+    GEO_FLUSH_INTERVAL = float(os.environ.get('GEO_FLUSH_INTERVAL', 2.0))
+    GEO_QUEUE_SIZE = int(os.environ.get('GEO_QUEUE_SIZE', 10000))
+    
+    # Base local de geolocalização (CSV de faixas ou binário gerado por utils/geo_ipdb.py)
+    GEOIP_DB_PATH = os.environ.get('GEOIP_DB_PATH', '')
+    GEOIP_RELOAD_INTERVAL = float(os.environ.get('GEOIP_RELOAD_INTERVAL', 5))
+    # Consultar ipinfo.io/ip-api.com/freegeoip.app quando o IP não estiver na base local
+    GEOIP_REMOTE_FALLBACK = os.environ.get('GEOIP_REMOTE_FALLBACK', 'True').lower() == 'true'
+    
+    # Cache de geolocalização por prefixo (/24 IPv4, /48 IPv6)
+    GEO_CACHE_MAX_SIZE = int(os.environ.get('GEO_CACHE_MAX_SIZE', 10000))
+    GEO_CACHE_TTL = int(os.environ.get('GEO_CACHE_TTL', 86400))
+    GEO_CACHE_NEGATIVE_TTL = int(os.environ.get('GEO_CACHE_NEGATIVE_TTL', 300))
+    
+    # Estratégia de balanceamento usada quando o link e o usuário não definem uma
+    BALANCING_STRATEGY = os.environ.get('BALANCING_STRATEGY', 'least_used')
+    
     # Outras configurações
     SESSION_TYPE = 'filesystem'
     PERMANENT_SESSION_LIFETIME = timedelta(days=31)
@@ -0,0 +1,26 @@
+# Configuração carregada automaticamente pelo gunicorn (./gunicorn.conf.py)
+
+
+def when_ready(server):
+    """Verifica a versão do esquema uma única vez, no processo principal (não em cada worker)"""
+    from config.settings import active_config
+    if not active_config.SCHEMA_CHECK_ON_START:
+        return
+    from utils.db_adapter import db_adapter
+    from utils.migrations import migration_runner
+    try:
+        migration_runner.check()
+    except Exception as e:
+        server.log.error(f"Erro ao verificar a versão do esquema: {str(e)}")
+    finally:
+        # Os workers abrem suas próprias conexões; o processo principal não mantém nenhuma
+        if db_adapter.pool is not None:
+            db_adapter.pool.closeall()
+
+
+def worker_exit(server, worker):
+    """Grava os cliques e localizações pendentes antes de o worker encerrar"""
+    from app.services.click_pipeline import click_pipeline
+    from app.services.geo_worker import geo_enrichment
+    click_pipeline.shutdown()
+    geo_enrichment.shutdown()
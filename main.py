@@ -27,5 +27,12 @@ if __name__ == '__main__':
     # Obter argumentos da linha de comando
     args = parse_args()
     
+    # Servidor de desenvolvimento: verificar a versão do esquema uma vez
+    from utils.migrations import migration_runner
+    try:
+        migration_runner.check()
+    except Exception as e:
+        logging.error(f"Erro ao verificar a versão do esquema: {str(e)}")
+    
     # Iniciar o servidor
     app.run(host='0.0.0.0', port=args.port, debug=args.debug)
@@ -548,7 +548,7 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 // Função para atualizar as estatísticas do dashboard
-function updateDashboardStats() {
+function updateDashboardStats(preloaded) {
     // Obter parâmetros de filtro atuais
     const startDate = document.getElementById('startDate')?.value || getTodayDate();
     const endDate = document.getElementById('endDate')?.value || getTodayDate();
@@ -562,14 +562,16 @@ function updateDashboardStats() {
         url += `&link_id=${linkId}`;
     }
     
-    // Fazer a requisição para obter as estatísticas
-    fetch(url)
+    // Dados já carregados pelo pacote do dashboard ou busca na API
+    const request = preloaded ? Promise.resolve(preloaded) : fetch(url)
         .then(response => {
             if (!response.ok) {
                 throw new Error('Erro ao obter estatísticas');
             }
             return response.json();
-        })
+        });
+    
+    request
         .then(data => {
             console.log('Estatísticas recebidas:', data);
             // Atualizar os valores nos cards
@@ -601,7 +603,7 @@ function getTodayDate() {
 }
 
 // Função para atualizar tabela de redirecionamentos recentes
-function updateRecentRedirects() {
+function updateRecentRedirects(preloaded) {
     // Obter parâmetros de filtro atuais
     const startDate = document.getElementById('startDate')?.value || getTodayDate();
     const endDate = document.getElementById('endDate')?.value || getTodayDate();
@@ -615,14 +617,16 @@ function updateRecentRedirects() {
     }
     url += '&limit=10&page=1';
     
-    // Fazer a requisição para obter os redirecionamentos recentes
-    fetch(url)
+    // Dados já carregados pelo pacote do dashboard ou busca na API
+    const request = preloaded ? Promise.resolve(preloaded) : fetch(url)
         .then(response => {
             if (!response.ok) {
                 throw new Error('Erro ao obter redirecionamentos recentes');
             }
             return response.json();
-        })
+        });
+    
+    request
         .then(data => {
             console.log('Redirecionamentos recentes:', data);
             
@@ -637,24 +641,24 @@ function updateRecentRedirects() {
             tbody.innerHTML = '';
             
             // Se não houver redirecionamentos
-            if (!data.redirects || data.redirects.length === 0) {
+            if (!data.results || data.results.length === 0) {
                 tbody.innerHTML = '<tr><td colspan="5" class="text-center">Nenhum redirecionamento encontrado</td></tr>';
                 return;
             }
             
             // Adicionar os redirecionamentos à tabela
-            data.redirects.forEach(redirect => {
+            data.results.forEach(redirect => {
                 const row = document.createElement('tr');
                 
                 row.innerHTML = `
-                    <td>${redirect.time}</td>
+                    <td>${redirect.redirect_time}</td>
                     <td>${redirect.link_name}</td>
                     <td>${redirect.phone_number}</td>
                     <td>${redirect.ip_address}</td>
                     <td>
-                        ${redirect.location.city ? redirect.location.city : ''} 
-                        ${redirect.location.region ? redirect.location.region : ''} 
-                        ${redirect.location.country ? redirect.location.country : 'Desconhecido'}
+                        ${redirect.city ? redirect.city : ''} 
+                        ${redirect.region ? redirect.region : ''} 
+                        ${redirect.country ? redirect.country : 'Desconhecido'}
                     </td>
                 `;
                 
@@ -666,15 +670,42 @@ function updateRecentRedirects() {
         });
 }
 
-// Função para atualizar o dashboard completo
+// Função para atualizar o dashboard completo (uma requisição; seções executadas em paralelo no servidor)
 function updateDashboardAll() {
-    updateDashboardStats();
-    updateRecentRedirects();
-    updateNumberStats();
+    const startDate = document.getElementById('startDate')?.value || getTodayDate();
+    const endDate = document.getElementById('endDate')?.value || getTodayDate();
+    const linkId = document.getElementById('linkSelector')?.value || 'all';
+    
+    let url = `${getBaseUrl()}/api/dashboard/bundle`;
+    url += `?start_date=${startDate}&end_date=${endDate}&limit=10&page=1`;
+    if (linkId && linkId !== 'all') {
+        url += `&link_id=${linkId}`;
+    }
+    
+    fetch(url)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Erro ao obter dados do dashboard');
+            }
+            return response.json();
+        })
+        .then(bundle => {
+            console.log('Tempos do dashboard (ms):', bundle.timings);
+            // Seções ausentes (falha ou tempo esgotado) são buscadas pelas APIs individuais
+            updateDashboardStats(bundle.summary || undefined);
+            updateRecentRedirects(bundle.recent || undefined);
+            updateNumberStats(bundle.by_number || undefined);
+        })
+        .catch(error => {
+            console.error('Erro ao atualizar o dashboard, usando as APIs individuais:', error);
+            updateDashboardStats();
+            updateRecentRedirects();
+            updateNumberStats();
+        });
 }
 
 // Função para atualizar estatísticas por número
-function updateNumberStats() {
+function updateNumberStats(preloaded) {
     // Obter parâmetros de filtro atuais
     const startDate = document.getElementById('startDate')?.value || getTodayDate();
     const endDate = document.getElementById('endDate')?.value || getTodayDate();
@@ -687,14 +718,16 @@ function updateNumberStats() {
         url += `&link_id=${linkId}`;
     }
     
-    // Fazer a requisição para obter as estatísticas por número
-    fetch(url)
+    // Dados já carregados pelo pacote do dashboard ou busca na API
+    const request = preloaded ? Promise.resolve(preloaded) : fetch(url)
         .then(response => {
             if (!response.ok) {
                 throw new Error('Erro ao obter estatísticas por número');
             }
             return response.json();
-        })
+        });
+    
+    request
         .then(data => {
             console.log('Estatísticas por número:', data);
             
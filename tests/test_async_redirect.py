@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+from app.services import async_redirect
+from app.services.async_redirect import AsyncRedirectService
+from app.services.balancer import usage_window
+from app.services.link_cache import link_cache
+
+
+class FakePool:
+    """Pool asyncpg falso que responde conforme o SQL dos statements registrados"""
+
+    def __init__(self, link):
+        self.link = link
+        self.queries = []
+
+    async def fetchrow(self, query, *args):
+        self.queries.append(query)
+        if 'INSERT INTO redirect_logs' in query:
+            return {'id': 99}
+        return self.link
+
+    async def fetch(self, query, *args):
+        self.queries.append(query)
+        return [{'id': 5, 'phone_number': '11999990000', 'user_id': 1, 'is_active': 1}]
+
+    def get_size(self):
+        return 1
+
+    def get_idle_size(self):
+        return 1
+
+
+@pytest.fixture
+def service(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(usage_window, 'ensure_seeded', lambda: None)
+    monkeypatch.setattr(async_redirect.geo_enrichment, 'submit', lambda log_id, ip: submitted.append((log_id, ip)))
+    service = AsyncRedirectService()
+    service.submitted = submitted
+    return service
+
+
+def test_async_redirect_uses_caches_and_records(service):
+    """Testa o redirecionamento assíncrono: consultas com $n, cache do link e registro"""
+    link = {'id': 4101, 'link_name': 'async-promo', 'user_id': 1, 'is_active': 1,
+            'custom_message': 'Olá', 'balancing_strategy': None, 'user_balancing_strategy': None}
+    service._pool = FakePool(link)
+    link_cache.invalidate(link_id=4101, link_name='async-promo')
+
+    url, error = asyncio.run(service.redirect('async-promo', client_ip='1.2.3.4'))
+    assert error is None
+    assert url.startswith('https://wa.me/5511999990000')
+    assert all('%s' not in query and '%(' not in query for query in service._pool.queries)
+    assert service.submitted == [(99, '1.2.3.4')]
+
+    # Link e números já em cache: apenas o registro vai ao banco
+    service._pool.queries.clear()
+    asyncio.run(service.redirect('async-promo', client_ip='1.2.3.4'))
+    assert len(service._pool.queries) == 1
+    assert service.stats()['redirects'] == 2
+
+
+def test_async_redirect_reports_missing_link(service):
+    """Testa o erro de link inexistente, igual ao do RedirectController"""
+    service._pool = FakePool(None)
+    assert asyncio.run(service.redirect('nao-existe-async')) == (None, "Link não encontrado.")
+
+
+def _call_asgi(asgi_app, path):
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': [(b'user-agent', b'teste')], 'client': ('1.2.3.4', 5000)}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    return sent
+
+
+@pytest.fixture
+def asgi_app(monkeypatch):
+    """Aplicação ASGI iniciada, registrando os repasses ao Flask"""
+    import asgi
+    from app import create_app
+
+    asgi_app = asgi.RedirectASGIApp(create_app({'SECRET_KEY': 'teste', 'TESTING': True}))
+    asgi_app.started = True
+    asgi_app.delegated = []
+
+    async def delegate(scope, receive, send):
+        asgi_app.delegated.append(scope['path'])
+
+    monkeypatch.setattr(asgi_app, '_delegate', delegate)
+    monkeypatch.setattr(asgi, 'async_redirects', AsyncRedirectService())
+    return asgi_app
+
+
+def test_asgi_renders_redirect_errors_itself(monkeypatch, asgi_app):
+    """Testa se links inativos recebem a página 404 do Flask sem repassar a requisição"""
+    import asgi
+
+    async def inactive(link_name, user_id=None, client_ip=None, user_agent=None):
+        return None, "Este link está inativo."
+
+    monkeypatch.setattr(asgi.async_redirects, 'redirect', inactive)
+    sent = _call_asgi(asgi_app, '/promo')
+
+    assert asgi_app.delegated == []
+    assert sent[0]['status'] == 404
+    assert (b'content-type', b'text/html; charset=utf-8') in sent[0]['headers']
+    assert 'Voltar para a página inicial' in sent[1]['body'].decode('utf-8')
+
+
+def test_asgi_delegates_only_failures_before_recording(monkeypatch, asgi_app, service):
+    """Testa se uma falha antes do registro é repassada ao Flask e se o clique não é gravado"""
+    import asgi
+
+    class BrokenPool(FakePool):
+        async def fetch(self, query, *args):
+            raise ConnectionError('pool asyncpg indisponível')
+
+    link = {'id': 4102, 'link_name': 'async-falha', 'user_id': 1, 'is_active': 1,
+            'custom_message': None, 'balancing_strategy': None, 'user_balancing_strategy': None}
+    service._pool = BrokenPool(link)
+    link_cache.invalidate(link_id=4102, link_name='async-falha')
+    monkeypatch.setattr(asgi, 'async_redirects', service)
+
+    _call_asgi(asgi_app, '/async-falha')
+
+    assert asgi_app.delegated == ['/async-falha']
+    assert not any('INSERT INTO redirect_logs' in query for query in service._pool.queries)
+    assert service.submitted == []
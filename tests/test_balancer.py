@@ -0,0 +1,135 @@
+import os
+import sys
+import subprocess
+import pytest
+from app.services import balancer
+from app.services.balancer import NumberBalancer, UsageWindow
+
+
+@pytest.fixture
+def window(monkeypatch):
+    """Substitui a janela global por uma janela vazia, sem consulta ao banco"""
+    usage = UsageWindow(window_minutes=60)
+    monkeypatch.setattr(usage, 'ensure_seeded', lambda: None)
+    monkeypatch.setattr(balancer, 'usage_window', usage)
+    return usage
+
+
+def test_usage_window_expires_old_buckets():
+    """Testa se buckets fora da janela deixam de ser contados"""
+    usage = UsageWindow(window_minutes=10)
+    usage.record(1, minute=100)
+    usage.record(1, amount=2, minute=105)
+
+    assert usage.count(1, minute=105) == 3
+    assert usage.count(1, minute=110) == 2
+    assert usage.count(1, minute=115) == 0
+
+
+def test_select_number_prefers_least_used(window):
+    """Testa se o número menos usado na janela é o escolhido"""
+    numbers = [{'id': 1, 'phone_number': '5541999887766'}, {'id': 2, 'phone_number': '5541988776655'}]
+    window.record(1, amount=5)
+
+    assert NumberBalancer.select_number(numbers, link_id=1)['id'] == 2
+    assert window.count(2) == 1
+
+
+def test_select_number_spreads_clicks(window):
+    """Testa se cliques sucessivos são distribuídos entre os números"""
+    numbers = [{'id': n, 'phone_number': str(n)} for n in (1, 2, 3)]
+
+    for _ in range(9):
+        NumberBalancer.select_number(numbers, link_id=1)
+
+    assert [window.count(n) for n in (1, 2, 3)] == [3, 3, 3]
+
+
+def test_weighted_round_robin_is_smooth(window):
+    """Testa se o round-robin ponderado respeita os pesos sem rajadas"""
+    numbers = [{'id': 1, 'weight': 5}, {'id': 2, 'weight': 1}, {'id': 3, 'weight': 1}]
+
+    picks = [NumberBalancer.select_number(numbers, 1, 'weighted_round_robin')['id'] for _ in range(7)]
+
+    assert picks.count(1) == 5
+    assert picks == [1, 1, 2, 1, 3, 1, 1]
+
+
+def test_capacity_moves_traffic_to_other_numbers(window):
+    """Testa se um número no limite de capacidade deixa de ser escolhido"""
+    numbers = [{'id': 1, 'capacity': 2}, {'id': 2}]
+    window.record(1, amount=2)
+    window.record(2, amount=10)
+
+    assert NumberBalancer.select_number(numbers, 1, 'least_recent')['id'] == 2
+    assert NumberBalancer.select_number(numbers, 1, 'power_of_two')['id'] == 2
+
+
+def test_unknown_strategy_falls_back_to_default(window):
+    """Testa se uma estratégia desconhecida usa a estratégia padrão"""
+    numbers = [{'id': 1}, {'id': 2}]
+    window.record(1, amount=3)
+
+    assert NumberBalancer.select_number(numbers, 1, 'inexistente')['id'] == 2
+
+
+def test_failed_seed_is_retried(monkeypatch):
+    """Testa se uma falha ao carregar a janela não a marca como carregada"""
+    usage = UsageWindow(window_minutes=60)
+    calls = []
+
+    def failing_query(query, params=None, fetch_all=False):
+        calls.append(query)
+        raise RuntimeError('banco indisponível')
+
+    monkeypatch.setattr(balancer.db_adapter, 'execute_query', failing_query)
+    usage.ensure_seeded()
+    # Dentro do intervalo de espera a consulta não é repetida
+    usage.ensure_seeded()
+    assert len(calls) == 1
+
+    usage._retry_at = 0
+    monkeypatch.setattr(balancer.db_adapter, 'execute_query', lambda query, params=None, fetch_all=False: [
+        {'number_id': 1, 'minutes_ago': 2, 'total': 4}
+    ])
+    usage.ensure_seeded()
+
+    assert usage.count(1) == 4
+
+
+def test_least_used_sees_clicks_from_other_links(window):
+    """Testa se o heap do menos usado considera cliques registrados fora do link"""
+    numbers = [{'id': 1}, {'id': 2}]
+    NumberBalancer.select_number(numbers, link_id=50)
+    # Número 1 recebe cliques de outro link que compartilha os números
+    window.record(1, amount=10)
+
+    picks = [NumberBalancer.select_number(numbers, link_id=50)['id'] for _ in range(3)]
+
+    assert picks == [2, 2, 2]
+
+
+def test_least_recent_counts_fallback_picks(window):
+    """Testa se o número escolhido pelo fallback de capacidade passa para o fim da fila"""
+    numbers = [{'id': 1, 'capacity': 1}, {'id': 2}, {'id': 3}]
+    window.record(1)
+    window.record(3, amount=5)
+
+    picks = [NumberBalancer.select_number(numbers, 51, 'least_recent')['id']]
+    # Número 1 volta a ter capacidade disponível
+    numbers[0]['capacity'] = None
+    picks += [NumberBalancer.select_number(numbers, 51, 'least_recent')['id'] for _ in range(2)]
+
+    assert picks == [2, 1, 3]
+
+
+def test_unknown_default_strategy_is_rejected():
+    """Testa se uma BALANCING_STRATEGY inexistente impede a inicialização"""
+    env = dict(os.environ, BALANCING_STRATEGY='inexistente')
+    result = subprocess.run(
+        [sys.executable, '-c', 'import app.services.balancer'],
+        env=env, capture_output=True, text=True
+    )
+
+    assert result.returncode != 0
+    assert "BALANCING_STRATEGY inválida: 'inexistente'" in result.stderr
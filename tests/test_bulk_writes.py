@@ -0,0 +1,56 @@
+from datetime import datetime
+from utils import db_adapter as adapter_module
+from utils.db_adapter import db_adapter, _copy_value
+
+
+class FakeCursor:
+    rowcount = 0
+
+    def __init__(self, conn):
+        self.connection = conn
+
+
+class FakeConnection:
+    def __init__(self):
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_execute_batch_pages_rows(monkeypatch):
+    """Testa se as linhas são enviadas em páginas e os retornos concatenados"""
+    conn = FakeConnection()
+    pages = []
+
+    def fake_execute_values(cursor, query, rows, template=None, page_size=100, fetch=False):
+        pages.append(len(rows))
+        return [{'id': row[0]} for row in rows]
+
+    monkeypatch.setattr(db_adapter, 'get_request_connection', lambda: None)
+    monkeypatch.setattr(db_adapter, 'checkout_connection', lambda: conn)
+    monkeypatch.setattr(adapter_module, 'execute_values', fake_execute_values)
+
+    result = db_adapter.execute_batch('INSERT INTO t (id) VALUES %s RETURNING id', [(n,) for n in range(5)],
+                                      page_size=2, fetch=True)
+
+    assert pages == [2, 2, 1]
+    assert [row['id'] for row in result] == [0, 1, 2, 3, 4]
+    assert conn.commits == 1
+
+
+def test_copy_values_are_escaped():
+    """Testa a conversão de valores para o formato texto do COPY"""
+    assert _copy_value(None) == '\\N'
+    assert _copy_value(True) == 't'
+    assert _copy_value('a\tb\nc\\d') == 'a\\tb\\nc\\\\d'
+    assert _copy_value(datetime(2024, 5, 1, 12, 30)) == '2024-05-01T12:30:00'
@@ -0,0 +1,119 @@
+import time
+from app.services.click_pipeline import ClickPipeline, new_click_event
+
+
+def test_events_are_flushed_in_batches():
+    """Testa se os eventos enfileirados são gravados em lotes limitados"""
+    pipeline = ClickPipeline(enabled=True, batch_size=3, flush_interval=0.05)
+    batches = []
+    pipeline.flush = lambda events: batches.append(len(events)) or []
+
+    for _ in range(7):
+        assert pipeline.enqueue(new_click_event(1, 2))
+
+    pipeline.shutdown()
+
+    assert sum(batches) == 7
+    assert max(batches) <= 3
+    assert pipeline.stats()['queue_depth'] == 0
+
+
+def test_full_queue_rejects_event():
+    """Testa se a fila cheia recusa o evento para gravação síncrona"""
+    pipeline = ClickPipeline(enabled=True, batch_size=10, flush_interval=5, max_queue_size=1)
+    pipeline.flush = lambda events: time.sleep(0.2) or []
+
+    results = [pipeline.enqueue(new_click_event(1, 2)) for _ in range(5)]
+
+    assert False in results
+    assert pipeline.stats()['overflow'] >= 1
+
+
+class FakeCursor:
+    rowcount = 0
+
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self):
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_flush_inserts_all_events_and_aggregates_counters(monkeypatch):
+    """Testa o flush real: um INSERT com todos os eventos e um UPDATE agregado por tabela, na mesma transação"""
+    from utils import db_adapter as adapter_module
+    from utils.db_adapter import db_adapter
+    from app.services import click_pipeline as pipeline_module
+
+    conn = FakeConnection()
+    statements = []
+
+    def fake_execute_values(cursor, query, rows, template=None, page_size=100, fetch=False):
+        statements.append((' '.join(query.split()), list(rows)))
+        return [{'id': 100 + index, 'ip_address': row[2]} for index, row in enumerate(rows)] if fetch else None
+
+    submitted = []
+    monkeypatch.setattr(db_adapter, 'get_request_connection', lambda: None)
+    monkeypatch.setattr(db_adapter, 'checkout_connection', lambda: conn)
+    monkeypatch.setattr(adapter_module, 'execute_values', fake_execute_values)
+    monkeypatch.setattr(pipeline_module.geo_enrichment, 'submit_many', submitted.extend)
+
+    events = [new_click_event(1, 10, '1.1.1.1'), new_click_event(1, 11, '2.2.2.2'),
+              new_click_event(2, 10, '3.3.3.3')]
+    ClickPipeline(enabled=True, max_retries=0)._flush_batch(events)
+
+    inserts, links, numbers = statements
+    assert inserts[0].startswith('INSERT INTO redirect_logs') and len(inserts[1]) == 3
+    assert links[0].startswith('UPDATE custom_links') and sorted(links[1]) == [(1, 2), (2, 1)]
+    assert numbers[0].startswith('UPDATE whatsapp_numbers') and sorted(numbers[1]) == [(10, 2), (11, 1)]
+    assert conn.commits == 1
+    assert submitted == [(100, '1.1.1.1'), (101, '2.2.2.2'), (102, '3.3.3.3')]
+
+
+def test_failed_flush_is_retried_then_written_one_by_one(monkeypatch):
+    """Testa se um lote que falha é repetido e, esgotadas as tentativas, gravado evento a evento"""
+    from app.services import click_pipeline as pipeline_module
+
+    submitted = []
+    monkeypatch.setattr(pipeline_module.geo_enrichment, 'submit_many', submitted.extend)
+    pipeline = ClickPipeline(enabled=True, max_retries=2, retry_backoff=0)
+    events = [new_click_event(link_id, 2, f'10.0.0.{link_id}') for link_id in (1, 2, 3)]
+
+    # Falha passageira: a segunda tentativa grava o lote inteiro
+    attempts = []
+
+    def flaky(batch):
+        attempts.append(len(batch))
+        if len(attempts) == 1:
+            raise RuntimeError('banco reiniciando')
+        return [(event.link_id, event.ip_address) for event in batch]
+
+    pipeline.flush = flaky
+    pipeline._flush_batch(events)
+    assert attempts == [3, 3] and len(submitted) == 3
+    assert pipeline.stats()['retries'] == 1 and pipeline.stats()['failed'] == 0
+
+    # Lote sempre recusado por um evento inválido: apenas ele é perdido
+    def rejects_link_2(batch):
+        if len(batch) > 1 or batch[0].link_id == 2:
+            raise ValueError('valor inválido')
+        return [(batch[0].link_id, batch[0].ip_address)]
+
+    submitted.clear()
+    pipeline.flush = rejects_link_2
+    pipeline._flush_batch(events)
+    assert submitted == [(1, '10.0.0.1'), (3, '10.0.0.3')]
+    assert pipeline.stats()['failed'] == 1 and pipeline.stats()['flushed'] == 5
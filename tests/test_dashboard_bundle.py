@@ -0,0 +1,97 @@
+import time
+import threading
+from app.services.dashboard_bundle import DashboardBundle
+
+
+def test_sections_run_concurrently_with_timings():
+    """Testa se as seções rodam em paralelo e cada uma tem o seu tempo no documento"""
+    barrier = threading.Barrier(3, timeout=2)
+
+    def section(value):
+        def run():
+            # Só passa da barreira se as três seções estiverem em execução ao mesmo tempo
+            barrier.wait()
+            return value
+        return run
+
+    bundle = DashboardBundle(max_workers=3, timeout=5).build({
+        'summary': section({'total_clicks': 3}),
+        'by_number': section({'number_stats': []}),
+        'recent': section({'results': []})
+    })
+
+    assert bundle['summary'] == {'total_clicks': 3}
+    assert bundle['recent'] == {'results': []}
+    assert set(bundle['timings']) == {'summary', 'by_number', 'recent', 'total'}
+    assert 'errors' not in bundle
+
+
+def test_failed_and_slow_sections_do_not_break_the_bundle():
+    """Testa se falhas e tempo esgotado viram None com o motivo, sem afetar as demais seções"""
+    release = threading.Event()
+
+    def failing():
+        raise RuntimeError('banco indisponível')
+
+    def slow():
+        release.wait(2)
+        return {}
+
+    runner = DashboardBundle(max_workers=3, timeout=0.2)
+    started = time.perf_counter()
+    bundle = runner.build({'summary': lambda: {'total_clicks': 1}, 'map': failing, 'recent': slow})
+    release.set()
+
+    assert time.perf_counter() - started < 1
+    assert bundle['summary'] == {'total_clicks': 1}
+    assert bundle['map'] is None and bundle['recent'] is None
+    assert bundle['errors'] == {'map': 'banco indisponível', 'recent': 'timeout'}
+    assert runner.stats()['failed'] == 1 and runner.stats()['timeouts'] == 1
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+
+def test_section_queries_get_statement_timeout_until_deadline():
+    """Testa se as consultas das seções recebem statement_timeout com o tempo restante do documento"""
+    from utils.db_adapter import DBAdapter
+
+    cursor = RecordingCursor()
+
+    def section():
+        DBAdapter._apply_deadline(cursor)
+        time.sleep(0.3)
+        DBAdapter._apply_deadline(cursor)
+
+    bundle = DashboardBundle(max_workers=1, timeout=0.2).build({'recent': section})
+
+    # Primeira consulta limitada ao prazo; depois dele, a seguinte nem vai ao banco
+    [(query, (timeout_ms,))] = cursor.executed
+    assert query == 'SET LOCAL statement_timeout = %s' and 0 < timeout_ms <= 200
+    assert bundle['errors'] == {'recent': 'timeout'}
+
+    # Fora do documento, sem limite
+    DBAdapter._apply_deadline(cursor)
+    assert len(cursor.executed) == 1
+
+
+def test_bundle_reports_database_errors_of_each_section(monkeypatch):
+    """Testa se falhas do banco nas seções do StatsController aparecem em errors"""
+    from app.controllers import stats_controller
+    from app.controllers.stats_controller import StatsController
+
+    def unavailable(name, params=None, fetch_all=False, commit=False, row_format=None):
+        raise RuntimeError('banco indisponível')
+
+    monkeypatch.setattr(stats_controller.stats_rollups, 'ensure_started', lambda: None)
+    monkeypatch.setattr(stats_controller.db_adapter, 'execute_statement', unavailable)
+
+    bundle = StatsController.get_dashboard_bundle(1, '2024-05-01', '2024-05-31')
+
+    assert bundle['errors'] == {name: 'banco indisponível' for name in ('summary', 'by_number', 'map', 'recent')}
+    assert all(bundle[name] is None for name in bundle['errors'])
@@ -0,0 +1,77 @@
+import pytest
+from types import SimpleNamespace
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+from utils.db_pool import ConnectionPool
+
+
+class FakeConnection:
+    """Conexão falsa com a interface usada pelo pool"""
+
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.info = SimpleNamespace(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def commit(self):
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    return ConnectionPool(connect, **kwargs), opened
+
+
+def test_connections_are_reused():
+    """Testa se close() devolve a conexão ao pool em vez de encerrá-la"""
+    pool, opened = make_pool(min_size=0, max_size=2)
+
+    conn = pool.getconn()
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+    conn.close()
+    with pool.getconn() as second:
+        assert second._conn is opened[0]
+
+    assert len(opened) == 1
+    assert opened[0].rollbacks == 1
+    assert not opened[0].closed
+    assert pool.stats()['checkouts'] == 2
+
+
+def test_saturated_pool_times_out():
+    """Testa se o pool cheio aguarda e falha após o timeout"""
+    pool, _ = make_pool(min_size=0, max_size=1, timeout=0.05)
+    conn = pool.getconn()
+
+    with pytest.raises(PoolError):
+        pool.getconn()
+
+    stats = pool.stats()
+    assert stats['saturation'] == 1
+    assert stats['timeouts'] == 1
+    conn.close()
+    assert pool.stats()['in_use'] == 0
+
+
+def test_expired_connections_are_replaced():
+    """Testa se conexões acima do tempo de vida máximo são substituídas"""
+    pool, opened = make_pool(min_size=0, max_size=2, max_lifetime=0)
+
+    pool.getconn().close()
+    pool.getconn().close()
+
+    assert len(opened) == 2
+    assert opened[0].closed
@@ -0,0 +1,25 @@
+from app.services.geo_cache import GeoCache, NOT_FOUND
+
+
+def test_prefix_entries_are_shared():
+    """Testa se IPs do mesmo /24 ou /48 compartilham a entrada do cache"""
+    cache = GeoCache(max_size=10)
+    cache.set('200.10.20.5', {'city': 'Curitiba', 'lat': -25.4, 'lon': -49.2})
+    cache.set('2804:14c:10::1', {'city': 'Recife', 'lat': -8.0, 'lon': -34.9})
+
+    assert cache.get('200.10.20.250') == {'city': 'Curitiba', 'lat': -25.4, 'lon': -49.2, 'ip': '200.10.20.250'}
+    assert cache.get('2804:14c:10:ffff::9')['city'] == 'Recife'
+    assert cache.get('200.10.21.5') is None
+
+
+def test_not_found_uses_short_ttl():
+    """Testa se IPs não localizados expiram com o TTL negativo"""
+    cache = GeoCache(max_size=10, ttl=3600, negative_ttl=0)
+    cache.set_not_found('8.8.8.8')
+
+    assert cache.get('8.8.8.8') is None
+
+    cache = GeoCache(max_size=10, ttl=3600, negative_ttl=60)
+    cache.set_not_found('8.8.8.8')
+
+    assert cache.get('8.8.8.9') is NOT_FOUND
@@ -0,0 +1,38 @@
+import os
+from utils.geo_ipdb import IPRangeDatabase, IPRangeTable, load_table
+
+CSV = """start,end,country,region,city,lat,lon
+200.0.0.0,200.0.255.255,Brasil,PR,Curitiba,-25.43,-49.27
+177.0.0.0,177.0.0.255,Brasil,SP,São Paulo,-23.55,-46.63
+2804:14c::,2804:14c:ffff:ffff:ffff:ffff:ffff:ffff,Brasil,RJ,Rio de Janeiro,-22.91,-43.17
+"""
+
+
+def test_csv_and_binary_lookups_match(tmp_path):
+    """Testa se o CSV e o binário compilado resolvem os mesmos endereços"""
+    csv_path = tmp_path / 'faixas.csv'
+    csv_path.write_text(CSV, encoding='utf-8')
+    bin_path = tmp_path / 'faixas.bin'
+    IPRangeTable.from_csv(str(csv_path)).write_binary(str(bin_path))
+
+    for table in (load_table(str(csv_path)), load_table(str(bin_path))):
+        assert table.lookup('200.0.10.1')[2] == 'Curitiba'
+        assert table.lookup('177.0.0.255')[2] == 'São Paulo'
+        assert table.lookup('::ffff:200.0.0.1')[2] == 'Curitiba'
+        assert table.lookup('2804:14c:1::1')[2] == 'Rio de Janeiro'
+        assert table.lookup('177.0.1.0') is None
+        assert table.lookup('invalido') is None
+
+
+def test_database_reloads_when_file_changes(tmp_path):
+    """Testa se a base é recarregada quando o arquivo é substituído"""
+    csv_path = tmp_path / 'faixas.csv'
+    csv_path.write_text(CSV, encoding='utf-8')
+    database = IPRangeDatabase(str(csv_path), reload_interval=0)
+
+    assert database.lookup('200.0.0.1')['city'] == 'Curitiba'
+
+    csv_path.write_text(CSV.replace('Curitiba', 'Londrina'), encoding='utf-8')
+    os.utime(csv_path, (1, 1))
+
+    assert database.lookup('200.0.0.1')['city'] == 'Londrina'
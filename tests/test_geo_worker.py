@@ -0,0 +1,32 @@
+from app.services.geo_worker import GeoEnrichmentPool
+
+
+def test_full_queue_drops_oldest(monkeypatch):
+    """Testa se a fila cheia descarta os itens mais antigos sem bloquear"""
+    pool = GeoEnrichmentPool(workers=1, max_queue_size=2)
+    monkeypatch.setattr(pool, '_ensure_started', lambda: None)
+
+    for log_id in (1, 2, 3):
+        pool.submit(log_id, '200.1.1.1')
+
+    assert list(pool._queue) == [(2, '200.1.1.1'), (3, '200.1.1.1')]
+    assert pool.stats()['dropped'] == 1
+
+
+def test_batch_is_written_with_single_update(monkeypatch):
+    """Testa se um lote de localizações gera uma única gravação"""
+    from app.services.geolocation import GeoLocationService
+
+    pool = GeoEnrichmentPool(workers=1, batch_size=10, flush_interval=5)
+    writes = []
+    monkeypatch.setattr(pool, 'write', writes.append)
+    monkeypatch.setattr(GeoLocationService, 'get_location_from_ip', lambda ip: {
+        'city': 'Curitiba', 'region': 'PR', 'country': 'Brasil', 'lat': -25.4, 'lon': -49.2
+    })
+
+    for log_id in (1, 2, 3):
+        pool.submit(log_id, '200.1.1.1')
+    pool.shutdown(timeout=2)
+
+    assert len(writes) == 1
+    assert [row[0] for row in writes[0]] == [1, 2, 3]
@@ -0,0 +1,90 @@
+import pytest
+from app.services.link_cache import LinkCache
+from utils.db_adapter import db_adapter
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """Substitui a consulta ao banco por um registro fixo e conta as chamadas"""
+    calls = []
+
+    def fake_execute_statement(name, params=None, fetch_all=False, commit=False):
+        calls.append(params)
+        return {'id': 7, 'link_name': params[0], 'user_id': 1, 'is_active': 1}
+
+    monkeypatch.setattr(db_adapter, 'execute_statement', fake_execute_statement)
+    return calls
+
+
+def test_cache_hit_avoids_query(queries):
+    """Testa se a segunda busca pelo mesmo link não consulta o banco"""
+    cache = LinkCache(max_size=10, ttl=60)
+
+    assert cache.get_by_name('promo')['id'] == 7
+    assert cache.get_by_name('promo')['id'] == 7
+
+    assert len(queries) == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_invalidate_removes_all_keys_of_link(queries):
+    """Testa se a invalidação por ID remove as chaves por nome e por usuário"""
+    cache = LinkCache(max_size=10, ttl=60)
+    cache.get_by_name('promo')
+    cache.get_by_user_and_name(1, 'promo')
+
+    cache.invalidate(link_id=7)
+    cache.get_by_name('promo')
+    cache.get_by_user_and_name(1, 'promo')
+
+    assert len(queries) == 4
+
+
+def test_expired_entry_is_reloaded(queries):
+    """Testa se entradas expiradas voltam a ser buscadas no banco"""
+    cache = LinkCache(max_size=10, ttl=0)
+    cache.get_by_name('promo')
+    cache.get_by_name('promo')
+
+    assert len(queries) == 2
+
+
+def test_update_link_invalidates_after_commit(monkeypatch):
+    """Testa se a atualização de um link só invalida o cache depois do commit"""
+    from app.controllers.link_controller import LinkController
+    from app.models.custom_link import CustomLink
+    from app.services import link_cache as link_cache_module
+
+    events = []
+
+    class FakeConnection:
+        closed = 0
+        rowcount = 0
+
+        def cursor(self):
+            return self
+
+        def execute(self, query, params=None):
+            events.append('query')
+
+        def commit(self):
+            events.append('commit')
+
+        def rollback(self):
+            events.append('rollback')
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(db_adapter, 'get_request_connection', lambda: None)
+    monkeypatch.setattr(db_adapter, 'checkout_connection', lambda: FakeConnection())
+    monkeypatch.setattr(CustomLink, 'get_by_id', staticmethod(
+        lambda link_id: CustomLink(id=link_id, link_name='promo', user_id=1)
+    ))
+    monkeypatch.setattr(link_cache_module.link_cache, 'invalidate', lambda **kwargs: events.append('invalidate'))
+
+    link, error = LinkController.update_link(7, 1, message='Olá')
+
+    assert error is None
+    assert events.index('invalidate') > events.index('commit')
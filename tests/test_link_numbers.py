@@ -0,0 +1,220 @@
+import os
+import pytest
+from app.controllers.link_controller import LinkController
+from app.models.custom_link import CustomLink
+from app.models.whatsapp_number import WhatsAppNumber
+from app.services import number_pool as number_pool_module
+from app.services.number_pool import NumberPoolCache
+from utils.db_adapter import db_adapter
+from utils.rows import RowSet
+
+
+class FakeDatabase:
+    """Tabelas link_numbers e whatsapp_numbers em memória, com o registro de commits"""
+
+    def __init__(self, owners):
+        self.owners = owners
+        self.assignments = set()
+        self.events = []
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    closed = 0
+
+    def __init__(self, database):
+        self.database = database
+        self.rows = []
+        self.description = None
+        self.rowcount = 0
+
+    def cursor(self, **kwargs):
+        return self
+
+    def execute(self, query, params=None):
+        db = self.database
+        query = ' '.join(query.split())
+        self.rows, self.description, self.rowcount = [], None, 0
+        if query.startswith('SELECT number_id FROM link_numbers'):
+            self.rows = [{'number_id': n} for link, n in sorted(db.assignments) if link == params[0]]
+        elif query.startswith('SELECT id FROM whatsapp_numbers'):
+            user_id, ids = params
+            self.rows = [{'id': n} for n in ids if db.owners.get(n) == user_id]
+        elif query.startswith('DELETE FROM link_numbers WHERE link_id = %s AND number_id = %s'):
+            self.rowcount = int(tuple(params) in db.assignments)
+            db.assignments.discard(tuple(params))
+        elif query.startswith('DELETE FROM link_numbers'):
+            db.assignments = {a for a in db.assignments if a[0] != params[0]}
+        elif query.startswith('INSERT INTO link_numbers'):
+            db.assignments.add(tuple(params))
+        else:
+            raise AssertionError(f"Consulta inesperada: {query}")
+        if query.startswith('SELECT'):
+            self.description = [('id',)]
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def commit(self):
+        self.database.events.append('commit')
+
+    def rollback(self):
+        self.database.events.append('rollback')
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Link 7 do usuário 1, números 1 e 2 do usuário 1 e número 3 do usuário 2"""
+    db = FakeDatabase(owners={1: 1, 2: 1, 3: 2})
+    monkeypatch.setattr(db_adapter, 'get_request_connection', lambda: None)
+    monkeypatch.setattr(db_adapter, 'checkout_connection', db.connect)
+    monkeypatch.setattr(CustomLink, 'get_by_id', staticmethod(
+        lambda link_id: CustomLink(id=link_id, link_name='promo', user_id=1) if link_id == 7 else None
+    ))
+    monkeypatch.setattr(WhatsAppNumber, 'get_by_id', staticmethod(
+        lambda number_id: WhatsAppNumber(id=number_id, phone_number=str(number_id), user_id=db.owners[number_id])
+        if number_id in db.owners else None
+    ))
+    monkeypatch.setattr(number_pool_module.number_pool, 'invalidate_link',
+                        lambda link_id: db.events.append(('invalidate', link_id)))
+    return db
+
+
+@pytest.fixture
+def pool_rows(monkeypatch):
+    """Resultado da consulta do conjunto de números por link, com a contagem de consultas"""
+    calls = []
+    pools = {7: [(1, '5511999990001'), (2, '5511999990002')], 8: [(3, '5511999990003')]}
+
+    def fake_execute_statement(name, params=None, fetch_all=False, commit=False, row_format=None):
+        calls.append(params['link_id'])
+        return RowSet(pools[params['link_id']], ('id', 'phone_number'))
+
+    monkeypatch.setattr(db_adapter, 'execute_statement', fake_execute_statement)
+    return calls
+
+
+def test_number_pool_is_cached_until_link_invalidation(pool_rows):
+    """Testa se o conjunto é lido uma vez e recarregado, com nova versão, após a invalidação do link"""
+    cache = NumberPoolCache(max_size=10, ttl=60)
+    link = {'id': 7, 'user_id': 1}
+
+    version, numbers = cache.get(link)
+    assert cache.get(link) == (version, numbers)
+    assert [n['id'] for n in numbers] == [1, 2]
+    assert pool_rows == [7]
+
+    cache.invalidate_link(7)
+    new_version, _ = cache.get(link)
+
+    assert pool_rows == [7, 7]
+    assert new_version != version
+
+
+def test_number_pool_invalidates_user_links_and_skips_stale_loads(pool_rows):
+    """Testa se a invalidação do usuário descarta seus links e se leituras concorrentes não são armazenadas"""
+    cache = NumberPoolCache(max_size=10, ttl=60)
+    cache.get({'id': 7, 'user_id': 1})
+    cache.get({'id': 8, 'user_id': 2})
+
+    generation = cache.generation
+    cache.invalidate_user(1)
+    # Leitura iniciada antes da invalidação não volta para o cache
+    cache.store({'id': 7, 'user_id': 1}, [{'id': 1}], generation)
+
+    assert cache.lookup(7) is None
+    assert cache.lookup(8) is not None
+
+
+def test_set_link_numbers_rejects_numbers_of_other_users(database):
+    """Testa se números de outro usuário não podem ser atribuídos ao link"""
+    number_ids, error = LinkController.set_link_numbers(7, 1, [1, 3])
+
+    assert number_ids is None
+    assert error == "Um ou mais números não pertencem ao seu usuário"
+    assert database.assignments == set()
+    assert ('invalidate', 7) not in database.events
+
+
+def test_link_of_other_user_is_rejected(database):
+    """Testa se o dono de outro link não lê nem altera as atribuições"""
+    assert LinkController.get_link_numbers(7, 2) == (None, "Você não tem permissão para alterar este link")
+    assert LinkController.add_link_number(7, 2, 3) == (False, "Você não tem permissão para alterar este link")
+    assert LinkController.add_link_number(7, 1, 3) == (False, "Número não encontrado")
+    assert database.assignments == set()
+
+
+def test_assign_and_unassign_invalidate_pool_after_commit(database):
+    """Testa se atribuir e remover números invalida o conjunto do link somente depois do commit"""
+    assert LinkController.set_link_numbers(7, 1, ['2', 1]) == ([1, 2], None)
+    assert database.events == ['commit', ('invalidate', 7)]
+
+    assert LinkController.remove_link_number(7, 1, 2) == (True, None)
+    assert LinkController.remove_link_number(7, 1, 2) == (False, "Número não está atribuído a este link")
+    assert LinkController.get_link_numbers(7, 1) == ([1], None)
+
+    database.events.clear()
+    assert LinkController.add_link_number(7, 1, 2) == (True, None)
+    assert database.events == ['commit', ('invalidate', 7)]
+    assert database.assignments == {(7, 1), (7, 2)}
+
+
+def test_link_numbers_endpoints(database):
+    """Testa os endpoints /api/links/<id>/numbers com um usuário logado"""
+    from app import create_app
+    app = create_app({'SECRET_KEY': 'teste', 'TESTING': True})
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+
+    response = client.get('/api/links/7/numbers')
+    assert response.get_json() == {'success': True, 'number_ids': [], 'uses_all_numbers': True}
+
+    response = client.put('/api/links/7/numbers', json={'number_ids': [3]})
+    assert response.status_code == 400
+
+    assert client.put('/api/links/7/numbers', json={'number_ids': [1]}).get_json()['number_ids'] == [1]
+    assert client.post('/api/links/7/numbers', json={'number_id': 2}).status_code == 200
+    assert client.delete('/api/links/7/numbers/1').status_code == 200
+
+    response = client.get('/api/links/7/numbers')
+    assert response.get_json() == {'success': True, 'number_ids': [2], 'uses_all_numbers': False}
+    assert client.get('/api/links/8/numbers').status_code == 400
+
+
+@pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'), reason='TEST_DATABASE_URL não definida')
+def test_pool_query_with_and_without_assignments():
+    """Testa, em um banco de teste, se o link usa os números atribuídos ou, sem atribuições, todos os ativos"""
+    import psycopg2
+    import psycopg2.extras
+
+    conn = psycopg2.connect(os.environ['TEST_DATABASE_URL'])
+    try:
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        # Tabelas temporárias com os nomes reais (sobrepõem as do esquema durante a sessão)
+        cursor.execute('''
+            CREATE TEMP TABLE whatsapp_numbers (id INTEGER PRIMARY KEY, user_id INTEGER, is_active INTEGER);
+            CREATE TEMP TABLE link_numbers (link_id INTEGER, number_id INTEGER);
+            INSERT INTO whatsapp_numbers VALUES (1, 1, 1), (2, 1, 1), (3, 1, 0), (4, 2, 1);
+            INSERT INTO link_numbers VALUES (8, 2), (8, 3);
+        ''')
+
+        def pool(link_id):
+            cursor.execute(NumberPoolCache.POOL_QUERY, {'link_id': link_id, 'user_id': 1})
+            return [row['id'] for row in cursor.fetchall()]
+
+        # Sem atribuições: todos os números ativos do dono
+        assert pool(7) == [1, 2]
+        # Com atribuições: apenas os atribuídos que estão ativos
+        assert pool(8) == [2]
+    finally:
+        conn.rollback()
+        conn.close()
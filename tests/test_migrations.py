@@ -0,0 +1,83 @@
+from utils.migrations import MigrationRunner
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.last = ''
+
+    def execute(self, query, params=None):
+        self.last = query
+        self.conn.executed.append((' '.join(query.split()), self.conn.autocommit))
+        if query.startswith('INSERT INTO schema_migrations'):
+            self.conn.applied.append(params[0])
+
+    def fetchone(self):
+        if 'pg_try_advisory_lock' in self.last:
+            return {'locked': True}
+        return None
+
+    def fetchall(self):
+        if 'FROM schema_migrations' in self.last:
+            return [{'version': version, 'applied_at': '2024-01-01'} for version in self.conn.applied]
+        return []
+
+
+class FakeConnection:
+    """Conexão falsa que registra os comandos e o modo autocommit de cada um"""
+
+    def __init__(self, applied=()):
+        self.applied = list(applied)
+        self.executed = []
+        self.autocommit = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAdapter:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def checkout_connection(self):
+        return self.conn
+
+
+def test_upgrade_applies_pending_in_order():
+    """Testa se as migrações pendentes são aplicadas em ordem e registradas"""
+    conn = FakeConnection()
+    runner = MigrationRunner(FakeAdapter(conn))
+
+    assert runner.upgrade() == [1, 2, 3, 4, 5]
+    assert conn.applied == [1, 2, 3, 4, 5]
+
+    # Índices criados fora de transação (CONCURRENTLY); colunas dentro da transação
+    indexes = [autocommit for sql, autocommit in conn.executed if 'INDEX CONCURRENTLY IF NOT EXISTS' in sql]
+    columns = [autocommit for sql, autocommit in conn.executed if sql.startswith('ALTER TABLE')]
+    assert indexes and all(indexes)
+    assert columns and not any(columns)
+    assert any('USING brin (redirect_time)' in sql for sql, _ in conn.executed)
+    assert conn.autocommit is False
+
+    assert runner.upgrade() == []
+
+
+def test_status_and_target_version():
+    """Testa a situação das migrações e a aplicação até uma versão"""
+    conn = FakeConnection(applied=[])
+    runner = MigrationRunner(FakeAdapter(conn))
+
+    assert runner.upgrade(target=1) == [1]
+    status = {migration['version']: migration['applied_at'] for migration in runner.status()}
+    assert status[1] is not None and status[2] is None
+    assert [migration.version for migration in runner.pending()] == [2, 3, 4, 5]
+    assert runner.current_version() == 1 and runner.head_version() == 5
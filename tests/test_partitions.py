@@ -0,0 +1,223 @@
+import pytest
+from datetime import date, datetime
+from utils.migrations.versions.v0002_performance_indexes import INDEXES
+from utils.partitions import PartitionManager, period_start, next_period
+
+
+class FakeCursor:
+    """Cursor falso com um catálogo mínimo de partições e planos"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = []
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        sql = ' '.join(query.split())
+        self.conn.executed.append(sql)
+        self.result, self.rowcount = [], 0
+        if sql.startswith('SELECT relkind'):
+            self.result = [{'relkind': 'p'}]
+        elif 'FROM pg_inherits' in sql:
+            self.result = [
+                {'name': name, 'bound': f"FOR VALUES FROM ('{start} 00:00:00') TO ('{end} 00:00:00')",
+                 'estimated_rows': 10}
+                for name, start, end in self.conn.partitions
+            ]
+        elif sql.startswith('SELECT id, log_retention_days'):
+            self.result = self.conn.plans
+        elif sql.startswith('DELETE FROM redirect_logs'):
+            self.conn.deletes.append(params['plan_id'])
+            self.rowcount = 0
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+
+class FakeConnection:
+    def __init__(self, partitions=(), plans=()):
+        self.partitions = list(partitions)
+        self.plans = list(plans)
+        self.executed = []
+        self.deletes = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAdapter:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def checkout_connection(self):
+        return self.conn
+
+
+FOREIGN_KEYS = [
+    {'name': 'redirect_logs_link_id_fkey', 'definition': 'FOREIGN KEY (link_id) REFERENCES custom_links(id) ON DELETE CASCADE'},
+    {'name': 'redirect_logs_number_id_fkey', 'definition': 'FOREIGN KEY (number_id) REFERENCES whatsapp_numbers(id) ON DELETE CASCADE'}
+]
+
+
+class ConversionCursor:
+    """Cursor falso da conversão: ids copiados confirmados por commit e catálogo da nova tabela"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = []
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        conn = self.conn
+        sql = ' '.join(query.split())
+        conn.executed.append(sql)
+        self.result, self.rowcount = [], 0
+        if sql.startswith('SELECT column_name'):
+            self.result = [{'column_name': name} for name in ('id', 'link_id', 'number_id', 'redirect_time')]
+        elif sql.startswith('SELECT 1 FROM pg_constraint'):
+            self.result = [{'exists': 1}] if conn.has_pkey else []
+        elif sql.startswith('ALTER TABLE redirect_logs_partitioned ADD CONSTRAINT redirect_logs_partitioned_pkey'):
+            conn.has_pkey = True
+        elif sql.startswith('SELECT conname'):
+            self.result = conn.target_keys if params[0] == 'redirect_logs_partitioned' else FOREIGN_KEYS
+        elif sql.startswith('ALTER TABLE redirect_logs_partitioned ADD CONSTRAINT'):
+            conn.target_keys.append({'name': sql.split()[5]})
+        elif sql.startswith('SELECT MIN(redirect_time)'):
+            self.result = [{'first': datetime(2024, 1, 15)}]
+        elif 'AS copied' in sql:
+            self.result = [{'copied': conn.copied}]
+        elif 'AS last_id' in sql:
+            self.result = [{'last_id': conn.last_id}]
+        elif sql.startswith('INSERT INTO redirect_logs_partitioned') and 'AND id <=' in sql:
+            lower, upper = params
+            conn.batches.append((lower, upper))
+            if upper == conn.fail_at:
+                raise RuntimeError('conexão perdida')
+            conn.pending = upper
+            self.rowcount = upper - lower
+        elif sql.startswith('DELETE FROM redirect_logs_partitioned'):
+            self.rowcount = conn.copied - params[0]
+        elif sql.startswith('INSERT INTO redirect_logs_partitioned'):
+            self.rowcount = conn.last_id - params[0]
+        elif sql.startswith('SELECT pg_get_serial_sequence'):
+            self.result = [{'sequence': 'public.redirect_logs_id_seq'}]
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+
+class ConversionConnection(FakeConnection):
+    def __init__(self, last_id, fail_at=None):
+        super().__init__()
+        self.last_id = last_id
+        self.fail_at = fail_at
+        self.copied = 0
+        self.pending = None
+        self.has_pkey = False
+        self.target_keys = []
+        self.batches = []
+
+    def cursor(self):
+        return ConversionCursor(self)
+
+    def commit(self):
+        if self.pending is not None:
+            self.copied, self.pending = self.pending, None
+
+    def rollback(self):
+        self.pending = None
+
+
+def test_period_boundaries():
+    """Testa o início e a virada dos períodos mensal, semanal e diário"""
+    assert period_start(datetime(2024, 12, 18, 15), 'month') == date(2024, 12, 1)
+    assert next_period(date(2024, 12, 1), 'month') == date(2025, 1, 1)
+    assert period_start(date(2024, 5, 16), 'week') == date(2024, 5, 13)
+    assert next_period(date(2024, 5, 13), 'week') == date(2024, 5, 20)
+    assert next_period(date(2024, 2, 29), 'day') == date(2024, 3, 1)
+
+
+def test_maintain_creates_ahead_and_applies_plan_retention():
+    """Testa a criação antecipada e a retenção: partições só saem fora da retenção de todos os planos"""
+    current = period_start(datetime.now(), 'month')
+    old_start = date(2000, 1, 1)
+    conn = FakeConnection(
+        partitions=[('redirect_logs_p200001', old_start, next_period(old_start, 'month')),
+                    ('redirect_logs_p' + current.strftime('%Y%m'), current, next_period(current, 'month'))],
+        plans=[{'id': 1, 'log_retention_days': 30}, {'id': 2, 'log_retention_days': None}]
+    )
+    manager = PartitionManager(FakeAdapter(conn), ahead=2, retention_days=365)
+
+    result = manager.maintain()
+
+    # Partição atual já existe: apenas as duas seguintes são criadas
+    assert len(result['created']) == 2
+    assert result['detached'] == ['redirect_logs_p200001']
+    assert any('DETACH PARTITION redirect_logs_p200001' in sql for sql in conn.executed)
+    assert not any(sql.startswith('DROP TABLE') for sql in conn.executed)
+    # Plano 1 (30 dias) tem retenção menor que a do plano 2 (padrão de 365 dias)
+    assert conn.deletes == [1]
+
+
+def test_convert_resumes_after_interrupted_batch_and_recopies_last_batch():
+    """Testa se a conversão retoma do último lote confirmado e recopia o último lote na troca"""
+    conn = ConversionConnection(last_id=350, fail_at=200)
+    manager = PartitionManager(FakeAdapter(conn), batch_size=100)
+
+    with pytest.raises(RuntimeError):
+        manager.convert()
+    assert conn.copied == 100
+
+    conn.fail_at = None
+    conn.batches.clear()
+    conn.executed.clear()
+    assert manager.convert() == 250
+
+    # Lotes retomados a partir do id 100, sem recriar a chave primária nem as chaves estrangeiras
+    assert conn.batches == [(100, 200), (200, 300), (300, 350)]
+    assert not any('ADD CONSTRAINT' in sql for sql in conn.executed)
+    # Último lote (ids acima de 250) apagado e copiado de novo com a tabela bloqueada
+    lock = conn.executed.index('LOCK TABLE redirect_logs IN EXCLUSIVE MODE')
+    assert conn.executed[lock + 1] == 'DELETE FROM redirect_logs_partitioned WHERE id > %s'
+    assert conn.executed[lock + 2].startswith('INSERT INTO redirect_logs_partitioned')
+    assert conn.executed[lock + 2].endswith('FROM redirect_logs WHERE id > %s')
+
+
+def test_convert_moves_foreign_keys_indexes_and_sequence_to_new_table():
+    """Testa as chaves estrangeiras da nova tabela, a troca de nomes e o dono da sequência"""
+    conn = ConversionConnection(last_id=0)
+    PartitionManager(FakeAdapter(conn), batch_size=100).convert()
+
+    for foreign_key in FOREIGN_KEYS:
+        name = foreign_key['name']
+        assert (f"ALTER TABLE redirect_logs_partitioned ADD CONSTRAINT {name}_p {foreign_key['definition']}"
+                in conn.executed)
+        assert f"ALTER TABLE redirect_logs_legacy DROP CONSTRAINT {name}" in conn.executed
+        assert f"ALTER TABLE redirect_logs RENAME CONSTRAINT {name}_p TO {name}" in conn.executed
+
+    swap = conn.executed[conn.executed.index('ALTER TABLE redirect_logs RENAME TO redirect_logs_legacy'):]
+    expected = ['ALTER INDEX IF EXISTS redirect_logs_pkey RENAME TO redirect_logs_legacy_pkey']
+    for name, table, method, columns, unique in INDEXES:
+        if table == 'redirect_logs':
+            expected += [f'ALTER INDEX IF EXISTS {name} RENAME TO {name}_legacy', f'ALTER INDEX {name}_p RENAME TO {name}']
+    expected += [
+        'ALTER TABLE redirect_logs_partitioned RENAME TO redirect_logs',
+        'ALTER TABLE redirect_logs RENAME CONSTRAINT redirect_logs_partitioned_pkey TO redirect_logs_pkey'
+    ]
+    assert swap[1:len(expected) + 1] == expected
+    assert swap[-1] == 'ALTER SEQUENCE public.redirect_logs_id_seq OWNED BY redirect_logs.id'
@@ -0,0 +1,50 @@
+from utils.prepared_statements import PreparedStatement, execute_prepared
+
+
+class FakeCursor:
+    """Cursor falso que registra os comandos enviados"""
+
+    def __init__(self, prepared=None, fail_prepare=False):
+        self.connection = type('Conn', (), {})()
+        if prepared is not None:
+            self.connection.prepared_statements = prepared
+        self.fail_prepare = fail_prepare
+        self.commands = []
+
+    def execute(self, query, params=None):
+        if self.fail_prepare and query.startswith('PREPARE'):
+            raise Exception('could not determine data type of parameter $1')
+        self.commands.append((query, params))
+
+
+def test_named_placeholders_are_converted():
+    """Testa a conversão de placeholders nomeados repetidos para $n"""
+    statement = PreparedStatement('pool', 'SELECT * FROM t WHERE a = %(x)s AND b = %(y)s OR c = %(x)s AND d LIKE \'a%%\'')
+
+    assert statement.prepare_sql == "PREPARE pool AS SELECT * FROM t WHERE a = $1 AND b = $2 OR c = $1 AND d LIKE 'a%'"
+    assert statement.execute_sql == 'EXECUTE pool(%s, %s)'
+    assert statement.arguments({'y': 2, 'x': 1}) == [1, 2]
+
+
+def test_statement_is_prepared_once_per_connection():
+    """Testa se o PREPARE é enviado apenas na primeira execução da conexão"""
+    statement = PreparedStatement('by_name', 'SELECT * FROM custom_links WHERE link_name = %s')
+    cursor = FakeCursor(prepared=set())
+
+    execute_prepared(cursor, statement, ('promo',))
+    execute_prepared(cursor, statement, ('outro',))
+
+    commands = [query for query, _ in cursor.commands]
+    assert commands.count(statement.prepare_sql) == 1
+    assert cursor.commands[-1] == ('EXECUTE by_name(%s)', ['outro'])
+
+
+def test_prepare_failure_falls_back_to_plain_execute():
+    """Testa se uma falha no PREPARE volta à execução comum sem abortar a transação"""
+    statement = PreparedStatement('ambiguous', 'SELECT %s IS NULL')
+    cursor = FakeCursor(prepared=set(), fail_prepare=True)
+
+    execute_prepared(cursor, statement, (None,))
+
+    assert statement.disabled
+    assert cursor.commands[-2:] == [('ROLLBACK TO SAVEPOINT prepare_statement', None), ('SELECT %s IS NULL', (None,))]
@@ -0,0 +1,146 @@
+import os
+import pytest
+from flask import Flask
+from utils import query_profiler as query_profiler_module
+from utils.prepared_statements import PreparedStatement, execute_prepared
+from utils.query_profiler import ProfilingMixin, QueryProfiler, normalize_sql, param_shape
+
+
+class FakeCursor:
+    rowcount = 3
+
+
+class FakeExplainCursor:
+    """Cursor do EXPLAIN que registra os comandos e devolve um plano fixo"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        self.connection.commands.append(query)
+        if query.startswith('EXPLAIN') and self.connection.fail_explain:
+            raise Exception('permission denied for table t')
+
+    def fetchall(self):
+        return [{'QUERY PLAN': 'Index Scan using t_pkey on t'}, {'QUERY PLAN': 'Buffers: shared hit=3'}]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, fail_explain=False):
+        self.fail_explain = fail_explain
+        self.commands = []
+        self.prepared_statements = set()
+
+    def cursor(self, cursor_factory=None):
+        return FakeExplainCursor(self)
+
+
+class BaseCursor:
+    """Base falsa no lugar do cursor do psycopg2"""
+    rowcount = 1
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, vars=None):
+        self.connection.commands.append(query)
+
+
+class RecordingCursor(ProfilingMixin, BaseCursor):
+    """Mesma composição do ProfilingCursor, sobre a base falsa"""
+
+
+def test_normalize_sql_groups_equivalent_queries():
+    """Testa se literais, listas e espaços são normalizados"""
+    first = normalize_sql("SELECT * FROM custom_links WHERE id IN (1, 2, 3) AND link_name = 'promo'")
+    second = normalize_sql("SELECT *\n  FROM custom_links WHERE id IN (7, 8) AND link_name = 'x'")
+    assert first == second == "SELECT * FROM custom_links WHERE id IN (?, ...) AND link_name = ?"
+
+    values = normalize_sql("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y'), (3, NULL)")
+    assert values == "INSERT INTO t (a, b) VALUES (?, ...), ..."
+    assert param_shape((1, 'a', None)) == '(int, str, NoneType)'
+
+
+def test_profiler_counts_per_request_and_logs_slow_queries():
+    """Testa os contadores por requisição/endpoint e o registro de consultas lentas"""
+    profiler = QueryProfiler(slow_threshold_ms=100)
+    app = Flask(__name__)
+
+    with app.test_request_context('/api/stats/summary'):
+        profiler.begin_request()
+        profiler.record(FakeCursor(), 'SELECT 1', None, 5.0)
+        profiler.record(FakeCursor(), 'SELECT * FROM t WHERE id = %s', (1,), 150.0)
+        assert profiler.request_profile()['queries'] == 2
+        profiler.end_request()
+
+    endpoint = profiler.top_endpoints()[0]
+    assert endpoint['requests'] == 1
+    assert endpoint['queries'] == 2
+    assert endpoint['rows'] == 6
+
+    slow = profiler.slow_queries()
+    assert len(slow) == 1
+    assert slow[0]['params'] == '(int)'
+    assert profiler.top_statements()[0]['sql'] == 'SELECT * FROM t WHERE id = %s'
+
+
+def test_profiling_cursor_records_prepared_statements_by_query(monkeypatch):
+    """Testa se statements preparados são registrados pela consulta original, sem os savepoints do PREPARE"""
+    profiler = QueryProfiler(slow_threshold_ms=10000)
+    monkeypatch.setattr(query_profiler_module, 'query_profiler', profiler)
+    statement = PreparedStatement('link_by_id', 'SELECT * FROM custom_links WHERE id = %s')
+    cursor = RecordingCursor(FakeConnection())
+
+    execute_prepared(cursor, statement, (1,))
+    execute_prepared(cursor, statement, (2,))
+    cursor.execute('UPDATE custom_links SET click_count = 0 WHERE id = %s', (3,))
+
+    assert 'EXECUTE link_by_id(%s)' in cursor.connection.commands
+    statements = {item['sql']: item['calls'] for item in profiler.top_statements()}
+    assert statements == {
+        'SELECT * FROM custom_links WHERE id = %s': 2,
+        'UPDATE custom_links SET click_count = ? WHERE id = %s': 1
+    }
+
+
+def test_explain_uses_savepoint_and_survives_failures():
+    """Testa se o EXPLAIN roda dentro de um savepoint e se uma falha não afeta a transação"""
+    cursor = RecordingCursor(FakeConnection())
+    plan = QueryProfiler._explain(cursor, 'SELECT * FROM t WHERE id = %s', (1,))
+
+    assert plan == 'Index Scan using t_pkey on t\nBuffers: shared hit=3'
+    assert cursor.connection.commands == [
+        'SAVEPOINT explain_query',
+        'EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM t WHERE id = %s',
+        'RELEASE SAVEPOINT explain_query'
+    ]
+
+    failing = RecordingCursor(FakeConnection(fail_explain=True))
+    assert QueryProfiler._explain(failing, 'SELECT * FROM t', None) is None
+    assert failing.connection.commands[-1] == 'ROLLBACK TO SAVEPOINT explain_query'
+
+
+@pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'), reason='TEST_DATABASE_URL não definida')
+def test_slow_prepared_select_gets_plan(monkeypatch):
+    """Testa, em um banco de teste, se um SELECT preparado lento recebe o plano da consulta original"""
+    import psycopg2
+    from utils.prepared_statements import StatementConnection
+    from utils.query_profiler import ProfilingCursor
+
+    profiler = QueryProfiler(slow_threshold_ms=0, explain_rate=1.0)
+    monkeypatch.setattr(query_profiler_module, 'query_profiler', profiler)
+    statement = PreparedStatement('profiler_probe', 'SELECT g FROM generate_series(1, %s) g')
+    conn = psycopg2.connect(os.environ['TEST_DATABASE_URL'], connection_factory=StatementConnection)
+    try:
+        cursor = conn.cursor(cursor_factory=ProfilingCursor)
+        execute_prepared(cursor, statement, (10,))
+
+        [entry] = profiler.top_statements()
+        assert entry['sql'] == 'SELECT g FROM generate_series(?, %s) g'
+        assert 'Function Scan' in entry['plan']
+    finally:
+        conn.rollback()
+        conn.close()
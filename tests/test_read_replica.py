@@ -0,0 +1,151 @@
+import psycopg2
+from utils.db_adapter import DBAdapter
+from utils.read_replica import ReplicaRouter, replica_reads, requested_lag
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 1
+
+    def execute(self, query, params=None):
+        if self.conn.fail:
+            raise psycopg2.OperationalError("servidor indisponível")
+        if self.conn.query_error is not None and query != ReplicaRouter.LAG_QUERY:
+            raise self.conn.query_error
+        self.conn.queries.append(query)
+
+    def fetchone(self):
+        return {'lag': self.conn.lag, 'count': 0}
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Conexão falsa que informa um atraso de replicação fixo"""
+
+    def __init__(self, lag=0, fail=False, query_error=None):
+        self.lag = lag
+        self.fail = fail
+        self.query_error = query_error
+        self.queries = []
+        self.closed = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def test_router_falls_back_when_replica_lags_or_fails():
+    """Testa o desvio para o primário com réplica atrasada ou fora do ar"""
+    conn = FakeConnection(lag=45)
+    router = ReplicaRouter(lambda: conn, max_lag=30, lag_check_interval=60)
+
+    assert router.acquire() is None
+    assert router.acquire(max_lag=60) is conn
+    assert router.stats()['fallback_lag'] == 1
+
+    broken = ReplicaRouter(lambda: FakeConnection(fail=True), retry_after=60)
+    assert broken.acquire() is None
+    assert broken.acquire() is None
+    assert broken.stats()['failures'] == 1
+    assert broken.stats()['fallback_down'] == 1
+
+
+def test_only_replica_reads_are_routed():
+    """Testa se apenas SELECTs dentro de replica_reads() vão para a réplica"""
+    adapter = DBAdapter()
+    adapter.pool = None
+    primary = FakeConnection()
+    replica = FakeConnection()
+    adapter.replica = ReplicaRouter(lambda: replica)
+    adapter._connect = lambda replica=False: primary
+
+    adapter.execute_query('SELECT 1')
+    assert primary.queries == ['SELECT 1']
+
+    with replica_reads(max_lag=10):
+        assert requested_lag() == 10
+        adapter.execute_query('SELECT 2')
+        adapter.execute_query('UPDATE links SET x = 1', commit=True)
+        # CTEs podem modificar dados e ficam sempre no primário
+        adapter.execute_query('WITH updated AS (UPDATE links SET x = 2 RETURNING id) SELECT * FROM updated')
+    assert requested_lag() is None
+
+    assert 'SELECT 2' in replica.queries
+    assert primary.queries == [
+        'SELECT 1', 'UPDATE links SET x = 1',
+        'WITH updated AS (UPDATE links SET x = 2 RETURNING id) SELECT * FROM updated'
+    ]
+
+
+def _adapter_with_replica(replica):
+    adapter = DBAdapter()
+    adapter.pool = None
+    primary = FakeConnection()
+    adapter.replica = ReplicaRouter(lambda: replica, retry_after=60)
+    adapter._connect = lambda replica=False: primary
+    return adapter, primary
+
+
+def test_replica_query_failure_marks_replica_down():
+    """Testa se uma falha de conexão durante a consulta tira a réplica de uso e repete no primário"""
+    replica = FakeConnection(query_error=psycopg2.OperationalError("conexão perdida"))
+    adapter, primary = _adapter_with_replica(replica)
+
+    with replica_reads():
+        adapter.execute_query('SELECT 2')
+        adapter.execute_query('SELECT 3')
+
+    assert primary.queries == ['SELECT 2', 'SELECT 3']
+    assert replica.closed
+    stats = adapter.replica.stats()
+    assert stats['failures'] == 1 and stats['fallback_down'] == 1 and not stats['available']
+
+
+def test_recovery_conflict_is_retried_on_primary():
+    """Testa se uma leitura cancelada por conflito de recovery é repetida no primário sem derrubar a réplica"""
+    conflict = psycopg2.errors.SerializationFailure("canceling statement due to conflict with recovery")
+    replica = FakeConnection(query_error=conflict)
+    adapter, primary = _adapter_with_replica(replica)
+
+    with replica_reads():
+        adapter.execute_query('SELECT 2')
+
+    assert primary.queries == ['SELECT 2']
+    stats = adapter.replica.stats()
+    assert stats['fallback_error'] == 1 and stats['failures'] == 0 and stats['available']
+
+
+def test_rollup_reports_are_routed_to_replica(monkeypatch):
+    """Testa se os relatórios sobre os agregados (subconsultas, não WITH) vão para a réplica"""
+    from app.controllers import stats_controller
+    from app.controllers.stats_controller import StatsController
+    from app.services import analytics
+    from app.services.analytics import AnalyticsService
+
+    replica = FakeConnection()
+    adapter, primary = _adapter_with_replica(replica)
+    adapter.prepared_statements_enabled = False
+    monkeypatch.setattr(stats_controller, 'db_adapter', adapter)
+    monkeypatch.setattr(analytics, 'db_adapter', adapter)
+    monkeypatch.setattr(stats_controller.stats_rollups, 'ensure_started', lambda: None)
+
+    StatsController.get_stats_by_number(1, '2024-05-01', '2024-05-31', raise_errors=True)
+    AnalyticsService.get_dashboard_stats(1)
+
+    assert any('JOIN whatsapp_numbers wn ON wn.id = c.number_id' in query for query in replica.queries)
+    assert any('LEFT JOIN (' in query and 'c ON cl.id = c.link_id' in query for query in replica.queries)
+    assert primary.queries == []
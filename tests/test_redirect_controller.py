@@ -0,0 +1,58 @@
+import pytest
+from app.controllers import redirect_controller
+from app.controllers.redirect_controller import RedirectController
+from utils.db_adapter import db_adapter
+
+LINK = {'id': 7, 'link_name': 'promo', 'user_id': 1, 'is_active': 1, 'custom_message': 'Olá'}
+NUMBER = {'id': 3, 'phone_number': '+55 11 99999-8888'}
+
+
+@pytest.fixture
+def redirect_env(monkeypatch):
+    """Redirecionamento síncrono com um único número e a geolocalização registrada em memória"""
+    submitted = []
+    monkeypatch.setattr(redirect_controller.number_pool, 'get', lambda link: (1, (NUMBER,)))
+    monkeypatch.setattr(redirect_controller.NumberBalancer, 'select_number', staticmethod(lambda *args: NUMBER))
+    monkeypatch.setattr(redirect_controller.click_pipeline, 'enabled', False)
+    monkeypatch.setattr(redirect_controller.geo_enrichment, 'submit', lambda log_id, ip: submitted.append((log_id, ip)))
+    return submitted
+
+
+def test_redirect_records_click_in_one_statement(monkeypatch, redirect_env):
+    """Testa se o redirecionamento grava log e contadores com um único statement (record_redirect)"""
+    calls = []
+
+    def fake_execute_statement(name, params=None, fetch_all=False, commit=False):
+        calls.append((name, params, commit))
+        return {'id': 99}
+
+    monkeypatch.setattr(db_adapter, 'execute_statement', fake_execute_statement)
+
+    url, error = RedirectController.redirect_whatsapp_with_link(LINK, '200.1.2.3', 'Mozilla')
+
+    assert error is None
+    assert url.startswith('https://wa.me/5511999998888')
+    assert calls == [('record_redirect', {
+        'link_id': 7, 'number_id': 3, 'user_agent': 'Mozilla', 'client_ip': '200.1.2.3', 'message': 'Olá'
+    }, True)]
+    assert redirect_env == [(99, '200.1.2.3')]
+
+    # Os contadores do link e do número são atualizados no mesmo statement do INSERT
+    query = ' '.join(db_adapter.statements['record_redirect'].query.split())
+    assert 'UPDATE custom_links SET click_count = COALESCE(click_count, 0) + 1 WHERE id = %(link_id)s' in query
+    assert 'UPDATE whatsapp_numbers SET redirect_count = redirect_count + 1 WHERE id = %(number_id)s' in query
+    assert 'INSERT INTO redirect_logs' in query and query.endswith('RETURNING id')
+
+
+def test_failed_insert_still_returns_url(monkeypatch, redirect_env):
+    """Testa se uma falha ao gravar o clique não impede o redirecionamento"""
+    def failing_execute_statement(name, params=None, fetch_all=False, commit=False):
+        raise RuntimeError('banco indisponível')
+
+    monkeypatch.setattr(db_adapter, 'execute_statement', failing_execute_statement)
+
+    url, error = RedirectController.redirect_whatsapp_with_link(LINK, '200.1.2.3', 'Mozilla')
+
+    assert error is None
+    assert url.startswith('https://wa.me/5511999998888')
+    assert redirect_env == []
@@ -0,0 +1,21 @@
+from app.services.redirect_targets import RedirectTargetCache, build_whatsapp_url
+
+
+def test_build_whatsapp_url_encodes_message():
+    """Testa se a mensagem é codificada para URL e o número normalizado"""
+    url = build_whatsapp_url('(41) 99988-7766', 'Olá, quero saber mais & já!')
+
+    assert url == 'https://wa.me/5541999887766?text=Ol%C3%A1%2C%20quero%20saber%20mais%20%26%20j%C3%A1%21'
+    assert build_whatsapp_url('5541999887766') == 'https://wa.me/5541999887766'
+
+
+def test_target_cache_is_keyed_by_message():
+    """Testa se a URL é reaproveitada para o mesmo telefone e a mesma mensagem"""
+    targets = RedirectTargetCache()
+    number = {'id': 7, 'phone_number': '5541999887766'}
+
+    first = targets.get(number, 'oi')
+    # Registro do número recarregado do banco (novo dicionário) com o mesmo telefone
+    assert targets.get({'id': 7, 'phone_number': '5541999887766', 'is_active': 1}, 'oi') is first
+    assert targets.get(number, 'tchau').endswith('?text=tchau')
+    assert targets.stats()['hits'] == 1
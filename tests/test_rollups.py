@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+from app.services import rollups
+from app.services.rollups import StatsRollups
+
+
+class FakeAdapter:
+    """Adaptador falso com a marca d'água, uma fila de logs pendentes por id e os ainda não assentados"""
+
+    def __init__(self, last_id=0, pending=(), locked=False, unsettled=()):
+        self.last_id = last_id
+        self.pending = list(pending)
+        self.unsettled = set(unsettled)
+        self.locked = locked
+        self.executed = []
+
+    def execute_query(self, query, params=None, fetch_all=False, commit=False):
+        sql = ' '.join(query.split())
+        self.executed.append(sql)
+        if 'FOR UPDATE SKIP LOCKED' in sql:
+            return None if self.locked else {'last_id': self.last_id}
+        if sql.startswith('SELECT MAX(id)'):
+            limit = min(self.unsettled, default=float('inf'))
+            batch = [log_id for log_id in self.pending
+                     if params['last_id'] < log_id < limit][:params['batch_size']]
+            return {'upper': max(batch) if batch else None, 'total': len(batch)}
+        if sql.startswith('UPDATE stats_rollup_state'):
+            self.last_id = params[0]
+        return None
+
+
+@contextmanager
+def fake_unit_of_work():
+    yield
+
+
+def test_refresh_aggregates_in_batches_and_advances_watermark(monkeypatch):
+    """Testa se a atualização agrega por hora e por dia e avança a marca d'água a cada lote"""
+    adapter = FakeAdapter(last_id=10, pending=[11, 12, 13, 14, 15])
+    monkeypatch.setattr(rollups, 'db_adapter', adapter)
+    monkeypatch.setattr(rollups, 'unit_of_work', fake_unit_of_work)
+
+    manager = StatsRollups(refresh_interval=0, batch_size=2)
+    assert manager.refresh() == 5
+    assert adapter.last_id == 15
+
+    inserts = [sql for sql in adapter.executed if sql.startswith('INSERT INTO')]
+    assert len(inserts) == 6  # 3 lotes x (hora, dia)
+    assert any('redirect_stats_hourly' in sql and "date_trunc('hour'" in sql for sql in inserts)
+    assert any('redirect_stats_daily' in sql and 'rl.redirect_time::date' in sql for sql in inserts)
+    assert all('clicks = t.clicks + EXCLUDED.clicks' in sql for sql in inserts)
+    assert manager.stats()['rows'] == 5
+
+
+def test_refresh_skips_when_locked_or_caught_up(monkeypatch):
+    """Testa se nada é gravado quando outro processo atualiza ou não há logs pendentes"""
+    monkeypatch.setattr(rollups, 'unit_of_work', fake_unit_of_work)
+
+    locked = FakeAdapter(last_id=10, pending=[11], locked=True)
+    monkeypatch.setattr(rollups, 'db_adapter', locked)
+    assert StatsRollups(refresh_interval=0).refresh() == 0
+    assert len(locked.executed) == 1
+
+    caught_up = FakeAdapter(last_id=10, pending=[])
+    monkeypatch.setattr(rollups, 'db_adapter', caught_up)
+    assert StatsRollups(refresh_interval=0).refresh() == 0
+    assert caught_up.last_id == 10
+    assert not any(sql.startswith(('INSERT', 'UPDATE')) for sql in caught_up.executed)
+
+
+def test_refresh_stops_before_unsettled_logs(monkeypatch):
+    """Testa se a marca d'água para antes de um log não assentado, que é agregado depois"""
+    adapter = FakeAdapter(last_id=10, pending=[11, 12, 13], unsettled=[12])
+    monkeypatch.setattr(rollups, 'db_adapter', adapter)
+    monkeypatch.setattr(rollups, 'unit_of_work', fake_unit_of_work)
+
+    manager = StatsRollups(refresh_interval=0)
+    assert manager.refresh() == 1
+    assert adapter.last_id == 11
+
+    adapter.unsettled.clear()
+    assert manager.refresh() == 2
+    assert adapter.last_id == 13
@@ -0,0 +1,33 @@
+from utils.rows import RowSet
+from app.models.whatsapp_number import WhatsAppNumber
+from app.models.redirect_log import RedirectLog
+
+
+def test_rowset_getter_orders_columns_and_fills_defaults():
+    """Testa se o extrator segue a ordem pedida e preenche colunas ausentes"""
+    rows = RowSet([(1, 'a', 10), (2, 'b', 20)], ('id', 'name', 'total'))
+
+    assert [rows.getter(('total', 'id'))(row) for row in rows] == [(10, 1), (20, 2)]
+    assert rows.getter(('name', 'missing'), {'missing': 0})(rows.first()) == ('a', 0)
+    assert rows.dicts()[1] == {'id': 2, 'name': 'b', 'total': 20}
+    assert RowSet().first() is None
+
+
+def test_models_hydrate_from_tuple_rows():
+    """Testa a hidratação dos modelos a partir de tuplas, com as mesmas regras de _from_db_result"""
+    rows = RowSet(
+        [(7, 1, 'Loja', '5511999990000', 0, None)],
+        ('user_id', 'id', 'description', 'phone_number', 'is_active', 'weight')
+    )
+    number, = WhatsAppNumber._from_rows(rows)
+
+    assert (number.id, number.user_id, number.phone_number) == (1, 7, '5511999990000')
+    assert number.is_active is False
+    assert number.weight == 1
+    assert number.redirect_count == 0
+    assert not hasattr(number, '__dict__')
+
+    logs = RedirectLog._from_rows(RowSet([(3, 4, 5)], ('id', 'link_id', 'number_id')))
+    assert (logs[0].id, logs[0].link_id, logs[0].number_id) == (3, 4, 5)
+    assert logs[0].timestamp is not None
+    assert WhatsAppNumber._from_rows(RowSet()) == []
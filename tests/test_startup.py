@@ -0,0 +1,33 @@
+import sys
+import subprocess
+from config.settings import active_config
+from utils.db_adapter import db_adapter
+
+
+def test_create_app_does_not_touch_database(monkeypatch):
+    """Testa se create_app não abre conexões e cabe no orçamento de inicialização"""
+    def fail(*args, **kwargs):
+        raise AssertionError("create_app não deve acessar o banco de dados")
+
+    monkeypatch.setattr(db_adapter, 'checkout_connection', fail)
+    monkeypatch.setattr(db_adapter, '_connect', fail)
+
+    from app import create_app
+    app = create_app({'SECRET_KEY': 'teste', 'TESTING': True})
+
+    assert 0 < app.config['STARTUP_TIME_MS'] < active_config.STARTUP_BUDGET_MS
+
+
+def test_heavy_modules_are_imported_lazily():
+    """Testa se a importação da aplicação não carrega asyncio, requests, analytics e geolocalização"""
+    lazy = ('asyncio', 'requests', 'app.services.analytics', 'app.services.geolocation', 'utils.geo_ipdb')
+    code = (
+        "import sys\n"
+        "from app import create_app\n"
+        "create_app({'SECRET_KEY': 'teste', 'TESTING': True})\n"
+        f"print(','.join(m for m in {lazy!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ''
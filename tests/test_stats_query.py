@@ -0,0 +1,103 @@
+import os
+import pytest
+from app.services.stats_query import StatsQuery
+from utils.migrations.versions.v0002_performance_indexes import INDEXES
+
+
+def plan_nodes(node):
+    """Percorre os nós de um plano do EXPLAIN (FORMAT JSON)"""
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def test_half_open_range_and_filters():
+    """Testa o período semiaberto (fim inclusivo vira o dia seguinte) e os filtros de usuário e link"""
+    query = StatsQuery(7, '2024-05-01', '2024-05-31', '3', timezone='')
+    conditions, params = query.where()
+
+    assert conditions == [
+        'cl.user_id = %s',
+        'rl.redirect_time >= %s::timestamp AND rl.redirect_time < %s::timestamp',
+        'cl.id = %s'
+    ]
+    assert params == [7, '2024-05-01', '2024-06-01', 3]
+    assert query.days == 31 and query.suffix == '_period_link'
+    assert not any('::date' in condition for condition in conditions)
+
+    table, rollup_conditions, rollup_params = query.rollup()
+    assert table == 'redirect_stats_daily'
+    assert rollup_params == [7, '2024-05-01', '2024-06-01', 3]
+
+    # Sem as duas datas não há período; 'all' = todos os links
+    assert StatsQuery(7, '2024-05-01', None, 'all', timezone='').where() == (['cl.user_id = %s'], [7])
+
+
+def test_tenant_timezone_uses_hourly_rollups():
+    """Testa se o fuso do cliente converte os limites no banco e usa os agregados por hora"""
+    query = StatsQuery(7, '2024-05-01', '2024-05-01', timezone='America/Sao_Paulo')
+    conditions, params = query.where()
+
+    assert "AT TIME ZONE %s) AT TIME ZONE current_setting('TimeZone')" in conditions[1]
+    assert params == [7, '2024-05-01', 'America/Sao_Paulo', '2024-05-02', 'America/Sao_Paulo']
+    assert query.suffix == '_tz'
+
+    table, rollup_conditions, _ = query.rollup('h')
+    assert table == 'redirect_stats_hourly'
+    assert rollup_conditions[1].startswith('h.hour >= ')
+
+    with pytest.raises(Exception):
+        StatsQuery(7, timezone='Fuso/Inexistente')
+
+
+def test_rejects_timezones_not_aligned_to_hourly_rollups():
+    """Testa se fusos de meia hora são recusados: a meia-noite deles não é limite de um agregado por hora"""
+    with pytest.raises(ValueError):
+        StatsQuery(7, '2024-05-01', '2024-05-01', timezone='Asia/Kolkata')
+
+    # Sem período não há limites a alinhar
+    assert StatsQuery(7, timezone='Asia/Kolkata').rollup()[0] == 'redirect_stats_hourly'
+
+
+@pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'), reason='TEST_DATABASE_URL não definida')
+def test_range_predicates_use_indexes():
+    """Testa, em um banco de teste com dados gerados, se o período é resolvido pelos índices de redirect_time"""
+    import psycopg2
+
+    conn = psycopg2.connect(os.environ['TEST_DATABASE_URL'])
+    try:
+        cursor = conn.cursor()
+        # Tabelas temporárias com os nomes reais (sobrepõem as do esquema durante a sessão)
+        cursor.execute('''
+            CREATE TEMP TABLE custom_links (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, link_name TEXT NOT NULL);
+            CREATE TEMP TABLE redirect_logs (
+                id BIGSERIAL PRIMARY KEY, link_id INTEGER NOT NULL, number_id INTEGER,
+                redirect_time TIMESTAMP NOT NULL
+            );
+            INSERT INTO custom_links SELECT g, g % 50, 'link-' || g FROM generate_series(1, 500) g;
+            INSERT INTO redirect_logs (link_id, number_id, redirect_time)
+            SELECT 1 + g % 500, g % 20, TIMESTAMP '2023-01-01' + g * INTERVAL '1 minute'
+            FROM generate_series(1, 300000) g;
+        ''')
+        # Os mesmos índices da migração v0002 (sem CONCURRENTLY, que não vale para tabelas temporárias)
+        for name, table, method, columns, unique in INDEXES:
+            if table in ('custom_links', 'redirect_logs'):
+                cursor.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} USING {method} {columns}")
+        cursor.execute('ANALYZE custom_links; ANALYZE redirect_logs')
+
+        for timezone in ('', 'America/Sao_Paulo'):
+            for link_id in (None, 42):
+                conditions, params = StatsQuery(2, '2023-03-01', '2023-03-02', link_id, timezone=timezone).where()
+                cursor.execute(f'''
+                    EXPLAIN (FORMAT JSON)
+                    SELECT COUNT(*) FROM redirect_logs rl
+                    JOIN custom_links cl ON rl.link_id = cl.id
+                    WHERE {' AND '.join(conditions)}
+                ''', params)
+                nodes = list(plan_nodes(cursor.fetchone()[0][0]['Plan']))
+                assert not any(node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == 'redirect_logs'
+                               for node in nodes), nodes
+                assert any('redirect_time' in node.get('Index Cond', '') for node in nodes), nodes
+    finally:
+        conn.rollback()
+        conn.close()
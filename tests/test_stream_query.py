@@ -0,0 +1,76 @@
+from utils.db_adapter import DBAdapter
+
+
+class FakeNamedCursor:
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+        self.itersize = None
+        self.closed = False
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.rows = [{'id': i} for i in range(self.conn.total)]
+
+    def fetchmany(self, size):
+        self.conn.fetches += 1
+        chunk, self.rows = self.rows[:size], self.rows[size:]
+        return chunk
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    """Conexão falsa com suporte a cursores nomeados"""
+
+    def __init__(self, total):
+        self.total = total
+        self.fetches = 0
+        self.closed = 0
+        self.cursors = []
+        self.rollbacks = 0
+
+    def cursor(self, name=None):
+        self.cursors.append(FakeNamedCursor(self, name))
+        return self.cursors[-1]
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+def make_adapter(conn):
+    adapter = DBAdapter()
+    adapter.pool = None
+    adapter.replica = None
+    adapter._connect = lambda replica=False: conn
+    return adapter
+
+
+def test_stream_query_fetches_in_chunks():
+    """Testa se as linhas são lidas em partes por um cursor nomeado"""
+    conn = FakeConnection(total=25)
+    rows = list(make_adapter(conn).stream_query('SELECT id FROM redirect_logs', chunk_size=10))
+
+    assert [row['id'] for row in rows] == list(range(25))
+    assert conn.fetches == 4
+    assert conn.cursors[0].name.startswith('stream_query_')
+    assert conn.cursors[0].itersize == 10
+    assert conn.closed
+
+
+def test_stream_query_releases_connection_on_early_exit():
+    """Testa se interromper a leitura fecha o cursor e devolve a conexão"""
+    conn = FakeConnection(total=100)
+    rows = make_adapter(conn).stream_query('SELECT id FROM redirect_logs', chunk_size=10)
+
+    assert next(rows)['id'] == 0
+    rows.close()
+
+    assert conn.fetches == 1
+    assert conn.cursors[0].closed
+    assert conn.rollbacks == 1
+    assert conn.closed
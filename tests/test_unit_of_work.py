@@ -0,0 +1,104 @@
+import pytest
+from utils.db_adapter import db_adapter
+from utils.unit_of_work import unit_of_work, load_identity, on_commit
+
+
+class FakeCursor:
+    rowcount = 1
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        self.conn.queries.append(query)
+
+    def fetchone(self):
+        return {'id': 1}
+
+
+class FakeConnection:
+    def __init__(self):
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Substitui as conexões do adaptador por conexões falsas"""
+    opened = []
+
+    def checkout():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(db_adapter, 'get_request_connection', lambda: None)
+    monkeypatch.setattr(db_adapter, 'checkout_connection', checkout)
+    return opened
+
+
+def test_queries_share_one_transaction(connections):
+    """Testa se consultas e conexões dos modelos usam uma única transação"""
+    invalidated = []
+
+    with unit_of_work():
+        db_adapter.execute_query('SELECT 1')
+        db_adapter.execute_query('UPDATE users SET plan_id = 2', commit=True)
+        with unit_of_work():
+            conn = db_adapter.get_db_connection()
+            conn.cursor().execute('INSERT INTO plans DEFAULT VALUES')
+            conn.commit()
+            conn.close()
+        on_commit(lambda: invalidated.append(True))
+        assert connections[0].commits == 0
+        assert invalidated == []
+
+    assert len(connections) == 1
+    assert connections[0].queries == ['SELECT 1', 'UPDATE users SET plan_id = 2', 'INSERT INTO plans DEFAULT VALUES']
+    assert connections[0].commits == 1
+    assert connections[0].closed
+    assert invalidated == [True]
+
+
+def test_identity_map_loads_once(connections):
+    """Testa se o mesmo registro é carregado uma vez por unidade de trabalho"""
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {'id': 7}
+
+    with unit_of_work():
+        first = load_identity('users', 7, loader)
+        assert load_identity('users', 7, loader) is first
+
+    load_identity('users', 7, loader)
+    assert len(loads) == 2
+
+
+def test_error_rolls_back_and_skips_callbacks(connections):
+    """Testa se uma exceção desfaz a transação e descarta as ações pós-commit"""
+    invalidated = []
+
+    with pytest.raises(ValueError):
+        with unit_of_work():
+            db_adapter.execute_query('UPDATE users SET plan_id = 2', commit=True)
+            on_commit(lambda: invalidated.append(True))
+            raise ValueError('falha')
+
+    assert connections[0].commits == 0
+    assert connections[0].rollbacks == 1
+    assert invalidated == []
@@ -1,7 +1,45 @@
+import io
+import time
 import psycopg2
 import logging
-from psycopg2.extras import RealDictCursor
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, has_app_context
+from psycopg2 import sql
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor, NamedTupleCursor, execute_values
 from config.settings import active_config
+from utils.db_pool import ConnectionPool
+from utils.unit_of_work import current_unit_of_work
+from utils.read_replica import ReplicaRouter, requested_lag
+from utils.query_profiler import ProfilingCursor, ProfilingTupleCursor, ProfilingNamedTupleCursor, query_profiler, recorded_as
+from utils.rows import RowSet, ROW_FORMATS
+from utils.prepared_statements import PreparedStatement, StatementConnection, execute_prepared
+
+# Prazo (time.monotonic) das consultas do contexto atual (None = sem limite)
+_query_deadline = ContextVar('query_deadline', default=None)
+
+
+@contextmanager
+def query_deadline(seconds):
+    """
+    Limita as consultas executadas no bloco a `seconds` no total
+    
+    Cada consulta recebe `SET LOCAL statement_timeout` com o tempo que resta
+    até o prazo, então o servidor a cancela (QueryCanceled) em vez de deixá-la
+    presa à conexão; esgotado o prazo, as seguintes falham sem ir ao banco.
+    Não se aplica dentro de unidades de trabalho.
+    
+    Args:
+        seconds (float): Tempo máximo das consultas do bloco
+    """
+    token = _query_deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _query_deadline.reset(token)
+
 
 class DBAdapter:
     """
@@ -11,6 +49,44 @@ class DBAdapter:
         self.connection = None
         self.app = None
         self.use_postgres = True  # Definir como True pois o sistema agora usa apenas PostgreSQL
+        self.pool = self._create_pool(self._connect)
+        # Réplica de leitura opcional para consultas de relatórios
+        self.replica = None
+        if active_config.POSTGRES_REPLICA_HOST:
+            connect_replica = lambda: self._connect(replica=True)
+            self.replica = ReplicaRouter(
+                connect_replica,
+                pool=self._create_pool(connect_replica),
+                max_lag=active_config.REPLICA_MAX_LAG,
+                retry_after=active_config.REPLICA_RETRY_AFTER,
+                lag_check_interval=active_config.REPLICA_LAG_CHECK_INTERVAL
+            )
+        # Sufixo das tabelas temporárias usadas por copy_rows e dos cursores de stream_query
+        self._copy_ids = itertools.count(1)
+        self._cursor_ids = itertools.count(1)
+        # Statements preparados no servidor (desativados atrás de pooler em modo transação)
+        self.statements = {}
+        self.prepared_statements_enabled = (
+            active_config.DB_PREPARED_STATEMENTS and not active_config.DB_TRANSACTION_POOLER
+        )
+        # Cursores por formato de linha (o padrão 'dict' é o da conexão)
+        if active_config.DB_PROFILER_ENABLED:
+            self.row_cursors = {'tuple': ProfilingTupleCursor, 'namedtuple': ProfilingNamedTupleCursor}
+        else:
+            self.row_cursors = {'tuple': extensions.cursor, 'namedtuple': NamedTupleCursor}
+        
+    @staticmethod
+    def _create_pool(connect):
+        if not active_config.DB_POOL_ENABLED:
+            return None
+        return ConnectionPool(
+            connect,
+            min_size=active_config.DB_POOL_MIN_SIZE,
+            max_size=active_config.DB_POOL_MAX_SIZE,
+            max_lifetime=active_config.DB_POOL_MAX_LIFETIME,
+            timeout=active_config.DB_POOL_TIMEOUT,
+            health_check_after=active_config.DB_POOL_HEALTH_CHECK_AFTER
+        )
         
     def init_app(self, app):
         """
@@ -18,6 +94,12 @@ class DBAdapter:
         """
         self.app = app
         self.use_postgres = True  # Garantir que sempre seja True
+        # Devolver ao pool a conexão usada pela requisição
+        app.teardown_appcontext(self.release_request_connection)
+        # Contadores de consultas por requisição e por endpoint
+        if active_config.DB_PROFILER_ENABLED:
+            app.before_request(query_profiler.begin_request)
+            app.teardown_request(query_profiler.end_request)
         logging.info("Adaptador de banco de dados inicializado com a aplicação Flask (PostgreSQL)")
     
     def init_db(self):
@@ -30,24 +112,112 @@ class DBAdapter:
     def get_db_connection(self):
         """
         Retorna uma conexão com o banco de dados PostgreSQL.
+        
+        Com o pool ativo (DB_POOL_ENABLED), a conexão é emprestada do pool e
+        `close()` a devolve em vez de encerrá-la. Dentro de uma unidade de
+        trabalho, retorna a conexão da unidade (commit adiado).
+        """
+        # Dentro de uma unidade de trabalho, a conexão (e a transação) é compartilhada
+        uow = current_unit_of_work()
+        if uow is not None:
+            return uow.shared_connection()
+        return self.checkout_connection()
+    
+    def checkout_connection(self):
+        """
+        Obtém uma conexão própria (do pool, se ativo), ignorando a unidade de trabalho
+        """
+        if self.pool is not None:
+            return self.pool.getconn()
+        return self._connect()
+    
+    def _connect(self, replica=False):
+        """
+        Abre uma nova conexão com o banco de dados PostgreSQL.
+        
+        Args:
+            replica (bool, optional): Se True, conecta à réplica de leitura (PG*_RO). Defaults to False.
         """
+        if replica:
+            host, port = active_config.POSTGRES_REPLICA_HOST, active_config.POSTGRES_REPLICA_PORT
+            dbname, user = active_config.POSTGRES_REPLICA_DB, active_config.POSTGRES_REPLICA_USER
+            password = active_config.POSTGRES_REPLICA_PASSWORD
+        else:
+            host, port = active_config.POSTGRES_HOST, active_config.POSTGRES_PORT
+            dbname, user = active_config.POSTGRES_DB, active_config.POSTGRES_USER
+            password = active_config.POSTGRES_PASSWORD
+        
         try:
             connection = psycopg2.connect(
-                dbname=active_config.POSTGRES_DB,
-                user=active_config.POSTGRES_USER,
-                password=active_config.POSTGRES_PASSWORD,
-                host=active_config.POSTGRES_HOST,
-                port=active_config.POSTGRES_PORT,
-                cursor_factory=RealDictCursor
+                dbname=dbname,
+                user=user,
+                password=password,
+                host=host,
+                port=port,
+                connection_factory=StatementConnection,
+                cursor_factory=ProfilingCursor if active_config.DB_PROFILER_ENABLED else RealDictCursor
             )
-            logging.info(f"Conectado com sucesso ao PostgreSQL no host: {active_config.POSTGRES_HOST}")
+            logging.info(f"Conectado com sucesso ao PostgreSQL no host: {host}")
             return connection
         except Exception as e:
             logging.error(f"Erro ao conectar ao PostgreSQL: {str(e)}")
-            logging.error(f"Configuração PostgreSQL: host={active_config.POSTGRES_HOST}, port={active_config.POSTGRES_PORT}, dbname={active_config.POSTGRES_DB}, user={active_config.POSTGRES_USER}")
+            logging.error(f"Configuração PostgreSQL: host={host}, port={port}, dbname={dbname}, user={user}")
             raise
     
-    def execute_query(self, query, params=None, fetch_all=False, commit=False):
+    def get_read_connection(self, max_lag=None):
+        """
+        Retorna uma conexão para consultas somente leitura
+        
+        Usa a réplica (PGHOST_RO) quando configurada e com atraso dentro da
+        tolerância; caso contrário, ou dentro de uma unidade de trabalho
+        (para ler as próprias escritas), usa o primário.
+        
+        Args:
+            max_lag (float, optional): Atraso máximo aceito em segundos. Defaults to None (REPLICA_MAX_LAG).
+        """
+        if self.replica is not None and current_unit_of_work() is None:
+            conn = self.replica.acquire(max_lag)
+            if conn is not None:
+                return conn
+        return self.get_db_connection()
+    
+    @contextmanager
+    def read_connection(self, max_lag=None):
+        """
+        Gerenciador de contexto para `get_read_connection` que fecha a conexão ao sair
+        """
+        conn = self.get_read_connection(max_lag)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def get_request_connection(self):
+        """
+        Retorna a conexão associada à requisição atual (flask.g)
+        
+        A mesma conexão é reutilizada por todas as consultas de `execute_query`
+        durante a requisição e devolvida ao pool no teardown do contexto.
+        Fora de um contexto da aplicação, retorna None.
+        """
+        if self.pool is None or not has_app_context():
+            return None
+        
+        conn = g.get('_db_conn')
+        if conn is None or conn.closed:
+            conn = self.checkout_connection()
+            g._db_conn = conn
+        return conn
+    
+    def release_request_connection(self, exception=None):
+        """
+        Devolve ao pool a conexão da requisição (registrado em teardown_appcontext)
+        """
+        conn = g.pop('_db_conn', None)
+        if conn is not None:
+            conn.close()
+    
+    def execute_query(self, query, params=None, fetch_all=False, commit=False, row_format=None):
         """
         Executa uma consulta no banco de dados e retorna os resultados.
         
@@ -56,38 +226,277 @@ class DBAdapter:
             params (tuple, optional): Parâmetros para a consulta. Defaults to None.
             fetch_all (bool, optional): Se True, retorna todos os resultados. Defaults to False.
             commit (bool, optional): Se True, faz commit da transação. Defaults to False.
+            row_format (str, optional): 'dict' (padrão), 'tuple' ou 'namedtuple'. Com 'tuple',
+                o resultado é sempre um RowSet (tuplas + mapa de colunas), com no máximo
+                uma linha se fetch_all for False. Defaults to None ('dict').
             
         Returns:
             list: Resultados da consulta para SELECT ou queries com RETURNING
             None: Para operações de modificação como UPDATE/DELETE/INSERT sem RETURNING
         """
-        conn = self.get_db_connection()
-        try:
-            cursor = conn.cursor()
+        return self._run(query, params, fetch_all, commit, lambda cursor: cursor.execute(query, params), row_format)
+    
+    def execute_batch(self, query, rows, page_size=1000, template=None, fetch=False, commit=True):
+        """
+        Executa uma instrução com VALUES de múltiplas linhas, em páginas
+        
+        Args:
+            query (str): Instrução com um único `VALUES %s` (INSERT ou UPDATE ... FROM (VALUES %s))
+            rows (iterable): Tuplas com os valores de cada linha
+            page_size (int, optional): Linhas por instrução enviada. Defaults to 1000.
+            template (str, optional): Template de cada linha, ex.: '(%s, %s::float8)'. Defaults to None.
+            fetch (bool, optional): Se True, retorna as linhas do RETURNING. Defaults to False.
+            commit (bool, optional): Se True, faz commit ao final. Defaults to True.
+            
+        Returns:
+            list: Linhas retornadas (fetch=True), na ordem das páginas
+            int: Total de linhas afetadas (fetch=False)
+        """
+        rows = list(rows)
+        if not rows:
+            return [] if fetch else 0
+        
+        def execute(cursor):
+            results = []
+            affected = 0
+            for start in range(0, len(rows), page_size):
+                page = rows[start:start + page_size]
+                page_results = execute_values(cursor, query, page, template=template,
+                                              page_size=len(page), fetch=fetch)
+                if fetch:
+                    results.extend(page_results)
+                else:
+                    affected += cursor.rowcount
+            return results if fetch else affected
+        
+        return self._run(query, f"{len(rows)} linhas", False, commit, execute)
+    
+    def copy_rows(self, table, columns, rows, returning=None, commit=True):
+        """
+        Insere linhas com COPY FROM STDIN a partir de um buffer em memória
+        
+        Com `returning`, as linhas passam por uma tabela temporária e são
+        inseridas com INSERT ... SELECT ... RETURNING, para devolver os IDs gerados.
+        
+        Args:
+            table (str): Tabela de destino
+            columns (list): Colunas preenchidas, na ordem dos valores de cada linha
+            rows (iterable): Tuplas com os valores (None vira NULL)
+            returning (list, optional): Colunas a retornar, ex.: ['id']. Defaults to None.
+            commit (bool, optional): Se True, faz commit ao final. Defaults to True.
+            
+        Returns:
+            list: Linhas com as colunas de `returning`, na ordem de inserção
+            int: Quantidade de linhas copiadas (sem `returning`)
+        """
+        buffer = io.StringIO()
+        count = 0
+        for row in rows:
+            buffer.write('\t'.join(_copy_value(value) for value in row))
+            buffer.write('\n')
+            count += 1
+        if not count:
+            return [] if returning else 0
+        buffer.seek(0)
+        
+        target = sql.Identifier(*table.split('.'))
+        column_list = sql.SQL(', ').join(map(sql.Identifier, columns))
+        
+        def copy(cursor, destination):
+            statement = sql.SQL('COPY {} ({}) FROM STDIN').format(destination, column_list)
+            cursor.copy_expert(statement.as_string(cursor.connection), buffer)
+        
+        def execute(cursor):
+            if not returning:
+                copy(cursor, target)
+                return cursor.rowcount
+            
+            staging = sql.Identifier(f"_copy_rows_{next(self._copy_ids)}")
+            cursor.execute(sql.SQL('CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA').format(
+                staging, column_list, target))
+            copy(cursor, staging)
+            cursor.execute(sql.SQL('INSERT INTO {} ({}) SELECT {} FROM {} RETURNING {}').format(
+                target, column_list, column_list, staging,
+                sql.SQL(', ').join(map(sql.Identifier, returning))))
+            inserted = cursor.fetchall()
+            cursor.execute(sql.SQL('DROP TABLE {}').format(staging))
+            return inserted
+        
+        return self._run(f"COPY {table}", f"{count} linhas", False, commit, execute)
+    
+    def stream_query(self, query, params=None, chunk_size=None, max_lag=None, row_format=None):
+        """
+        Lê o resultado de uma consulta em partes, com um cursor nomeado no servidor
+        
+        Apenas `chunk_size` linhas ficam em memória por vez. A consulta usa uma
+        conexão própria (da réplica, se pedida, ou do primário), que é devolvida
+        quando o gerador termina, é fechado ou é descartado antes do fim.
+        
+        Args:
+            query (str): Consulta SELECT
+            params (tuple, optional): Parâmetros da consulta. Defaults to None.
+            chunk_size (int, optional): Linhas buscadas por ida ao servidor. Defaults to None (DB_STREAM_CHUNK_SIZE).
+            max_lag (float, optional): Lê da réplica com este atraso máximo. Defaults to None
+                (réplica apenas dentro de `replica_reads()` no momento da chamada).
+            row_format (str, optional): 'dict' (padrão), 'tuple' ou 'namedtuple'. Defaults to None.
             
-            # Executar a consulta
+        Returns:
+            generator: Linhas da consulta, na ordem do resultado
+        """
+        chunk_size = chunk_size or active_config.DB_STREAM_CHUNK_SIZE
+        # A escolha da réplica é feita agora: o gerador pode ser consumido fora deste contexto
+        lag = max_lag if max_lag is not None else requested_lag()
+        return self._stream(query, params, chunk_size, lag, row_format)
+    
+    def _stream(self, query, params, chunk_size, lag, row_format):
+        conn = None
+        if lag is not None and self.replica is not None:
+            conn = self.replica.acquire(lag)
+        if conn is None:
+            conn = self.checkout_connection()
+        
+        cursor = None
+        try:
+            cursor = self.cursor(conn, row_format, name=f"stream_query_{next(self._cursor_ids)}")
+            cursor.itersize = chunk_size
             cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        except Exception as e:
+            logging.error(f"Erro ao executar consulta em partes: {str(e)}")
+            logging.error(f"Query: {query}")
+            logging.error(f"Params: {params}")
+            raise
+        finally:
+            # Também executado em GeneratorExit (consumidor interrompeu a leitura)
+            try:
+                if cursor is not None and not conn.closed:
+                    cursor.close()
+                if not conn.closed:
+                    conn.rollback()
+            except Exception as e:
+                logging.warning(f"Erro ao encerrar cursor de consulta em partes: {str(e)}")
+            conn.close()
+    
+    def register_statement(self, name, query, types=None):
+        """
+        Registra uma consulta frequente para execução com PREPARE/EXECUTE
+        
+        O statement é preparado uma vez em cada conexão, na primeira execução.
+        Registrar novamente o mesmo nome com a mesma consulta não tem efeito.
+        
+        Args:
+            name (str): Nome do statement (identificador SQL em minúsculas)
+            query (str): Consulta com placeholders %s ou %(nome)s
+            types (list, optional): Tipos SQL dos parâmetros. Defaults to None (inferidos).
+        """
+        current = self.statements.get(name)
+        if current is not None:
+            if current.query != query:
+                raise ValueError(f"Statement {name} já registrado com outra consulta")
+            return current
+        
+        statement = PreparedStatement(name, query, types)
+        self.statements[name] = statement
+        return statement
+    
+    def execute_statement(self, name, params=None, fetch_all=False, commit=False, row_format=None):
+        """
+        Executa um statement registrado com `register_statement`
+        
+        Mesmos argumentos e retorno de `execute_query`. Com os statements
+        preparados desativados (DB_TRANSACTION_POOLER), executa a consulta
+        normalmente.
+        """
+        statement = self.statements[name]
+        if not self.prepared_statements_enabled:
+            return self.execute_query(statement.query, params, fetch_all, commit, row_format)
+        
+        try:
+            return self._run(statement.query, params, fetch_all, commit,
+                             lambda cursor: execute_prepared(cursor, statement, params), row_format)
+        except psycopg2.errors.InvalidSqlStatementName:
+            # O statement sumiu da sessão: típico de pooler em modo transação
+            logging.warning("Statements preparados indisponíveis nesta conexão; desativando PREPARE/EXECUTE")
+            self.prepared_statements_enabled = False
+            if current_unit_of_work() is not None:
+                raise
+            return self.execute_query(statement.query, params, fetch_all, commit, row_format)
+    
+    def statement_stats(self):
+        """Retorna as execuções de cada statement registrado"""
+        return {
+            'enabled': self.prepared_statements_enabled,
+            'statements': {
+                name: {'executions': s.executions, 'disabled': s.disabled}
+                for name, s in self.statements.items()
+            }
+        }
+    
+    def cursor(self, conn, row_format=None, **kwargs):
+        """
+        Abre um cursor com o formato de linha pedido
+        
+        Args:
+            conn: Conexão (própria, do pool ou da unidade de trabalho)
+            row_format (str, optional): 'dict' (padrão), 'tuple' ou 'namedtuple'. Defaults to None.
+        """
+        if row_format is None or row_format == 'dict':
+            return conn.cursor(**kwargs)
+        if row_format not in ROW_FORMATS:
+            raise ValueError(f"Formato de linha inválido: {row_format}")
+        return conn.cursor(cursor_factory=self.row_cursors[row_format], **kwargs)
+    
+    def _run(self, query, params, fetch_all, commit, execute, row_format=None):
+        # Dentro de uma unidade de trabalho, o commit fica para o fim da unidade
+        uow = current_unit_of_work()
+        if uow is not None:
+            try:
+                return uow.execute(query, params, fetch_all, execute, row_format)
+            except Exception as e:
+                logging.error(f"Erro ao executar consulta: {str(e)}")
+                logging.error(f"Query: {query}")
+                logging.error(f"Params: {params}")
+                raise
+        
+        replica_conn = self._replica_connection(query)
+        if replica_conn is not None:
+            try:
+                return self._run_on_replica(replica_conn, query, params, fetch_all, execute, row_format)
+            except psycopg2.errors.QueryCanceled:
+                # Prazo da consulta esgotado: não é falha da réplica
+                raise
+            except psycopg2.errors.SerializationFailure as e:
+                # Consulta cancelada por conflito com o recovery da réplica (subclasse de
+                # OperationalError, por isso tratada antes das falhas de conexão)
+                logging.warning(f"Leitura cancelada na réplica, repetindo no primário: {str(e)}")
+                self.replica.record_fallback()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                self.replica.mark_down(e)
+            finally:
+                replica_conn.close()
+        
+        # Com prazo, conexão própria: o SET LOCAL termina com a transação dela
+        request_conn = self.get_request_connection() if _query_deadline.get() is None else None
+        conn = request_conn or self.get_db_connection()
+        try:
+            cursor = self.cursor(conn, row_format)
+            self._apply_deadline(cursor)
             
-            # Verificar o tipo de operação SQL
-            operation = query.strip().upper().split()[0]
-            has_returning = 'RETURNING' in query.upper()
+            # Executar a consulta (execuções em lote já retornam o resultado)
+            result = execute(cursor)
+            if result is None:
+                result = self.fetch_result(cursor, query, fetch_all, row_format)
             
-            # Processar resultados apenas para SELECT ou queries com RETURNING
-            result = None
-            if operation == 'SELECT' or has_returning:
-                if fetch_all:
-                    result = cursor.fetchall()
-                else:
-                    # Verificar se há resultados antes de chamar fetchone()
-                    if cursor.rowcount > 0:
-                        result = cursor.fetchone()
-            elif operation in ['UPDATE', 'DELETE', 'INSERT'] and not has_returning:
-                # Para operações de modificação sem RETURNING, apenas retornar o número de linhas afetadas
-                result = cursor.rowcount
-                
             # Commit se necessário
             if commit:
                 conn.commit()
+            elif request_conn is not None and query.strip().upper().split()[0] != 'SELECT':
+                # Escritas sem commit são descartadas, como ao fechar uma conexão própria
+                conn.rollback()
                 
             return result
         except Exception as e:
@@ -97,7 +506,84 @@ class DBAdapter:
             logging.error(f"Params: {params}")
             raise
         finally:
-            conn.close()
+            # A conexão da requisição só é devolvida no teardown
+            if request_conn is None:
+                conn.close()
+    
+    def _replica_connection(self, query):
+        # Apenas leituras pedidas com replica_reads(), fora de unidades de trabalho
+        max_lag = requested_lag()
+        if max_lag is None or self.replica is None:
+            return None
+        # WITH pode conter INSERT/UPDATE (ex.: record_redirect), que falham na réplica
+        if query.strip().upper().split()[0] != 'SELECT':
+            return None
+        return self.replica.acquire(max_lag)
+    
+    def _run_on_replica(self, conn, query, params, fetch_all, execute, row_format=None):
+        try:
+            cursor = self.cursor(conn, row_format)
+            self._apply_deadline(cursor)
+            result = execute(cursor)
+            if result is None:
+                result = self.fetch_result(cursor, query, fetch_all, row_format)
+            conn.rollback()
+            return result
+        except (psycopg2.OperationalError, psycopg2.InterfaceError, psycopg2.errors.SerializationFailure):
+            raise
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Erro ao executar consulta na réplica: {str(e)}")
+            logging.error(f"Query: {query}")
+            logging.error(f"Params: {params}")
+            raise
+    
+    @staticmethod
+    def _apply_deadline(cursor):
+        # Tempo restante de query_deadline() como statement_timeout desta transação
+        deadline = _query_deadline.get()
+        if deadline is None:
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Prazo das consultas esgotado")
+        with recorded_as(cursor):
+            cursor.execute('SET LOCAL statement_timeout = %s', (max(1, int(remaining * 1000)),))
+    
+    @staticmethod
+    def fetch_result(cursor, query, fetch_all=False, row_format=None):
+        """
+        Lê o resultado de uma consulta já executada, conforme o tipo de operação
+        
+        Returns:
+            list/dict: Resultados para SELECT ou queries com RETURNING
+            RowSet: Resultados em tuplas com o mapa de colunas (row_format='tuple')
+            int: Linhas afetadas para UPDATE/DELETE/INSERT sem RETURNING
+        """
+        # Verificar o tipo de operação SQL
+        operation = query.strip().upper().split()[0]
+        has_returning = 'RETURNING' in query.upper()
+        # WITH ... SELECT também devolve linhas (cursor.description preenchido)
+        returns_rows = operation == 'SELECT' or has_returning or (
+            operation == 'WITH' and cursor.description is not None
+        )
+        
+        # Processar resultados apenas para consultas que devolvem linhas
+        result = None
+        if returns_rows and row_format == 'tuple':
+            rows = cursor.fetchall() if fetch_all else cursor.fetchmany(1)
+            result = RowSet.from_cursor(cursor, rows)
+        elif returns_rows:
+            if fetch_all:
+                result = cursor.fetchall()
+            else:
+                # Verificar se há resultados antes de chamar fetchone()
+                if cursor.rowcount > 0:
+                    result = cursor.fetchone()
+        elif operation in ['UPDATE', 'DELETE', 'INSERT'] and not has_returning:
+            # Para operações de modificação sem RETURNING, apenas retornar o número de linhas afetadas
+            result = cursor.rowcount
+        return result
     
     def get_placeholder(self):
         """
@@ -135,35 +621,22 @@ class DBAdapter:
             return result[0] if result else None
         finally:
             conn.close()
-    
-    def create_tables(self):
-        """
-        Cria as tabelas necessárias no banco de dados PostgreSQL se não existirem.
-        """
-        conn = self.get_db_connection()
-        try:
-            cursor = conn.cursor()
-            
-            # Tabelas para PostgreSQL
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS plans (
-                    id SERIAL PRIMARY KEY,
-                    name VARCHAR(100) NOT NULL,
-                    description TEXT,
-                    max_numbers INTEGER DEFAULT 1,
-                    max_links INTEGER DEFAULT 3,
-                    price NUMERIC(10, 2) DEFAULT 0.00
-                )
-            ''')
-            
-            # Adicione aqui as demais tabelas conforme necessário
-            
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            logging.error(f"Erro ao criar tabelas: {str(e)}")
-        finally:
-            conn.close()
+
+
+def _copy_value(value):
+    """Converte um valor para o formato texto do COPY"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
 
 # Instanciar o adaptador para uso em toda a aplicação
 db_adapter = DBAdapter()
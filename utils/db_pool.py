@@ -0,0 +1,290 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter, deque
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+
+class PooledConnection:
+    """
+    Conexão emprestada do pool.
+
+    Repassa todos os atributos para a conexão psycopg2 real; `close()` apenas
+    devolve a conexão ao pool. Usada como gerenciador de contexto, faz commit
+    (ou rollback em caso de erro) e devolve a conexão ao sair do bloco.
+    """
+
+    __slots__ = ('_pool', '_conn', '_created_at')
+
+    def __init__(self, pool, conn, created_at):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_created_at', created_at)
+
+    def __getattr__(self, name):
+        conn = object.__getattribute__(self, '_conn')
+        if conn is None:
+            raise PoolError("conexão já devolvida ao pool")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    @property
+    def closed(self):
+        return self._conn is None or self._conn.closed
+
+    def close(self):
+        """Devolve a conexão ao pool (chamadas repetidas são ignoradas)"""
+        conn = self._conn
+        if conn is None:
+            return
+        object.__setattr__(self, '_conn', None)
+        self._pool.putconn(conn, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if self._conn is not None and not self._conn.closed:
+                if exc_type is None:
+                    self._conn.commit()
+                else:
+                    self._conn.rollback()
+        finally:
+            self.close()
+
+    def __del__(self):
+        # Rede de segurança para conexões que não foram fechadas explicitamente
+        try:
+            if object.__getattribute__(self, '_conn') is not None:
+                logging.warning("Conexão do pool coletada sem close(); devolvendo ao pool")
+                self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Pool de conexões thread-safe com tamanho mínimo/máximo.
+
+    - Conexões ociosas há mais de `health_check_after` segundos são testadas
+      com `SELECT 1` antes de serem entregues.
+    - Conexões com mais de `max_lifetime` segundos são substituídas.
+    - Quando o pool está cheio, `getconn` aguarda até `timeout` segundos.
+
+    O pool é recriado em cada processo após o fork (workers do gunicorn); as
+    conexões herdadas do processo pai não são usadas nem fechadas no filho.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, max_lifetime=1800, timeout=10, health_check_after=30):
+        """
+        Args:
+            connect (callable): Função que abre uma nova conexão psycopg2
+            min_size (int): Conexões abertas antecipadamente em cada processo
+            max_size (int): Quantidade máxima de conexões simultâneas
+            max_lifetime (float): Tempo máximo de vida de uma conexão em segundos
+            timeout (float): Tempo máximo de espera por uma conexão livre
+            health_check_after (float): Ociosidade a partir da qual a conexão é testada
+        """
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._available = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._pid = None
+        self._inherited = []
+        self._metrics = Counter()
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def getconn(self):
+        """
+        Empresta uma conexão do pool
+
+        Returns:
+            PooledConnection: Conexão que volta ao pool ao ser fechada
+
+        Raises:
+            PoolError: Se nenhuma conexão ficar livre dentro do timeout
+        """
+        self._check_pid()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        while True:
+            with self._available:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics['timeouts'] += 1
+                        raise PoolError(f"Nenhuma conexão livre no pool após {self.timeout}s (máximo {self.max_size})")
+                    waited = True
+                    self._available.wait(remaining)
+
+                if self._idle:
+                    conn, created_at, released_at = self._idle.pop()
+                else:
+                    # Reservar a vaga antes de conectar (fora do lock)
+                    self._size += 1
+                    conn = None
+
+            if conn is None:
+                try:
+                    conn, created_at = self._connect(), time.monotonic()
+                except Exception:
+                    self._discard(None)
+                    raise
+                self._metrics['created'] += 1
+            elif not self._is_usable(conn, created_at, released_at):
+                self._discard(conn)
+                continue
+
+            self._record_checkout(time.monotonic() - started, waited)
+            return PooledConnection(self, conn, created_at)
+
+    def putconn(self, conn, created_at):
+        """Devolve uma conexão ao pool, encerrando qualquer transação pendente"""
+        if self._pid != os.getpid():
+            # Conexão aberta em outro processo: não pode ser reaproveitada nem fechada aqui
+            self._inherited.append(conn)
+            return
+
+        try:
+            if conn.closed:
+                raise PoolError("conexão fechada")
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                raise PoolError("estado da conexão desconhecido")
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+        except Exception:
+            self._discard(conn)
+            return
+
+        if time.monotonic() - created_at >= self.max_lifetime:
+            self._discard(conn)
+            return
+
+        with self._available:
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._available.notify()
+
+    def closeall(self):
+        """Fecha as conexões ociosas do processo atual"""
+        with self._available:
+            idle, self._idle = self._idle, deque()
+            self._size -= len(idle)
+        for conn, _, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        """
+        Retorna as métricas do pool
+
+        Returns:
+            dict: Tamanho, conexões em uso, saturação e tempos de espera
+        """
+        with self._available:
+            size = self._size
+            idle = len(self._idle)
+        checkouts = self._metrics['checkouts']
+        return {
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'saturation': round((size - idle) / self.max_size, 3) if self.max_size else 0,
+            'checkouts': checkouts,
+            'waits': self._metrics['waits'],
+            'timeouts': self._metrics['timeouts'],
+            'created': self._metrics['created'],
+            'discarded': self._metrics['discarded'],
+            'avg_wait_ms': round(self._wait_total * 1000 / checkouts, 3) if checkouts else 0,
+            'max_wait_ms': round(self._wait_max * 1000, 3)
+        }
+
+    def _check_pid(self):
+        if self._pid == os.getpid():
+            return
+
+        with self._available:
+            if self._pid == os.getpid():
+                return
+            # Manter referências às conexões herdadas: fechá-las no filho
+            # encerraria a sessão do processo pai
+            self._inherited.extend(conn for conn, _, _ in self._idle)
+            self._idle = deque()
+            self._size = 0
+            self._metrics = Counter()
+            self._wait_total = 0.0
+            self._wait_max = 0.0
+            self._pid = os.getpid()
+
+        self._prefill()
+
+    def _prefill(self):
+        for _ in range(self.min_size):
+            with self._available:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception as e:
+                self._discard(None)
+                logging.error(f"Erro ao abrir conexões iniciais do pool: {str(e)}")
+                return
+            self._metrics['created'] += 1
+            with self._available:
+                self._idle.append((conn, time.monotonic(), time.monotonic()))
+
+    def _is_usable(self, conn, created_at, released_at):
+        now = time.monotonic()
+        if conn.closed or now - created_at >= self.max_lifetime:
+            return False
+        if now - released_at < self.health_check_after:
+            return True
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception as e:
+            logging.warning(f"Conexão ociosa descartada pelo health check: {str(e)}")
+            return False
+
+    def _discard(self, conn):
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        with self._available:
+            self._size -= 1
+            if conn is not None:
+                self._metrics['discarded'] += 1
+            self._available.notify()
+
+    def _record_checkout(self, wait, waited):
+        self._metrics['checkouts'] += 1
+        if waited:
+            self._metrics['waits'] += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
@@ -0,0 +1,361 @@
+import os
+import csv
+import sys
+import json
+import mmap
+import time
+import struct
+import logging
+import argparse
+import ipaddress
+import threading
+from array import array
+from bisect import bisect_right
+from config.settings import active_config
+
+
+# Cabeçalho do arquivo binário: assinatura, quantidade de faixas IPv4/IPv6 e
+# tamanho (em bytes) da tabela de localizações
+MAGIC = b'WAGEOIP1'
+HEADER = struct.Struct('<8sIIII')
+
+IPV6_WIDTH = 16
+
+
+class _FixedWidthKeys:
+    """Sequência de chaves de largura fixa sobre um buffer (usada pelo bisect)"""
+
+    def __init__(self, buffer, offset, count, width):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+        self._width = width
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        start = self._offset + index * self._width
+        return self._buffer[start:start + self._width]
+
+
+class IPRangeTable:
+    """
+    Faixas de IP ordenadas pelo início, com busca binária
+
+    Cada família (IPv4/IPv6) tem três sequências paralelas: início, fim e
+    índice da localização. Endereços IPv4 são inteiros de 32 bits e IPv6 são
+    chaves de 16 bytes big-endian, que preservam a ordem numérica na
+    comparação de bytes.
+    """
+
+    def __init__(self, v4, v6, locations):
+        self._v4 = v4
+        self._v6 = v6
+        self.locations = locations
+
+    @property
+    def v4_count(self):
+        return len(self._v4[0])
+
+    @property
+    def v6_count(self):
+        return len(self._v6[0])
+
+    def lookup(self, ip_address):
+        """
+        Busca a localização de um endereço IP
+
+        Returns:
+            tuple: (country, region, city, lat, lon) ou None se fora das faixas
+        """
+        try:
+            ip = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return None
+
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+
+        if ip.version == 4:
+            starts, ends, locations = self._v4
+            key = int(ip)
+        else:
+            starts, ends, locations = self._v6
+            key = ip.packed
+
+        index = bisect_right(starts, key) - 1
+        if index >= 0 and key <= ends[index]:
+            return self.locations[locations[index]]
+        return None
+
+    @classmethod
+    def from_csv(cls, path):
+        """
+        Carrega as faixas de um CSV (start, end, country, region, city, lat, lon)
+
+        Início e fim podem ser endereços (IPv4 ou IPv6) ou inteiros. Uma linha
+        de cabeçalho, se presente, é ignorada.
+        """
+        ranges = {4: [], 6: []}
+        location_index = {}
+
+        with open(path, newline='', encoding='utf-8') as f:
+            for line_number, row in enumerate(csv.reader(f), start=1):
+                if not row or len(row) < 7:
+                    continue
+                try:
+                    version, start = _parse_ip(row[0])
+                    _, end = _parse_ip(row[1], version)
+                    location = (row[2], row[3], row[4], float(row[5]), float(row[6]))
+                except ValueError:
+                    if line_number > 1:
+                        logging.warning(f"Linha {line_number} inválida no CSV de geolocalização: {row}")
+                    continue
+
+                index = location_index.setdefault(location, len(location_index))
+                ranges[version].append((start, end, index))
+
+        v4 = sorted(ranges[4])
+        v6 = sorted(ranges[6])
+        return cls(
+            (
+                array('I', (r[0] for r in v4)),
+                array('I', (r[1] for r in v4)),
+                array('I', (r[2] for r in v4))
+            ),
+            (
+                [r[0].to_bytes(IPV6_WIDTH, 'big') for r in v6],
+                [r[1].to_bytes(IPV6_WIDTH, 'big') for r in v6],
+                array('I', (r[2] for r in v6))
+            ),
+            list(location_index)
+        )
+
+    @classmethod
+    def from_binary(cls, path):
+        """Mapeia em memória um arquivo gerado por `compile`"""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, v4_count, v6_count, locations_size, _ = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Arquivo de geolocalização inválido: {path}")
+
+        offset = HEADER.size
+        v4 = []
+        for _ in range(3):
+            v4.append(_uint32_view(buffer, offset, v4_count))
+            offset += 4 * v4_count
+
+        v6 = []
+        for _ in range(2):
+            v6.append(_FixedWidthKeys(buffer, offset, v6_count, IPV6_WIDTH))
+            offset += IPV6_WIDTH * v6_count
+        v6.append(_uint32_view(buffer, offset, v6_count))
+        offset += 4 * v6_count
+
+        locations = [tuple(loc) for loc in json.loads(buffer[offset:offset + locations_size])]
+        return cls(tuple(v4), tuple(v6), locations)
+
+    def write_binary(self, path):
+        """Grava a tabela no formato binário (substituição atômica do arquivo)"""
+        locations = json.dumps(self.locations, ensure_ascii=False).encode('utf-8')
+        tmp_path = f"{path}.tmp"
+
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.v4_count, self.v6_count, len(locations), 0))
+            for values in self._v4:
+                f.write(_uint32_bytes(values))
+            for keys in self._v6[:2]:
+                f.write(b''.join(keys))
+            f.write(_uint32_bytes(self._v6[2]))
+            f.write(locations)
+
+        # os.replace mantém válido o arquivo antigo para processos que o mapearam
+        os.replace(tmp_path, path)
+
+
+def _parse_ip(value, version=None):
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        if version is None:
+            version = 4 if number <= 0xFFFFFFFF else 6
+        return version, number
+
+    ip = ipaddress.ip_address(value)
+    return ip.version, int(ip)
+
+
+def _uint32_view(buffer, offset, count):
+    view = memoryview(buffer)[offset:offset + 4 * count]
+    if sys.byteorder == 'little':
+        return view.cast('I')
+    values = array('I', view.tobytes())
+    values.byteswap()
+    return values
+
+
+def _uint32_bytes(values):
+    values = array('I', values)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+class IPRangeDatabase:
+    """
+    Base de geolocalização local, recarregada quando o arquivo muda.
+
+    Aceita o CSV de faixas ou o arquivo binário gerado pelo comando
+    `compile` (preferível em produção: é mapeado em memória e compartilhado
+    entre os workers). A data de modificação é verificada no máximo a cada
+    `reload_interval` segundos.
+    """
+
+    def __init__(self, path=None, reload_interval=5):
+        """
+        Args:
+            path (str, optional): Caminho do CSV ou do arquivo binário
+            reload_interval (float): Intervalo mínimo entre verificações do arquivo
+        """
+        self.path = path
+        self.reload_interval = reload_interval
+        self._table = None
+        self._mtime = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def lookup(self, ip_address):
+        """
+        Obtém a localização de um IP na base local
+
+        Args:
+            ip_address (str): Endereço IPv4 ou IPv6
+
+        Returns:
+            dict: Localização no formato do GeoLocationService ou None se não encontrada
+        """
+        if not self.enabled:
+            return None
+
+        table = self._current_table()
+        if table is None:
+            return None
+
+        self.lookups += 1
+        location = table.lookup(ip_address)
+        if location is None:
+            return None
+
+        self.hits += 1
+        country, region, city, lat, lon = location
+        return {
+            'ip': ip_address,
+            'city': city,
+            'region': region,
+            'country': country,
+            'lat': lat,
+            'lon': lon
+        }
+
+    def stats(self):
+        """Retorna o tamanho da base carregada e a taxa de acertos"""
+        table = self._table
+        return {
+            'path': self.path,
+            'v4_ranges': table.v4_count if table else 0,
+            'v6_ranges': table.v6_count if table else 0,
+            'lookups': self.lookups,
+            'hits': self.hits
+        }
+
+    def _current_table(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return self._table
+
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return self._table
+            self._checked_at = now
+
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError as e:
+                logging.error(f"Base de geolocalização indisponível em {self.path}: {str(e)}")
+                return self._table
+
+            if mtime != self._mtime:
+                try:
+                    self._table = load_table(self.path)
+                    self._mtime = mtime
+                    logging.info(
+                        f"Base de geolocalização carregada de {self.path} "
+                        f"({self._table.v4_count} faixas IPv4, {self._table.v6_count} faixas IPv6)"
+                    )
+                except Exception as e:
+                    # Manter a versão anterior se o novo arquivo estiver incompleto
+                    logging.error(f"Erro ao carregar base de geolocalização: {str(e)}")
+
+        return self._table
+
+
+def load_table(path):
+    """Carrega um arquivo binário ou CSV, detectando o formato pela assinatura"""
+    with open(path, 'rb') as f:
+        is_binary = f.read(len(MAGIC)) == MAGIC
+    return IPRangeTable.from_binary(path) if is_binary else IPRangeTable.from_csv(path)
+
+
+# Base compartilhada por todo o processo (desativada se GEOIP_DB_PATH não estiver definido)
+ip_database = IPRangeDatabase(
+    path=active_config.GEOIP_DB_PATH,
+    reload_interval=active_config.GEOIP_RELOAD_INTERVAL
+)
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Base local de geolocalização por faixas de IP')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compile_parser = subparsers.add_parser('compile', help='Compila o CSV de faixas no formato binário')
+    compile_parser.add_argument('csv_path', help='CSV com start, end, country, region, city, lat, lon')
+    compile_parser.add_argument('output_path', help='Arquivo binário de saída')
+
+    lookup_parser = subparsers.add_parser('lookup', help='Consulta IPs em uma base (CSV ou binária)')
+    lookup_parser.add_argument('db_path', help='Caminho da base')
+    lookup_parser.add_argument('ips', nargs='+', help='Endereços IP')
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    # Configuração de logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] [%(levelname)s] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+    args = parse_args()
+
+    if args.command == 'compile':
+        table = IPRangeTable.from_csv(args.csv_path)
+        table.write_binary(args.output_path)
+        logging.info(
+            f"Base compilada em {args.output_path}: {table.v4_count} faixas IPv4, "
+            f"{table.v6_count} faixas IPv6, {len(table.locations)} localizações"
+        )
+    else:
+        table = load_table(args.db_path)
+        for ip in args.ips:
+            print(f"{ip}: {table.lookup(ip)}")
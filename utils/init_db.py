@@ -1,11 +1,17 @@
 import logging
 from utils.db_adapter import db_adapter
+from utils.migrations import migration_runner
 
 
-def init_database():
+def init_database(migrate=False):
     """
-    Inicializa o banco de dados criando todas as tabelas necessárias
-    se elas ainda não existirem.
+    Verifica o banco de dados e cria o usuário de teste, se necessário.
+    
+    Tabelas, colunas e índices são criados pelas migrações versionadas
+    (`python -m utils.migrations upgrade`).
+    
+    Args:
+        migrate (bool, optional): Aplica também as migrações pendentes. Defaults to False.
     """
     logging.info("Inicializando banco de dados...")
     
@@ -19,9 +25,7 @@ def init_database():
         users_exists = result and result['to_regclass'] is not None
         
         if not users_exists:
-            logging.warning("A tabela de usuários não existe. Criando tabelas...")
-            # Criar tabelas chamando o método de criação
-            db_adapter.create_tables()
+            logging.error("A tabela de usuários não existe. Crie o esquema base antes de aplicar as migrações.")
         else:
             logging.info("Tabelas já existem, verificando usuários...")
             
@@ -43,6 +47,17 @@ def init_database():
                 logging.info("Usuário de teste 'felipe' criado com sucesso!")
         
         conn.commit()
+        
+        if users_exists:
+            if migrate:
+                migration_runner.upgrade()
+            else:
+                pending = migration_runner.pending()
+                if pending:
+                    logging.warning(
+                        f"{len(pending)} migração(ões) pendente(s) ({pending[0].name}...); "
+                        f"execute: python -m utils.migrations upgrade"
+                    )
         logging.info("Banco de dados inicializado com sucesso!")
         
     except Exception as e:
@@ -61,5 +76,5 @@ if __name__ == "__main__":
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     
-    # Inicializar banco de dados
-    init_database()
+    # Inicializar banco de dados e aplicar as migrações pendentes
+    init_database(migrate=True)
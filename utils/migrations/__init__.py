@@ -0,0 +1,255 @@
+"""
+Migrações versionadas do esquema do banco de dados
+
+Cada módulo em `utils/migrations/versions` (vNNNN_descricao.py) é uma
+migração, aplicada uma única vez e em ordem de versão. O módulo define:
+
+    STATEMENTS       Lista de comandos SQL, ou
+    upgrade(cursor)  Função que aplica a migração
+    TRANSACTIONAL    False para comandos que não rodam dentro de uma
+                     transação (ex.: CREATE INDEX CONCURRENTLY). Padrão: True
+
+As versões aplicadas ficam registradas na tabela `schema_migrations`.
+
+    python -m utils.migrations status
+    python -m utils.migrations upgrade [--to VERSAO]
+"""
+import time
+import pkgutil
+import logging
+import importlib
+from utils.db_adapter import db_adapter
+
+
+class MigrationError(Exception):
+    """Falha ao aplicar uma migração"""
+
+
+class Migration:
+    """Uma migração carregada de `utils/migrations/versions`"""
+
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+        self.transactional = getattr(module, 'TRANSACTIONAL', True)
+        self.description = (module.__doc__ or '').strip().split('\n')[0]
+
+    def apply(self, cursor):
+        """Executa a migração no cursor informado"""
+        upgrade = getattr(self.module, 'upgrade', None)
+        if upgrade is not None:
+            upgrade(cursor)
+            return
+        for statement in self.module.STATEMENTS:
+            cursor.execute(statement)
+
+
+class MigrationRunner:
+    """
+    Aplica as migrações pendentes e registra cada versão em `schema_migrations`.
+
+    Migrações transacionais rodam, junto com o registro da versão, em uma
+    única transação. As demais rodam em autocommit e só são registradas ao
+    final; por isso devem ser idempotentes (IF NOT EXISTS). Um advisory lock
+    impede que dois processos apliquem migrações ao mesmo tempo.
+    """
+
+    TABLE_QUERY = '''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INTEGER
+        )
+    '''
+
+    # Chave do advisory lock (pg_try_advisory_lock) das migrações
+    LOCK_KEY = 7_101_020
+
+    # Versão do esquema sem DDL (a tabela pode ainda não existir)
+    VERSION_QUERY = '''
+        SELECT CASE WHEN to_regclass('schema_migrations') IS NULL THEN 0
+               ELSE (SELECT COALESCE(MAX(version), 0) FROM schema_migrations) END AS version
+    '''
+
+    def __init__(self, adapter, package='utils.migrations.versions'):
+        self.adapter = adapter
+        self.package = package
+        self._migrations = None
+        self._checked = None
+
+    def migrations(self):
+        """
+        Retorna todas as migrações conhecidas, em ordem de versão
+
+        Returns:
+            list: Objetos Migration
+        """
+        if self._migrations is None:
+            package = importlib.import_module(self.package)
+            migrations = []
+            for module_info in pkgutil.iter_modules(package.__path__):
+                name = module_info.name
+                if not name.startswith('v') or '_' not in name:
+                    continue
+                version = int(name[1:name.index('_')])
+                module = importlib.import_module(f"{self.package}.{name}")
+                migrations.append(Migration(version, name, module))
+            migrations.sort(key=lambda migration: migration.version)
+
+            versions = [migration.version for migration in migrations]
+            if len(set(versions)) != len(versions):
+                raise MigrationError(f"Versões de migração duplicadas em {self.package}")
+            self._migrations = migrations
+        return self._migrations
+
+    def applied(self):
+        """
+        Retorna as versões já aplicadas
+
+        Returns:
+            dict: versão -> data de aplicação
+        """
+        conn = self.adapter.checkout_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.TABLE_QUERY)
+            cursor.execute('SELECT version, applied_at FROM schema_migrations')
+            rows = cursor.fetchall()
+            conn.commit()
+            return {row['version']: row['applied_at'] for row in rows}
+        finally:
+            conn.close()
+
+    def pending(self):
+        """Retorna as migrações ainda não aplicadas, em ordem de versão"""
+        applied = self.applied()
+        return [migration for migration in self.migrations() if migration.version not in applied]
+
+    def current_version(self):
+        """Maior versão aplicada (0 se nenhuma)"""
+        return max(self.applied(), default=0)
+
+    def head_version(self):
+        """Maior versão conhecida pelo código (0 se nenhuma)"""
+        return max((migration.version for migration in self.migrations()), default=0)
+
+    def check(self):
+        """
+        Compara a versão do esquema no banco com a do código
+
+        Uma única consulta por processo (o resultado fica guardado); substitui a
+        verificação das tabelas e colunas a cada inicialização.
+
+        Returns:
+            tuple: (versão do banco, versão do código)
+        """
+        if self._checked is None:
+            conn = self.adapter.checkout_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(self.VERSION_QUERY)
+                current = cursor.fetchone()['version']
+                conn.commit()
+            finally:
+                conn.close()
+
+            head = self.head_version()
+            if current < head:
+                logging.warning(
+                    f"Esquema do banco na versão {current}, código na versão {head}; "
+                    f"execute: python -m utils.migrations upgrade"
+                )
+            elif current > head:
+                logging.warning(f"Esquema do banco (versão {current}) à frente do código (versão {head})")
+            else:
+                logging.info(f"Esquema do banco na versão {current}")
+            self._checked = (current, head)
+        return self._checked
+
+    def status(self):
+        """
+        Retorna a situação de cada migração
+
+        Returns:
+            list: dicts com version, name, description e applied_at (None se pendente)
+        """
+        applied = self.applied()
+        return [{
+            'version': migration.version,
+            'name': migration.name,
+            'description': migration.description,
+            'applied_at': applied.get(migration.version)
+        } for migration in self.migrations()]
+
+    def upgrade(self, target=None):
+        """
+        Aplica as migrações pendentes até `target` (inclusive)
+
+        Args:
+            target (int, optional): Última versão a aplicar. Defaults to None (todas).
+
+        Returns:
+            list: Versões aplicadas nesta execução
+        """
+        conn = self.adapter.checkout_connection()
+        applied_now = []
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT pg_try_advisory_lock(%s) AS locked', (self.LOCK_KEY,))
+            if not cursor.fetchone()['locked']:
+                conn.rollback()
+                raise MigrationError("Outro processo está aplicando migrações")
+
+            try:
+                cursor.execute(self.TABLE_QUERY)
+                cursor.execute('SELECT version FROM schema_migrations')
+                applied = {row['version'] for row in cursor.fetchall()}
+                conn.commit()
+
+                for migration in self.migrations():
+                    if migration.version in applied:
+                        continue
+                    if target is not None and migration.version > target:
+                        break
+                    self._apply(conn, migration)
+                    applied_now.append(migration.version)
+            finally:
+                conn.autocommit = False
+                cursor = conn.cursor()
+                cursor.execute('SELECT pg_advisory_unlock(%s)', (self.LOCK_KEY,))
+                conn.commit()
+        finally:
+            conn.close()
+
+        if applied_now:
+            logging.info(f"Migrações aplicadas: {', '.join(str(version) for version in applied_now)}")
+        return applied_now
+
+    def _apply(self, conn, migration):
+        logging.info(f"Aplicando migração {migration.name}: {migration.description}")
+        started = time.perf_counter()
+        try:
+            conn.autocommit = not migration.transactional
+            migration.apply(conn.cursor())
+            conn.autocommit = False
+
+            cursor = conn.cursor()
+            cursor.execute(
+                'INSERT INTO schema_migrations (version, name, duration_ms) VALUES (%s, %s, %s)',
+                (migration.version, migration.name, int((time.perf_counter() - started) * 1000))
+            )
+            conn.commit()
+        except Exception as e:
+            if not conn.autocommit:
+                conn.rollback()
+            conn.autocommit = False
+            logging.error(f"Erro ao aplicar a migração {migration.name}: {str(e)}")
+            raise MigrationError(f"Migração {migration.name} falhou: {str(e)}") from e
+
+        logging.info(f"Migração {migration.name} aplicada em {time.perf_counter() - started:.2f} segundos")
+
+
+# Instância compartilhada (CLI e verificação da versão do esquema na inicialização)
+migration_runner = MigrationRunner(db_adapter)
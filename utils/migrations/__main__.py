@@ -0,0 +1,44 @@
+"""
+Linha de comando das migrações
+
+    python -m utils.migrations status
+    python -m utils.migrations upgrade [--to VERSAO]
+"""
+import sys
+import argparse
+import logging
+from utils.migrations import migration_runner, MigrationError
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m utils.migrations', description="Migrações do esquema")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help="Lista as migrações e a data de aplicação")
+    upgrade = commands.add_parser('upgrade', help="Aplica as migrações pendentes")
+    upgrade.add_argument('--to', type=int, default=None, help="Última versão a aplicar")
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        for migration in migration_runner.status():
+            applied_at = migration['applied_at'] or 'pendente'
+            print(f"{migration['version']:>5}  {migration['name']:<40} {applied_at}")
+        return 0
+
+    try:
+        applied = migration_runner.upgrade(args.to)
+    except MigrationError as e:
+        logging.error(str(e))
+        return 1
+
+    if not applied:
+        print(f"Esquema atualizado (versão {migration_runner.current_version()})")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] [%(levelname)s] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""Tabelas e colunas adicionadas após a criação inicial do banco (antes em utils/init_db.py)"""
+
+STATEMENTS = [
+    # Planos (antes criados por DBAdapter.create_tables)
+    """
+    CREATE TABLE IF NOT EXISTS plans (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        description TEXT,
+        max_numbers INTEGER DEFAULT 1,
+        max_links INTEGER DEFAULT 3,
+        price NUMERIC(10, 2) DEFAULT 0.00
+    )
+    """,
+    # Números atribuídos a cada link (sem atribuições, o link usa todos os números ativos do usuário)
+    """
+    CREATE TABLE IF NOT EXISTS link_numbers (
+        link_id INTEGER NOT NULL REFERENCES custom_links(id) ON DELETE CASCADE,
+        number_id INTEGER NOT NULL REFERENCES whatsapp_numbers(id) ON DELETE CASCADE,
+        PRIMARY KEY (link_id, number_id)
+    )
+    """,
+    # Estratégia de balanceamento por link e por usuário (NULL = padrão)
+    "ALTER TABLE custom_links ADD COLUMN IF NOT EXISTS balancing_strategy VARCHAR(32)",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS balancing_strategy VARCHAR(32)",
+    # Peso e capacidade (redirecionamentos em 24 horas, NULL = ilimitado) por número
+    "ALTER TABLE whatsapp_numbers ADD COLUMN IF NOT EXISTS weight INTEGER DEFAULT 1",
+    "ALTER TABLE whatsapp_numbers ADD COLUMN IF NOT EXISTS capacity INTEGER",
+]
@@ -0,0 +1,66 @@
+"""Índices das consultas de estatísticas, listagens e redirecionamento"""
+import logging
+
+# CREATE INDEX CONCURRENTLY não bloqueia escritas, mas não roda em transação
+TRANSACTIONAL = False
+
+INDEXES = [
+    # Estatísticas e histórico por link / por número, filtrados por período
+    ('idx_redirect_logs_link_time', 'redirect_logs', 'btree', '(link_id, redirect_time)', False),
+    ('idx_redirect_logs_number_time', 'redirect_logs', 'btree', '(number_id, redirect_time)', False),
+    # Varreduras por período em toda a tabela (BRIN: poucas páginas, dados inseridos em ordem)
+    ('idx_redirect_logs_time_brin', 'redirect_logs', 'brin', '(redirect_time)', False),
+    # Busca por nome no redirecionamento (o nome é único entre todos os usuários)
+    ('uq_custom_links_link_name', 'custom_links', 'btree', '(link_name)', True),
+    ('idx_custom_links_user', 'custom_links', 'btree', '(user_id)', False),
+    ('idx_whatsapp_numbers_user_active', 'whatsapp_numbers', 'btree', '(user_id, is_active)', False),
+]
+
+# Índice inválido deixado por um CREATE INDEX CONCURRENTLY interrompido
+INVALID_QUERY = '''
+    SELECT 1 FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = %s AND NOT i.indisvalid
+'''
+
+# Índice único já existente sobre a mesma coluna (ex.: constraint UNIQUE da criação da tabela)
+UNIQUE_QUERY = '''
+    SELECT 1 FROM pg_index i
+    JOIN pg_class t ON t.oid = i.indrelid
+    JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = i.indkey[0]
+    WHERE t.relname = %s AND a.attname = %s
+    AND i.indisunique AND i.indisvalid AND i.indnatts = 1
+'''
+
+DUPLICATES_QUERY = '''
+    SELECT link_name, COUNT(*) AS total FROM custom_links
+    GROUP BY link_name HAVING COUNT(*) > 1
+    LIMIT 10
+'''
+
+
+def upgrade(cursor):
+    for name, table, method, columns, unique in INDEXES:
+        cursor.execute(INVALID_QUERY, (name,))
+        if cursor.fetchone():
+            logging.warning(f"Removendo índice inválido {name} de uma execução anterior")
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+        if unique:
+            cursor.execute(UNIQUE_QUERY, (table, columns.strip('()')))
+            if cursor.fetchone():
+                logging.info(f"{table}{columns} já possui índice único; {name} não é necessário")
+                continue
+
+            cursor.execute(DUPLICATES_QUERY)
+            duplicates = cursor.fetchall()
+            if duplicates:
+                names = ', '.join(row['link_name'] for row in duplicates)
+                raise RuntimeError(f"Nomes de link duplicados impedem o índice único: {names}")
+
+        cursor.execute(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON {table} USING {method} {columns}"
+        )
+
+    cursor.execute('ANALYZE redirect_logs')
@@ -0,0 +1,6 @@
+"""Retenção dos logs de redirecionamento por plano (usada pela manutenção das partições)"""
+
+STATEMENTS = [
+    # Dias de histórico mantidos para os usuários do plano (NULL = REDIRECT_LOG_RETENTION_DAYS)
+    "ALTER TABLE plans ADD COLUMN IF NOT EXISTS log_retention_days INTEGER",
+]
@@ -0,0 +1,38 @@
+"""Tabelas de cliques agregados por hora e por dia (mantidas por app/services/rollups.py)"""
+
+STATEMENTS = [
+    # País '' = não geolocalizado; number_id 0 = log sem número
+    """
+    CREATE TABLE IF NOT EXISTS redirect_stats_hourly (
+        user_id INTEGER NOT NULL,
+        hour TIMESTAMP NOT NULL,
+        link_id INTEGER NOT NULL,
+        number_id INTEGER NOT NULL,
+        country TEXT NOT NULL DEFAULT '',
+        clicks BIGINT NOT NULL DEFAULT 0,
+        last_redirect TIMESTAMP,
+        PRIMARY KEY (user_id, hour, link_id, number_id, country)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS redirect_stats_daily (
+        user_id INTEGER NOT NULL,
+        day DATE NOT NULL,
+        link_id INTEGER NOT NULL,
+        number_id INTEGER NOT NULL,
+        country TEXT NOT NULL DEFAULT '',
+        clicks BIGINT NOT NULL DEFAULT 0,
+        last_redirect TIMESTAMP,
+        PRIMARY KEY (user_id, day, link_id, number_id, country)
+    )
+    """,
+    # Maior id de redirect_logs já agregado
+    """
+    CREATE TABLE IF NOT EXISTS stats_rollup_state (
+        name VARCHAR(64) PRIMARY KEY,
+        last_id BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP
+    )
+    """,
+    "INSERT INTO stats_rollup_state (name, last_id) VALUES ('redirect_stats', 0) ON CONFLICT (name) DO NOTHING",
+]
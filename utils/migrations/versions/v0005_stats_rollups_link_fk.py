@@ -0,0 +1,18 @@
+"""Agregados de cliques excluídos junto com o link, como os logs de redirecionamento"""
+
+STATEMENTS = [
+    # Agregados de links já excluídos (os logs deles foram removidos em cascata)
+    "DELETE FROM redirect_stats_hourly d WHERE NOT EXISTS (SELECT 1 FROM custom_links cl WHERE cl.id = d.link_id)",
+    "DELETE FROM redirect_stats_daily d WHERE NOT EXISTS (SELECT 1 FROM custom_links cl WHERE cl.id = d.link_id)",
+    # Índices por link para a exclusão em cascata não varrer as tabelas inteiras
+    "CREATE INDEX IF NOT EXISTS idx_redirect_stats_hourly_link ON redirect_stats_hourly (link_id)",
+    "CREATE INDEX IF NOT EXISTS idx_redirect_stats_daily_link ON redirect_stats_daily (link_id)",
+    """
+    ALTER TABLE redirect_stats_hourly ADD CONSTRAINT redirect_stats_hourly_link_id_fkey
+    FOREIGN KEY (link_id) REFERENCES custom_links(id) ON DELETE CASCADE
+    """,
+    """
+    ALTER TABLE redirect_stats_daily ADD CONSTRAINT redirect_stats_daily_link_id_fkey
+    FOREIGN KEY (link_id) REFERENCES custom_links(id) ON DELETE CASCADE
+    """,
+]
@@ -0,0 +1,435 @@
+"""
+Particionamento de redirect_logs por período de redirect_time
+
+    python -m utils.partitions status
+    python -m utils.partitions convert [--pause SEGUNDOS]
+    python -m utils.partitions maintain
+
+`convert` transforma a tabela existente em uma tabela particionada, copiando
+as linhas em lotes (cada lote em sua própria transação) e trocando as tabelas
+em uma transação curta no final. `maintain` cria as partições futuras e aplica
+a retenção de cada plano; deve rodar diariamente (cron).
+"""
+import re
+import sys
+import time
+import logging
+import argparse
+from datetime import date, datetime, timedelta
+from config.settings import active_config
+from utils.db_adapter import db_adapter
+from utils.migrations.versions.v0002_performance_indexes import INDEXES
+
+
+INTERVALS = ('month', 'week', 'day')
+
+
+def period_start(value, interval):
+    """Início do período (mês, semana ou dia) que contém `value`"""
+    day = value.date() if isinstance(value, datetime) else value
+    if interval == 'month':
+        return day.replace(day=1)
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def next_period(start, interval):
+    """Início do período seguinte a `start`"""
+    if interval == 'month':
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=7 if interval == 'week' else 1)
+
+
+class PartitionManager:
+    """
+    Partições de redirect_logs: criação antecipada, conversão da tabela e retenção.
+
+    A retenção é por plano (`plans.log_retention_days`, ou o padrão da
+    configuração). Partições inteiras só saem da tabela quando estão fora da
+    retenção de todos os planos; para os planos com retenção menor, as linhas
+    antigas são removidas em lotes.
+    """
+
+    TABLE = 'redirect_logs'
+
+    BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+    PARTITIONS_QUERY = '''
+        SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound,
+               c.reltuples::BIGINT AS estimated_rows
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = %s
+    '''
+
+    FOREIGN_KEYS_QUERY = '''
+        SELECT conname AS name, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        ORDER BY conname
+    '''
+
+    # Linhas de um plano anteriores ao corte, em lotes (o filtro externo permite a poda de partições)
+    RETENTION_DELETE = '''
+        DELETE FROM redirect_logs
+        WHERE redirect_time < %(cutoff)s AND id IN (
+            SELECT rl.id FROM redirect_logs rl
+            JOIN custom_links cl ON cl.id = rl.link_id
+            JOIN users u ON u.id = cl.user_id
+            WHERE u.plan_id = %(plan_id)s AND rl.redirect_time < %(cutoff)s
+            LIMIT %(batch_size)s
+        )
+    '''
+
+    def __init__(self, adapter, interval='month', ahead=3, retention_days=0,
+                 retention_action='detach', batch_size=10000):
+        """
+        Args:
+            adapter: DBAdapter usado para obter as conexões
+            interval (str): Período de cada partição ('month', 'week' ou 'day')
+            ahead (int): Partições futuras mantidas criadas
+            retention_days (int): Retenção dos planos sem log_retention_days (0 = ilimitada)
+            retention_action (str): 'detach' ou 'drop' para partições fora da retenção
+            batch_size (int): Linhas por lote na conversão e na limpeza por plano
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Período de partição inválido: {interval}")
+        if retention_action not in ('detach', 'drop'):
+            raise ValueError(f"Ação de retenção inválida: {retention_action}")
+        self.adapter = adapter
+        self.interval = interval
+        self.ahead = ahead
+        self.retention_days = retention_days
+        self.retention_action = retention_action
+        self.batch_size = batch_size
+
+    def partition_name(self, start):
+        """Nome da partição que começa em `start`"""
+        if self.interval == 'month':
+            return f"{self.TABLE}_p{start:%Y%m}"
+        return f"{self.TABLE}_p{start:%Y%m%d}"
+
+    def is_partitioned(self, cursor, table=None):
+        cursor.execute('SELECT relkind FROM pg_class WHERE relname = %s', (table or self.TABLE,))
+        row = cursor.fetchone()
+        return row is not None and row['relkind'] == 'p'
+
+    def partitions(self, cursor, table=None):
+        """
+        Lista as partições de uma tabela
+
+        Returns:
+            list: dicts com name, start, end (None na partição DEFAULT) e estimated_rows
+        """
+        cursor.execute(self.PARTITIONS_QUERY, (table or self.TABLE,))
+        partitions = []
+        for row in cursor.fetchall():
+            match = self.BOUND_PATTERN.search(row['bound'])
+            partitions.append({
+                'name': row['name'],
+                'start': datetime.fromisoformat(match.group(1)).date() if match else None,
+                'end': datetime.fromisoformat(match.group(2)).date() if match else None,
+                'estimated_rows': max(row['estimated_rows'], 0)
+            })
+        partitions.sort(key=lambda partition: (partition['start'] is None, partition['start'] or date.min))
+        return partitions
+
+    def ensure_partitions(self, cursor, since, table=None):
+        """
+        Cria as partições de `since` até `ahead` períodos depois do atual
+
+        Returns:
+            list: Nomes das partições criadas
+        """
+        table = table or self.TABLE
+        existing = [p for p in self.partitions(cursor, table) if p['start'] is not None]
+        last = period_start(datetime.now(), self.interval)
+        for _ in range(self.ahead):
+            last = next_period(last, self.interval)
+
+        created = []
+        start = period_start(since, self.interval)
+        while start <= last:
+            end = next_period(start, self.interval)
+            # Períodos já cobertos (inclusive por partições de outro intervalo) são mantidos
+            if not any(p['start'] < end and start < p['end'] for p in existing):
+                # Nomes definitivos mesmo durante a conversão (a tabela-mãe é renomeada no final)
+                name = self.partition_name(start)
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+                created.append(name)
+            start = end
+        return created
+
+    def status(self):
+        """Retorna se a tabela está particionada e suas partições"""
+        conn = self.adapter.checkout_connection()
+        try:
+            cursor = conn.cursor()
+            partitioned = self.is_partitioned(cursor)
+            partitions = self.partitions(cursor) if partitioned else []
+            conn.commit()
+            return {'partitioned': partitioned, 'interval': self.interval, 'partitions': partitions}
+        finally:
+            conn.close()
+
+    def maintain(self):
+        """
+        Cria as partições futuras e aplica a retenção por plano
+
+        Returns:
+            dict: created, detached, dropped (nomes) e deleted (linhas removidas)
+        """
+        result = {'created': [], 'detached': [], 'dropped': [], 'deleted': 0}
+        conn = self.adapter.checkout_connection()
+        try:
+            cursor = conn.cursor()
+            if not self.is_partitioned(cursor):
+                conn.rollback()
+                logging.warning(f"{self.TABLE} não está particionada; execute: python -m utils.partitions convert")
+                return result
+
+            result['created'] = self.ensure_partitions(cursor, datetime.now())
+            conn.commit()
+            if result['created']:
+                logging.info(f"Partições criadas: {', '.join(result['created'])}")
+
+            cursor.execute('SELECT id, log_retention_days FROM plans')
+            retention = {row['id']: row['log_retention_days'] or self.retention_days for row in cursor.fetchall()}
+            conn.commit()
+
+            # Partições inteiras: apenas fora da retenção de todos os planos
+            longest = max(retention.values()) if retention and all(retention.values()) else None
+            if longest:
+                cutoff = (datetime.now() - timedelta(days=longest)).date()
+                for partition in self.partitions(cursor):
+                    if partition['end'] is not None and partition['end'] <= cutoff:
+                        self._retire(conn, partition['name'], result)
+
+            # Planos com retenção menor: linhas antigas removidas em lotes
+            for plan_id, days in retention.items():
+                if days and (longest is None or days < longest):
+                    result['deleted'] += self._delete_expired(conn, plan_id, datetime.now() - timedelta(days=days))
+        finally:
+            conn.close()
+        return result
+
+    def convert(self, pause=0.0):
+        """
+        Converte redirect_logs em tabela particionada sem bloqueios longos
+
+        A nova tabela é criada ao lado da atual e recebe as linhas em lotes por
+        faixa de id (pode ser interrompida e retomada). No final, com escritas
+        bloqueadas por alguns instantes, o último lote é copiado novamente (para
+        incluir a geolocalização gravada depois da cópia), a cauda é copiada e
+        as tabelas trocam de nome; a tabela antiga fica como redirect_logs_legacy,
+        sem as chaves estrangeiras (que passam para a nova tabela).
+
+        Args:
+            pause (float, optional): Espera entre os lotes em segundos. Defaults to 0.0.
+
+        Returns:
+            int: Linhas copiadas
+        """
+        target = f"{self.TABLE}_partitioned"
+        conn = self.adapter.checkout_connection()
+        try:
+            cursor = conn.cursor()
+            if self.is_partitioned(cursor):
+                conn.rollback()
+                logging.info(f"{self.TABLE} já está particionada")
+                return 0
+
+            columns, select = self._copy_columns(cursor)
+            self._create_target(cursor, target)
+            conn.commit()
+
+            cursor.execute(f'SELECT COALESCE(MAX(id), 0) AS copied FROM {target}')
+            copied_id = cursor.fetchone()['copied']
+            cursor.execute(f'SELECT COALESCE(MAX(id), 0) AS last_id FROM {self.TABLE}')
+            last_id = cursor.fetchone()['last_id']
+            conn.commit()
+
+            copied = 0
+            while copied_id < last_id:
+                upper = min(copied_id + self.batch_size, last_id)
+                cursor.execute(
+                    f"INSERT INTO {target} ({columns}) SELECT {select} FROM {self.TABLE} "
+                    f"WHERE id > %s AND id <= %s",
+                    (copied_id, upper)
+                )
+                copied += cursor.rowcount
+                conn.commit()
+                copied_id = upper
+                logging.info(f"Conversão de {self.TABLE}: copiado até o id {copied_id} de {last_id}")
+                if pause:
+                    time.sleep(pause)
+
+            copied += self._swap(conn, target, columns, select, copied_id)
+            logging.info(f"{self.TABLE} convertida em tabela particionada ({copied} linhas copiadas)")
+            return copied
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _copy_columns(self, cursor):
+        cursor.execute(
+            'SELECT column_name FROM information_schema.columns WHERE table_name = %s ORDER BY ordinal_position',
+            (self.TABLE,)
+        )
+        names = [row['column_name'] for row in cursor.fetchall()]
+        # A chave de partição não aceita NULL na chave primária: linhas sem data vão para a partição DEFAULT
+        select = [
+            "COALESCE(redirect_time, TIMESTAMP 'epoch')" if name == 'redirect_time' else name
+            for name in names
+        ]
+        return ', '.join(names), ', '.join(select)
+
+    def _create_target(self, cursor, target):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {target} (LIKE {self.TABLE} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (redirect_time)"
+        )
+        cursor.execute(
+            "SELECT 1 FROM pg_constraint WHERE conname = %s", (f"{target}_pkey",)
+        )
+        if not cursor.fetchone():
+            cursor.execute(f"ALTER TABLE {target} ADD CONSTRAINT {target}_pkey PRIMARY KEY (id, redirect_time)")
+
+        # LIKE não copia as chaves estrangeiras (link_id, number_id); nomes com sufixo até a troca
+        existing = {foreign_key['name'] for foreign_key in self._foreign_keys(cursor, target)}
+        for foreign_key in self._foreign_keys(cursor, self.TABLE):
+            if f"{foreign_key['name']}_p" not in existing:
+                cursor.execute(
+                    f"ALTER TABLE {target} ADD CONSTRAINT {foreign_key['name']}_p {foreign_key['definition']}"
+                )
+
+        cursor.execute(f'SELECT MIN(redirect_time) AS first FROM {self.TABLE}')
+        first = cursor.fetchone()['first'] or datetime.now()
+        self.ensure_partitions(cursor, first, target)
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {self.TABLE}_default PARTITION OF {target} DEFAULT")
+
+        # Mesmos índices da migração v0002 (tabela vazia: criados sem CONCURRENTLY)
+        for name, table, method, index_columns, unique in INDEXES:
+            if table == self.TABLE:
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {name}_p ON {target} USING {method} {index_columns}")
+
+    def _foreign_keys(self, cursor, table):
+        cursor.execute(self.FOREIGN_KEYS_QUERY, (table,))
+        return cursor.fetchall()
+
+    def _swap(self, conn, target, columns, select, copied_id):
+        cursor = conn.cursor()
+        # Não ficar na fila do lock atrás de transações longas
+        cursor.execute("SET LOCAL lock_timeout = '10s'")
+        cursor.execute(f'LOCK TABLE {self.TABLE} IN EXCLUSIVE MODE')
+
+        # Recopiar o último lote (atualizações recentes, ex.: geolocalização) e copiar a cauda
+        resync_from = max(copied_id - self.batch_size, 0)
+        cursor.execute(f'DELETE FROM {target} WHERE id > %s', (resync_from,))
+        resynced = cursor.rowcount
+        cursor.execute(f'INSERT INTO {target} ({columns}) SELECT {select} FROM {self.TABLE} WHERE id > %s', (resync_from,))
+        tail = cursor.rowcount - resynced
+
+        legacy = f"{self.TABLE}_legacy"
+        cursor.execute(f'ALTER TABLE {self.TABLE} RENAME TO {legacy}')
+        cursor.execute(f'ALTER INDEX IF EXISTS {self.TABLE}_pkey RENAME TO {legacy}_pkey')
+        for name, table, method, index_columns, unique in INDEXES:
+            if table == self.TABLE:
+                cursor.execute(f'ALTER INDEX IF EXISTS {name} RENAME TO {name}_legacy')
+                cursor.execute(f'ALTER INDEX {name}_p RENAME TO {name}')
+        cursor.execute(f'ALTER TABLE {target} RENAME TO {self.TABLE}')
+        cursor.execute(f'ALTER TABLE {self.TABLE} RENAME CONSTRAINT {target}_pkey TO {self.TABLE}_pkey')
+        # A tabela legada não deve bloquear nem propagar exclusões de links e números
+        for foreign_key in self._foreign_keys(cursor, legacy):
+            cursor.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {foreign_key['name']}")
+            cursor.execute(
+                f"ALTER TABLE {self.TABLE} RENAME CONSTRAINT {foreign_key['name']}_p TO {foreign_key['name']}"
+            )
+        # A sequência dos ids continua a mesma; passa a pertencer à nova tabela
+        cursor.execute(f"SELECT pg_get_serial_sequence('{legacy}', 'id') AS sequence")
+        sequence = cursor.fetchone()['sequence']
+        if sequence:
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {self.TABLE}.id')
+        conn.commit()
+        return tail
+
+    def _retire(self, conn, name, result):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET LOCAL lock_timeout = '5s'")
+            cursor.execute(f'ALTER TABLE {self.TABLE} DETACH PARTITION {name}')
+            result['detached'].append(name)
+            if self.retention_action == 'drop':
+                cursor.execute(f'DROP TABLE {name}')
+                result['dropped'].append(name)
+            conn.commit()
+            logging.info(f"Partição {name} fora da retenção: {self.retention_action}")
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Erro ao remover a partição {name}: {str(e)}")
+
+    def _delete_expired(self, conn, plan_id, cutoff):
+        cursor = conn.cursor()
+        deleted = 0
+        while True:
+            cursor.execute(self.RETENTION_DELETE, {'cutoff': cutoff, 'plan_id': plan_id, 'batch_size': self.batch_size})
+            rows = cursor.rowcount
+            conn.commit()
+            deleted += rows
+            if rows < self.batch_size:
+                break
+        if deleted:
+            logging.info(f"Retenção do plano {plan_id}: {deleted} logs anteriores a {cutoff:%Y-%m-%d} removidos")
+        return deleted
+
+
+# Instância compartilhada (CLI e tarefas de manutenção)
+partition_manager = PartitionManager(
+    db_adapter,
+    interval=active_config.REDIRECT_LOG_PARTITION_INTERVAL,
+    ahead=active_config.REDIRECT_LOG_PARTITIONS_AHEAD,
+    retention_days=active_config.REDIRECT_LOG_RETENTION_DAYS,
+    retention_action=active_config.REDIRECT_LOG_RETENTION_ACTION,
+    batch_size=active_config.REDIRECT_LOG_BATCH_SIZE
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m utils.partitions', description="Partições de redirect_logs")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help="Lista as partições")
+    convert = commands.add_parser('convert', help="Converte a tabela em particionada (em lotes)")
+    convert.add_argument('--pause', type=float, default=0.0, help="Espera entre os lotes em segundos")
+    commands.add_parser('maintain', help="Cria partições futuras e aplica a retenção")
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        status = partition_manager.status()
+        if not status['partitioned']:
+            print(f"{PartitionManager.TABLE} não está particionada")
+        for partition in status['partitions']:
+            bounds = f"{partition['start']} a {partition['end']}" if partition['start'] else 'DEFAULT'
+            print(f"{partition['name']:<36} {bounds:<26} ~{partition['estimated_rows']} linhas")
+    elif args.command == 'convert':
+        partition_manager.convert(pause=args.pause)
+    else:
+        result = partition_manager.maintain()
+        print(f"Criadas: {len(result['created'])}, desanexadas: {len(result['detached'])}, "
+              f"removidas: {len(result['dropped'])}, logs removidos: {result['deleted']}")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] [%(levelname)s] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    sys.exit(main())
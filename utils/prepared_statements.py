@@ -0,0 +1,110 @@
+import re
+import logging
+from psycopg2 import extensions
+from utils.query_profiler import recorded_as
+
+
+# Placeholders do psycopg2: %(nome)s, %s e o escape %%
+PLACEHOLDER_RE = re.compile(r'%\((\w+)\)s|%s|%%')
+STATEMENT_NAME_RE = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+
+class StatementConnection(extensions.connection):
+    """Conexão psycopg2 que registra os statements já preparados na sessão"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+
+class PreparedStatement:
+    """
+    Consulta registrada com nome, executada com PREPARE/EXECUTE no servidor
+
+    A consulta é escrita como qualquer outra do projeto (placeholders `%s` ou
+    `%(nome)s`) e convertida uma única vez para os parâmetros `$n` do PREPARE.
+    """
+
+    def __init__(self, name, query, types=None):
+        """
+        Args:
+            name (str): Nome do statement no servidor
+            query (str): Consulta com placeholders do psycopg2
+            types (list, optional): Tipos SQL dos parâmetros, na ordem dos `$n`
+        """
+        if not STATEMENT_NAME_RE.match(name):
+            raise ValueError(f"Nome de statement inválido: {name}")
+
+        self.name = name
+        self.query = query
+        self.param_names, self.server_query, count = self._convert(query)
+        self.disabled = False
+        self.executions = 0
+
+        signature = f" ({', '.join(types)})" if types else ''
+        self.prepare_sql = f"PREPARE {name}{signature} AS {self.server_query}"
+        self.execute_sql = f"EXECUTE {name}({', '.join(['%s'] * count)})" if count else f"EXECUTE {name}"
+
+    def arguments(self, params):
+        """Ordena os parâmetros da chamada conforme os `$n` do PREPARE"""
+        if self.param_names is not None:
+            return [params[name] for name in self.param_names]
+        return list(params or ())
+
+    @staticmethod
+    def _convert(query):
+        names = []
+        positional = [0]
+
+        def replace(match):
+            if match.group(0) == '%%':
+                return '%'
+            name = match.group(1)
+            if name is not None:
+                if name not in names:
+                    names.append(name)
+                return f"${names.index(name) + 1}"
+            positional[0] += 1
+            return f"${positional[0]}"
+
+        server_query = PLACEHOLDER_RE.sub(replace, query)
+        if names and positional[0]:
+            raise ValueError("Não misture placeholders nomeados e posicionais em um statement")
+
+        if names:
+            return names, server_query, len(names)
+        return None, server_query, positional[0]
+
+
+def execute_prepared(cursor, statement, params):
+    """
+    Executa um statement preparado, preparando-o na sessão se necessário
+
+    Conexões que não registram statements (sem `prepared_statements`) e
+    statements que não puderam ser preparados usam a execução comum.
+    """
+    prepared = getattr(cursor.connection, 'prepared_statements', None)
+    if prepared is None or statement.disabled:
+        cursor.execute(statement.query, params)
+        return
+
+    if statement.name not in prepared:
+        # Savepoint para que uma falha no PREPARE não aborte a transação do chamador
+        with recorded_as(cursor):
+            cursor.execute('SAVEPOINT prepare_statement')
+            try:
+                cursor.execute(statement.prepare_sql)
+                cursor.execute('RELEASE SAVEPOINT prepare_statement')
+            except Exception as e:
+                cursor.execute('ROLLBACK TO SAVEPOINT prepare_statement')
+                statement.disabled = True
+                logging.warning(f"Statement {statement.name} não pôde ser preparado, usando execução comum: {str(e)}")
+        if statement.disabled:
+            cursor.execute(statement.query, params)
+            return
+        prepared.add(statement.name)
+
+    # O perfil agrupa e explica a consulta original, não o EXECUTE
+    with recorded_as(cursor, statement.query, params):
+        cursor.execute(statement.execute_sql, statement.arguments(params))
+    statement.executions += 1
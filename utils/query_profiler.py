@@ -0,0 +1,321 @@
+import re
+import time
+import random
+import logging
+import threading
+from functools import lru_cache
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from flask import g, has_request_context, request
+from psycopg2 import sql, extensions
+from psycopg2.extras import RealDictCursor, NamedTupleCursor
+from config.settings import active_config
+
+
+STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL_RE = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST_RE = re.compile(r"(?:%\(\w+\)s|%s|\?|\$\d+)(?:\s*,\s*(?:%\(\w+\)s|%s|\?|\$\d+))+")
+VALUES_LIST_RE = re.compile(r"\((?:[^()]|\([^()]*\))*\)(?:\s*,\s*\((?:[^()]|\([^()]*\))*\))+")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(query):
+    """
+    Normaliza uma consulta para agrupar execuções equivalentes
+
+    Literais viram `?`, listas de placeholders e de linhas do VALUES são
+    resumidas e os espaços são compactados.
+    """
+    query = STRING_LITERAL_RE.sub('?', query)
+    query = NUMBER_LITERAL_RE.sub('?', query)
+    query = PLACEHOLDER_LIST_RE.sub('?, ...', query)
+    query = VALUES_LIST_RE.sub(lambda m: m.group(0)[:m.group(0).index(')') + 1] + ', ...', query)
+    return WHITESPACE_RE.sub(' ', query).strip()
+
+
+def param_shape(params):
+    """Descreve os tipos dos parâmetros sem expor os valores"""
+    if params is None:
+        return ''
+    if isinstance(params, dict):
+        return '{' + ', '.join(f"{k}: {type(v).__name__}" for k, v in params.items()) + '}'
+    if isinstance(params, (list, tuple)):
+        return '(' + ', '.join(type(v).__name__ for v in params) + ')'
+    return type(params).__name__
+
+
+class QueryProfiler:
+    """
+    Perfil das consultas executadas pelo processo.
+
+    Agrega tempo, linhas e chamadas por consulta normalizada e por endpoint,
+    registra as consultas acima de `slow_threshold_ms` e, para uma amostra
+    das consultas SELECT lentas, guarda o plano de `EXPLAIN (ANALYZE, BUFFERS)`.
+    """
+
+    def __init__(self, slow_threshold_ms=200, explain_rate=0.0, max_statements=500, slow_log_size=50):
+        """
+        Args:
+            slow_threshold_ms (float): Duração a partir da qual a consulta é registrada como lenta
+            explain_rate (float): Fração das consultas SELECT lentas que recebem EXPLAIN
+            max_statements (int): Quantidade máxima de consultas normalizadas em memória
+            slow_log_size (int): Quantidade de consultas lentas recentes mantidas
+        """
+        self.slow_threshold_ms = slow_threshold_ms
+        self.explain_rate = explain_rate
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self._statements = OrderedDict()
+        self._endpoints = {}
+        self._slow_log = deque(maxlen=slow_log_size)
+
+    def begin_request(self):
+        """Zera os contadores da requisição atual (before_request)"""
+        g._query_profile = {'queries': 0, 'rows': 0, 'db_ms': 0.0}
+
+    def end_request(self, exception=None):
+        """Acumula os contadores da requisição no endpoint (teardown_request)"""
+        profile = g.pop('_query_profile', None)
+        if profile is None:
+            return
+
+        endpoint = request.endpoint or request.path
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'rows': 0, 'db_ms': 0.0, 'max_queries': 0, 'max_db_ms': 0.0
+            })
+            entry['requests'] += 1
+            entry['queries'] += profile['queries']
+            entry['rows'] += profile['rows']
+            entry['db_ms'] += profile['db_ms']
+            entry['max_queries'] = max(entry['max_queries'], profile['queries'])
+            entry['max_db_ms'] = max(entry['max_db_ms'], profile['db_ms'])
+
+    def request_profile(self):
+        """Retorna os contadores da requisição atual, ou None fora de uma requisição"""
+        if not has_request_context():
+            return None
+        return g.get('_query_profile')
+
+    def record(self, cursor, query, params, duration_ms):
+        """
+        Registra uma execução (chamado pelo ProfilingCursor)
+
+        Args:
+            cursor: Cursor que executou a consulta (usado no EXPLAIN)
+            query (str): Consulta enviada ao servidor
+            params: Parâmetros da consulta
+            duration_ms (float): Duração em milissegundos
+        """
+        normalized = normalize_sql(query)
+        rows = max(cursor.rowcount, 0)
+
+        profile = self.request_profile()
+        if profile is not None:
+            profile['queries'] += 1
+            profile['rows'] += rows
+            profile['db_ms'] += duration_ms
+
+        slow = duration_ms >= self.slow_threshold_ms
+        with self._lock:
+            entry = self._statements.pop(normalized, None) or {
+                'calls': 0, 'rows': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'slow': 0, 'plan': None
+            }
+            entry['calls'] += 1
+            entry['rows'] += rows
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            if slow:
+                entry['slow'] += 1
+            self._statements[normalized] = entry
+            # Descartar as consultas usadas há mais tempo
+            while len(self._statements) > self.max_statements:
+                self._statements.popitem(last=False)
+
+        if not slow:
+            return
+
+        shape = param_shape(params)
+        endpoint = request.endpoint if has_request_context() else None
+        logging.warning(f"Consulta lenta ({duration_ms:.1f} ms, {rows} linhas, endpoint={endpoint}): {normalized} params={shape}")
+        self._slow_log.append({
+            'sql': normalized,
+            'params': shape,
+            'duration_ms': round(duration_ms, 3),
+            'rows': rows,
+            'endpoint': endpoint,
+            'at': time.time()
+        })
+
+        if self.explain_rate and normalized.upper().startswith('SELECT') and random.random() < self.explain_rate:
+            plan = self._explain(cursor, query, params)
+            if plan:
+                with self._lock:
+                    if normalized in self._statements:
+                        self._statements[normalized]['plan'] = plan
+
+    def top_statements(self, limit=20, order_by='total_ms'):
+        """Consultas normalizadas com maior custo acumulado"""
+        with self._lock:
+            items = [dict(entry, sql=normalized) for normalized, entry in self._statements.items()]
+        for item in items:
+            item['avg_ms'] = round(item['total_ms'] / item['calls'], 3) if item['calls'] else 0
+        return sorted(items, key=lambda item: item[order_by], reverse=True)[:limit]
+
+    def top_endpoints(self, limit=20):
+        """Endpoints com maior tempo de banco acumulado"""
+        with self._lock:
+            items = [dict(entry, endpoint=endpoint) for endpoint, entry in self._endpoints.items()]
+        for item in items:
+            item['avg_queries'] = round(item['queries'] / item['requests'], 2) if item['requests'] else 0
+            item['avg_db_ms'] = round(item['db_ms'] / item['requests'], 3) if item['requests'] else 0
+        return sorted(items, key=lambda item: item['db_ms'], reverse=True)[:limit]
+
+    def slow_queries(self):
+        """Consultas lentas mais recentes, da mais nova para a mais antiga"""
+        return list(reversed(self._slow_log))
+
+    def reset(self):
+        """Descarta as estatísticas acumuladas"""
+        with self._lock:
+            self._statements.clear()
+            self._endpoints.clear()
+            self._slow_log.clear()
+
+    def stats(self):
+        """
+        Retorna um resumo do perfil
+
+        Returns:
+            dict: Totais de consultas e as mais custosas
+        """
+        with self._lock:
+            calls = sum(entry['calls'] for entry in self._statements.values())
+            total_ms = sum(entry['total_ms'] for entry in self._statements.values())
+        return {
+            'statements': len(self._statements),
+            'calls': calls,
+            'total_ms': round(total_ms, 3),
+            'slow_threshold_ms': self.slow_threshold_ms,
+            'slow_queries': len(self._slow_log),
+            'top': [
+                {'sql': item['sql'], 'calls': item['calls'], 'total_ms': round(item['total_ms'], 3)}
+                for item in self.top_statements(limit=5)
+            ]
+        }
+
+    @staticmethod
+    def _explain(cursor, query, params):
+        # EXPLAIN ANALYZE executa a consulta de novo; o savepoint protege a transação do chamador
+        conn = cursor.connection
+        explain = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            explain.execute('SAVEPOINT explain_query')
+            try:
+                explain.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query}", params)
+                plan = '\n'.join(row['QUERY PLAN'] for row in explain.fetchall())
+                explain.execute('RELEASE SAVEPOINT explain_query')
+                return plan
+            except Exception as e:
+                explain.execute('ROLLBACK TO SAVEPOINT explain_query')
+                logging.warning(f"Não foi possível obter o plano da consulta lenta: {str(e)}")
+                return None
+        except Exception as e:
+            logging.warning(f"Não foi possível obter o plano da consulta lenta: {str(e)}")
+            return None
+        finally:
+            explain.close()
+
+
+# Marca de `recorded_as` para execuções que não entram no perfil
+NOT_RECORDED = object()
+
+
+@contextmanager
+def recorded_as(cursor, query=NOT_RECORDED, params=None):
+    """
+    Registra as execuções do bloco como outra consulta, ou não as registra
+
+    Usado pelos statements preparados: o EXECUTE é registrado com a consulta
+    original (agrupamento e EXPLAIN) e o PREPARE com seus savepoints fica de fora.
+
+    Args:
+        cursor: Cursor que executa o bloco (sem efeito se não tiver perfil)
+        query (str, optional): Consulta registrada. Defaults to NOT_RECORDED.
+        params (optional): Parâmetros da consulta registrada. Defaults to None.
+    """
+    if not isinstance(cursor, ProfilingMixin):
+        yield
+        return
+
+    previous = cursor._recorded_as
+    cursor._recorded_as = query if query is NOT_RECORDED else (query, params)
+    try:
+        yield
+    finally:
+        cursor._recorded_as = previous
+
+
+class ProfilingMixin:
+    """Mede cada execução do cursor e a registra no `query_profiler`"""
+
+    # Substituto da consulta enviada (ver `recorded_as`)
+    _recorded_as = None
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._record(query, vars, started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._record(query, None, started)
+
+    def copy_expert(self, sql_statement, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql_statement, file, size)
+        finally:
+            self._record(sql_statement, None, started)
+
+    def _record(self, query, params, started):
+        duration_ms = (time.perf_counter() - started) * 1000
+        if self._recorded_as is NOT_RECORDED:
+            return
+        if self._recorded_as is not None:
+            query, params = self._recorded_as
+        try:
+            if isinstance(query, sql.Composable):
+                query = query.as_string(self)
+            elif isinstance(query, bytes):
+                query = query.decode('utf-8', 'replace')
+            query_profiler.record(self, query, params, duration_ms)
+        except Exception as e:
+            # O perfil nunca deve interromper a consulta
+            logging.debug(f"Erro ao registrar perfil da consulta: {str(e)}")
+
+
+class ProfilingCursor(ProfilingMixin, RealDictCursor):
+    """Cursor padrão das conexões (linhas como dicionários), com perfil"""
+
+
+class ProfilingTupleCursor(ProfilingMixin, extensions.cursor):
+    """Cursor com linhas em tuplas (row_format='tuple'), com perfil"""
+
+
+class ProfilingNamedTupleCursor(ProfilingMixin, NamedTupleCursor):
+    """Cursor com linhas em namedtuples (row_format='namedtuple'), com perfil"""
+
+
+# Instância compartilhada pelos cursores do processo
+query_profiler = QueryProfiler(
+    slow_threshold_ms=active_config.DB_SLOW_QUERY_MS,
+    explain_rate=active_config.DB_SLOW_QUERY_EXPLAIN_RATE,
+    max_statements=active_config.DB_PROFILER_MAX_STATEMENTS
+)
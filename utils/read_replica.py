@@ -0,0 +1,173 @@
+import math
+import time
+import logging
+from functools import wraps
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Tolerância de atraso pedida para as leituras do contexto atual (None = primário)
+_requested_lag = ContextVar('replica_max_lag', default=None)
+
+# Tolerância padrão da réplica (REPLICA_MAX_LAG)
+DEFAULT_LAG = object()
+
+
+def requested_lag():
+    """Retorna a tolerância de atraso das leituras em andamento, ou None"""
+    return _requested_lag.get()
+
+
+@contextmanager
+def replica_reads(max_lag=None):
+    """
+    Direciona para a réplica as consultas SELECT executadas no bloco
+
+    Args:
+        max_lag (float, optional): Atraso máximo aceito em segundos. Defaults to
+            None (REPLICA_MAX_LAG).
+    """
+    token = _requested_lag.set(DEFAULT_LAG if max_lag is None else max_lag)
+    try:
+        yield
+    finally:
+        _requested_lag.reset(token)
+
+
+def replica_read(max_lag=None):
+    """Decorador que executa a função com leituras direcionadas à réplica"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with replica_reads(max_lag):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ReplicaRouter:
+    """
+    Escolhe a réplica de leitura quando ela está disponível e atualizada.
+
+    O atraso da réplica é medido com uma consulta leve e reaproveitado por
+    `lag_check_interval` segundos. Se a réplica estiver atrasada além da
+    tolerância da leitura, `acquire` retorna None e a consulta vai para o
+    primário. Falhas de conexão marcam a réplica como indisponível por
+    `retry_after` segundos.
+    """
+
+    # Réplica sem WAL pendente está em dia, mesmo que a última transação seja
+    # antiga, mas só enquanto o WAL receiver estiver conectado: desconectado,
+    # os LSNs recebido e aplicado ficam iguais e parados. Sem receiver, o atraso
+    # é o tempo desde a última transação aplicada (infinito se nenhuma foi).
+    LAG_QUERY = '''
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+                AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN 0
+            ELSE COALESCE(
+                EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8,
+                'Infinity'::float8
+            )
+        END AS lag
+    '''
+
+    def __init__(self, connect, pool=None, max_lag=30, retry_after=30, lag_check_interval=5):
+        """
+        Args:
+            connect (callable): Função que abre uma conexão com a réplica
+            pool (ConnectionPool, optional): Pool de conexões da réplica
+            max_lag (float): Atraso padrão aceito em segundos
+            retry_after (float): Tempo em que a réplica fica fora após uma falha
+            lag_check_interval (float): Validade da última medição de atraso
+        """
+        self._connect = connect
+        self.pool = pool
+        self.max_lag = max_lag
+        self.retry_after = retry_after
+        self.lag_check_interval = lag_check_interval
+        self._lag = None
+        self._lag_checked_at = None
+        self._down_until = 0.0
+        self._metrics = Counter()
+
+    def acquire(self, max_lag=DEFAULT_LAG):
+        """
+        Obtém uma conexão com a réplica, se ela atender à tolerância pedida
+
+        Returns:
+            Conexão com a réplica (fechar após o uso) ou None para usar o primário
+        """
+        if max_lag is DEFAULT_LAG or max_lag is None:
+            max_lag = self.max_lag
+
+        if time.monotonic() < self._down_until:
+            self._metrics['fallback_down'] += 1
+            return None
+
+        try:
+            conn = self.pool.getconn() if self.pool is not None else self._connect()
+            lag = self._current_lag(conn)
+        except Exception as e:
+            self.mark_down(e)
+            return None
+
+        if lag > max_lag:
+            conn.close()
+            self._metrics['fallback_lag'] += 1
+            return None
+
+        self._metrics['reads'] += 1
+        return conn
+
+    def mark_down(self, error):
+        """Tira a réplica de uso por `retry_after` segundos"""
+        self._down_until = time.monotonic() + self.retry_after
+        self._lag_checked_at = None
+        self._metrics['failures'] += 1
+        logging.warning(f"Réplica de leitura indisponível por {self.retry_after}s, usando o primário: {str(error)}")
+
+    def record_fallback(self):
+        """Contabiliza uma leitura refeita no primário (ex.: conflito de recovery)"""
+        self._metrics['fallback_error'] += 1
+
+    def stats(self):
+        """
+        Retorna as métricas da réplica
+
+        Returns:
+            dict: Último atraso medido, leituras atendidas e desvios para o primário
+        """
+        return {
+            'available': time.monotonic() >= self._down_until,
+            # Atraso desconhecido (réplica sem receiver e sem transações aplicadas)
+            'lag_seconds': self._lag if self._lag is None or math.isfinite(self._lag) else None,
+            'max_lag': self.max_lag,
+            'reads': self._metrics['reads'],
+            'fallback_lag': self._metrics['fallback_lag'],
+            'fallback_down': self._metrics['fallback_down'],
+            'fallback_error': self._metrics['fallback_error'],
+            'failures': self._metrics['failures'],
+            'pool': self.pool.stats() if self.pool is not None else None
+        }
+
+    def _current_lag(self, conn):
+        now = time.monotonic()
+        if self._lag_checked_at is not None and now - self._lag_checked_at < self.lag_check_interval:
+            return self._lag
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.LAG_QUERY)
+            row = cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+        except Exception:
+            conn.close()
+            raise
+
+        lag = row['lag'] if isinstance(row, dict) else row[0]
+        self._lag = float(lag or 0)
+        self._lag_checked_at = now
+        return self._lag
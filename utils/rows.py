@@ -0,0 +1,61 @@
+from operator import itemgetter
+
+
+# Formatos de linha aceitos por db_adapter.execute_query(row_format=...)
+ROW_FORMATS = ('dict', 'tuple', 'namedtuple')
+
+
+class RowSet(list):
+    """
+    Resultado em tuplas com o mapa de colunas da consulta.
+
+    Cada linha é a tupla criada pelo psycopg2, sem o dicionário por linha do
+    RealDictCursor. `index` mapeia o nome da coluna para a posição na tupla e
+    `getter` monta, uma vez por resultado, o extrator das colunas usadas por
+    um modelo.
+    """
+
+    __slots__ = ('columns', 'index')
+
+    def __init__(self, rows=(), columns=()):
+        super().__init__(rows)
+        self.columns = tuple(columns)
+        self.index = {name: position for position, name in enumerate(self.columns)}
+
+    @classmethod
+    def from_cursor(cls, cursor, rows):
+        """Cria o resultado a partir das linhas e da descrição de um cursor"""
+        return cls(rows, (column[0] for column in cursor.description or ()))
+
+    def getter(self, names, defaults=None):
+        """
+        Retorna uma função que extrai as colunas pedidas de uma linha, na ordem de `names`
+
+        Args:
+            names (tuple): Colunas usadas pelo chamador
+            defaults (dict, optional): Valor das colunas ausentes do resultado. Defaults to None.
+
+        Returns:
+            callable: linha -> tupla de valores
+        """
+        positions = [self.index.get(name) for name in names]
+        if None not in positions:
+            if len(positions) == 1:
+                position = positions[0]
+                return lambda row: (row[position],)
+            return itemgetter(*positions)
+
+        defaults = defaults or {}
+        fallback = [defaults.get(name) for name in names]
+        return lambda row: tuple(
+            row[position] if position is not None else default
+            for position, default in zip(positions, fallback)
+        )
+
+    def first(self):
+        """Primeira linha ou None"""
+        return self[0] if self else None
+
+    def dicts(self):
+        """Converte as linhas em dicionários (para serialização)"""
+        return [dict(zip(self.columns, row)) for row in self]
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Cache LRU limitado em tamanho com expiração por entrada (TTL).
+
+    Seguro para uso entre threads. Cada worker do gunicorn mantém sua própria
+    instância, portanto a invalidação é local ao processo e o TTL limita o
+    tempo em que outros workers podem servir um valor desatualizado.
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        """
+        Args:
+            max_size (int): Número máximo de entradas mantidas em memória
+            ttl (float): Tempo de vida padrão das entradas em segundos
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        Retorna o valor associado à chave, ou `default` se ausente ou expirado
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Armazena um valor, removendo as entradas menos usadas se necessário
+
+        Args:
+            key: Chave do cache
+            value: Valor a armazenar
+            ttl (float, optional): TTL específico desta entrada. Defaults to None.
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Remove uma chave do cache e retorna seu valor (mesmo se expirado)"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry else default
+
+    def clear(self):
+        """Remove todas as entradas do cache"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """
+        Retorna as estatísticas de uso do cache
+
+        Returns:
+            dict: Tamanho atual, acertos, falhas, remoções e taxa de acerto
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
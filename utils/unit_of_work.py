@@ -0,0 +1,225 @@
+import logging
+from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Unidade de trabalho ativa no contexto atual (requisição, thread ou job)
+_current = ContextVar('unit_of_work', default=None)
+
+
+def current_unit_of_work():
+    """Retorna a unidade de trabalho ativa ou None"""
+    return _current.get()
+
+
+class _SharedConnection:
+    """
+    Conexão da unidade de trabalho entregue aos modelos.
+
+    `commit()` e `close()` não têm efeito: a transação é confirmada e a
+    conexão liberada somente no fim da unidade de trabalho. `rollback()`
+    desfaz a transação inteira e impede o commit final.
+    """
+
+    def __init__(self, uow):
+        self._uow = uow
+
+    def __getattr__(self, name):
+        return getattr(self._uow.connection, name)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+    def rollback(self):
+        self._uow.rollback()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self._uow.rollback()
+
+
+class UnitOfWork:
+    """
+    Unidade de trabalho: uma conexão e uma transação compartilhadas.
+
+    Enquanto estiver ativa (ver `unit_of_work()`), `db_adapter.execute_query`
+    e `db_adapter.get_db_connection` usam a mesma conexão, os commits pedidos
+    pelos modelos são adiados para o fim da unidade e o mapa de identidade
+    evita recarregar o mesmo registro (`User.get_by_id` repetido, por exemplo).
+    Ações registradas com `on_commit` (invalidação de caches) só executam
+    depois que a transação é confirmada.
+    """
+
+    def __init__(self, adapter=None):
+        if adapter is None:
+            from utils.db_adapter import db_adapter as adapter
+        self._adapter = adapter
+        self._conn = None
+        self._owns_connection = False
+        self._identity_map = {}
+        self._after_commit = []
+        self.rollback_only = False
+
+    @property
+    def connection(self):
+        """Conexão da unidade de trabalho (obtida na primeira consulta)"""
+        if self._conn is None:
+            # Reaproveitar a conexão da requisição, se houver
+            self._conn = self._adapter.get_request_connection()
+            if self._conn is None:
+                self._conn = self._adapter.checkout_connection()
+                self._owns_connection = True
+        return self._conn
+
+    def shared_connection(self):
+        """Conexão entregue aos modelos no lugar de uma conexão própria"""
+        return _SharedConnection(self)
+
+    def execute(self, query, params=None, fetch_all=False, execute=None, row_format=None):
+        """
+        Executa uma consulta na transação da unidade de trabalho (sem commit)
+
+        Args:
+            execute (callable, optional): Executa a consulta no cursor (ex.: statement preparado)
+            row_format (str, optional): Formato das linhas ('dict', 'tuple' ou 'namedtuple')
+
+        Returns:
+            Mesmo retorno de `db_adapter.execute_query`
+        """
+        cursor = self._adapter.cursor(self.connection, row_format)
+        try:
+            if execute is not None:
+                result = execute(cursor)
+            else:
+                result = cursor.execute(query, params)
+        except Exception:
+            self.rollback()
+            raise
+        if result is not None:
+            return result
+        return self._adapter.fetch_result(cursor, query, fetch_all, row_format)
+
+    def get(self, model, key):
+        """Busca um objeto já carregado nesta unidade de trabalho"""
+        return self._identity_map.get((model, key))
+
+    def add(self, model, key, obj):
+        """Registra um objeto carregado ou criado no mapa de identidade"""
+        if obj is not None and key is not None:
+            self._identity_map[(model, key)] = obj
+        return obj
+
+    def discard(self, model, key):
+        """Remove um objeto do mapa de identidade (ex.: após exclusão)"""
+        self._identity_map.pop((model, key), None)
+
+    def on_commit(self, callback):
+        """Agenda uma ação para depois do commit"""
+        self._after_commit.append(callback)
+
+    def commit(self):
+        """Confirma a transação e executa as ações agendadas"""
+        if self.rollback_only:
+            # A transação já foi desfeita (erro tratado pelo chamador)
+            logging.warning("Unidade de trabalho encerrada sem commit após rollback")
+            if self._conn is not None and not self._conn.closed:
+                self._conn.rollback()
+            return
+
+        if self._conn is not None:
+            self._conn.commit()
+
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f"Erro em ação pós-commit: {str(e)}")
+
+    def rollback(self):
+        """Desfaz a transação; a unidade de trabalho não pode mais ser confirmada"""
+        self.rollback_only = True
+        self._after_commit = []
+        self._identity_map.clear()
+        if self._conn is not None and not self._conn.closed:
+            self._conn.rollback()
+
+    def close(self):
+        """Libera a conexão (a conexão da requisição fica com o teardown)"""
+        if self._conn is not None and self._owns_connection:
+            self._conn.close()
+        self._conn = None
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Abre uma unidade de trabalho, ou participa da que já estiver ativa
+
+    Apenas a unidade mais externa faz commit (ao sair sem erro) ou rollback.
+    """
+    current = _current.get()
+    if current is not None:
+        yield current
+        return
+
+    uow = UnitOfWork()
+    token = _current.set(uow)
+    try:
+        yield uow
+        uow.commit()
+    except Exception:
+        uow.rollback()
+        raise
+    finally:
+        _current.reset(token)
+        uow.close()
+
+
+def transactional(func):
+    """Decorador que executa a função dentro de uma unidade de trabalho"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with unit_of_work():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def on_commit(callback):
+    """Executa a ação após o commit da unidade de trabalho ativa, ou imediatamente"""
+    uow = _current.get()
+    if uow is None:
+        callback()
+    else:
+        uow.on_commit(callback)
+
+
+def load_identity(model, key, loader):
+    """
+    Busca um objeto no mapa de identidade da unidade de trabalho ativa
+
+    Se não estiver carregado, chama `loader()` e registra o resultado. Sem
+    unidade de trabalho ativa, apenas chama `loader()`.
+    """
+    uow = _current.get()
+    if uow is None:
+        return loader()
+
+    obj = uow.get(model, key)
+    if obj is None:
+        obj = uow.add(model, key, loader())
+    return obj
+
+
+def discard_identity(model, key):
+    """Remove um objeto do mapa de identidade da unidade de trabalho ativa"""
+    uow = _current.get()
+    if uow is not None:
+        uow.discard(model, key)